@@ -1,13 +1,26 @@
+import asyncio
+import uuid
 from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
-from typing import List, Optional
-
-from pydantic import BaseModel, Field, model_validator
-
+from typing import AsyncIterator, Dict, List, Optional
+
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+
+from app.checkpoint import AgentCheckpoint, CheckpointStore
+from app.events import (
+    AgentEvent,
+    FinalAnswerEvent,
+    StepEndEvent,
+    StepStartEvent,
+    emit,
+    event_sink,
+)
 from app.llm import LLM
 from app.logger import logger
-from app.sandbox.client import SANDBOX_CLIENT
+from app.metrics import current_labels, metric_context, metrics
+from app.sandbox.client import get_sandbox_client, is_sandbox_shared
 from app.schema import ROLE_TYPE, AgentState, Memory, Message
+from app.tracing import tracer
 
 
 class BaseAgent(BaseModel, ABC):
@@ -42,6 +55,12 @@ class BaseAgent(BaseModel, ABC):
 
     duplicate_threshold: int = 2
 
+    checkpoint_store: Optional[CheckpointStore] = Field(
+        default_factory=CheckpointStore.from_config,
+        description="Where step checkpoints are saved; None disables them",
+    )
+    _resumed_results: Optional[List[str]] = PrivateAttr(default=None)
+
     class Config:
         arbitrary_types_allowed = True
         extra = "allow"  # Allow extra fields for flexibility in subclasses
@@ -113,11 +132,15 @@ class BaseAgent(BaseModel, ABC):
         kwargs = {"base64_image": base64_image, **(kwargs if role == "tool" else {})}
         self.memory.add_message(message_map[role](content, **kwargs))
 
-    async def run(self, request: Optional[str] = None) -> str:
+    async def run(
+        self, request: Optional[str] = None, run_id: Optional[str] = None
+    ) -> str:
         """Execute the agent's main loop asynchronously.
 
         Args:
             request: Optional initial user request to process.
+            run_id: Optional identifier of the run, used for metrics and as
+                the checkpoint key. Generated when omitted.
 
         Returns:
             A string summarizing the execution results.
@@ -128,30 +151,188 @@ class BaseAgent(BaseModel, ABC):
         if self.state != AgentState.IDLE:
             raise RuntimeError(f"Cannot run agent from state: {self.state}")
 
-        if request:
-            self.update_memory("user", request)
-
-        results: List[str] = []
-        async with self.state_context(AgentState.RUNNING):
-            while (
-                self.current_step < self.max_steps and self.state != AgentState.FINISHED
-            ):
-                self.current_step += 1
-                logger.info(f"Executing step {self.current_step}/{self.max_steps}")
-                step_result = await self.step()
-
-                # Check for stuck state
-                if self.is_stuck():
-                    self.handle_stuck_state()
-
-                results.append(f"Step {self.current_step}: {step_result}")
-
-            if self.current_step >= self.max_steps:
-                self.current_step = 0
-                self.state = AgentState.IDLE
-                results.append(f"Terminated: Reached max steps ({self.max_steps})")
-        await SANDBOX_CLIENT.cleanup()
-        return "\n".join(results) if results else "No steps executed"
+        # Nested runs (e.g. agents driven by a flow) report under the outer run
+        parent_run = current_labels().get("run")
+        run_id = run_id or parent_run or uuid.uuid4().hex[:8]
+        checkpoint_key = f"{run_id}-{self.name}"
+
+        results: List[str] = self._resumed_results or []
+        self._resumed_results = None
+
+        try:
+            with metric_context(run=run_id, agent=self.name), tracer.span("agent.run"):
+                if request:
+                    self.update_memory("user", request)
+
+                async with self.state_context(AgentState.RUNNING):
+                    while (
+                        self.current_step < self.max_steps
+                        and self.state != AgentState.FINISHED
+                    ):
+                        self.current_step += 1
+                        logger.info(
+                            f"Executing step {self.current_step}/{self.max_steps}"
+                        )
+                        with metric_context(step=self.current_step), tracer.span(
+                            "agent.step"
+                        ):
+                            emit(StepStartEvent, max_steps=self.max_steps)
+                            step_result = await self.step()
+                            emit(StepEndEvent, result=str(step_result))
+
+                        # Check for stuck state
+                        if self.is_stuck():
+                            self.handle_stuck_state()
+
+                        results.append(f"Step {self.current_step}: {step_result}")
+                        if self.checkpoint_store:
+                            self.checkpoint_store.save(
+                                checkpoint_key,
+                                self.create_checkpoint(run_id, results),
+                            )
+
+                    if self.current_step >= self.max_steps:
+                        self.current_step = 0
+                        self.state = AgentState.IDLE
+                        results.append(
+                            f"Terminated: Reached max steps ({self.max_steps})"
+                        )
+                # A sandbox shared with other runs is cleaned up by its owner
+                if not is_sandbox_shared():
+                    await get_sandbox_client().cleanup()
+
+            # A finished run has nothing left to resume
+            if self.checkpoint_store:
+                self.checkpoint_store.delete(checkpoint_key)
+
+            if not parent_run:
+                usage = metrics.summary(run=run_id)
+                logger.info(
+                    f"📊 Run {run_id} metrics: "
+                    + ", ".join(f"{name}={value:g}" for name, value in usage.items())
+                )
+                await tracer.flush()
+        finally:
+            if not parent_run:
+                # Keep totals but stop tracking this run's series separately
+                metrics.retire(run=run_id)
+        result = "\n".join(results) if results else "No steps executed"
+        emit(FinalAnswerEvent, run_id=run_id, agent=self.name, content=result)
+        return result
+
+    async def run_stream(
+        self, request: Optional[str] = None, run_id: Optional[str] = None
+    ) -> AsyncIterator[AgentEvent]:
+        """Run the agent, yielding events as the run progresses.
+
+        The run executes in a background task. Leaving the loop early, or
+        closing the generator, cancels it; errors raised by the run are
+        re-raised once the events emitted before them have been yielded.
+
+        Example:
+            async for event in agent.run_stream("Summarize today's news"):
+                if event.type == EventType.TOOL_RESULT:
+                    print(event.name, event.content[:80])
+
+        Args:
+            request: Optional initial user request to process.
+            run_id: Optional identifier of the run, as for `run`.
+
+        Yields:
+            AgentEvent: Step boundaries, thoughts, tool calls and results,
+                token usage and, last, the final answer.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def produce() -> None:
+            try:
+                with event_sink(queue.put_nowait):
+                    await self.run(request, run_id=run_id)
+            finally:
+                queue.put_nowait(done)
+
+        task = asyncio.create_task(produce())
+        try:
+            while (event := await queue.get()) is not done:
+                yield event
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    async def resume(self, run_id: str) -> str:
+        """Continue an interrupted run from its last completed step.
+
+        Memory, step counter and tool state are restored from the checkpoint,
+        so earlier steps, and the LLM calls they made, are not repeated.
+
+        Args:
+            run_id: Identifier of the interrupted run.
+
+        Returns:
+            A string summarizing the execution results, including the steps
+            completed before the interruption.
+
+        Raises:
+            RuntimeError: If checkpoints are disabled.
+            ValueError: If there is no checkpoint for the run.
+        """
+        if not self.checkpoint_store:
+            raise RuntimeError("Checkpoints are disabled for this agent")
+        checkpoint = self.checkpoint_store.load(
+            f"{run_id}-{self.name}", AgentCheckpoint
+        )
+        if checkpoint is None:
+            raise ValueError(f"No checkpoint for run {run_id} of agent {self.name}")
+        if checkpoint.state == AgentState.FINISHED:
+            self.checkpoint_store.delete(f"{run_id}-{self.name}")
+            return "\n".join(checkpoint.results)
+
+        self.restore_checkpoint(checkpoint)
+        logger.info(f"♻️ Resuming run {run_id} after step {self.current_step}")
+        return await self.run(run_id=run_id)
+
+    def has_checkpoint(self, run_id: str) -> bool:
+        """Whether an interrupted run of this agent can be resumed."""
+        return bool(self.checkpoint_store) and self.checkpoint_store.exists(
+            f"{run_id}-{self.name}"
+        )
+
+    def create_checkpoint(self, run_id: str, results: List[str]) -> AgentCheckpoint:
+        """Capture the agent state needed to resume after the current step."""
+        return AgentCheckpoint(
+            run_id=run_id,
+            agent=self.name,
+            current_step=self.current_step,
+            state=self.state,
+            memory=self.memory,
+            next_step_prompt=self.next_step_prompt,
+            results=results,
+            tool_states=self.tool_states(),
+            observations=self.memory.observation_store().dump(),
+        )
+
+    def restore_checkpoint(self, checkpoint: AgentCheckpoint) -> None:
+        """Restore the agent from a checkpoint so the next run continues it."""
+        self.memory = checkpoint.memory
+        self.memory.observation_store().load(checkpoint.observations)
+        self.current_step = checkpoint.current_step
+        self.next_step_prompt = checkpoint.next_step_prompt
+        self.load_tool_states(checkpoint.tool_states)
+        self._resumed_results = list(checkpoint.results)
+        self.state = AgentState.IDLE
+
+    def tool_states(self) -> Dict[str, dict]:
+        """State of the agent's stateful tools, by tool name."""
+        return {}
+
+    def load_tool_states(self, states: Dict[str, dict]) -> None:
+        """Restore tool state captured by `tool_states`."""
 
     @abstractmethod
     async def step(self) -> str:
@@ -24,6 +24,7 @@ class Manus(ToolCallAgent):
     next_step_prompt: str = NEXT_STEP_PROMPT
 
     max_observe: int = 10000
+    observation_threshold: int = 10000
     max_steps: int = 20
 
     # Add general-purpose tools to the tool collection
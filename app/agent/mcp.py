@@ -175,10 +175,12 @@ class MCPAgent(ToolCallAgent):
             await self.mcp_clients.disconnect()
             logger.info("MCP connection closed")
 
-    async def run(self, request: Optional[str] = None) -> str:
+    async def run(
+        self, request: Optional[str] = None, run_id: Optional[str] = None
+    ) -> str:
         """Run the agent with cleanup when done."""
         try:
-            result = await super().run(request)
+            result = await super().run(request, run_id)
             return result
         finally:
             # Ensure cleanup happens even if there's an error
@@ -1,15 +1,22 @@
 import asyncio
 import json
-from typing import Any, List, Optional, Union
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Union
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from app.agent.react import ReActAgent
+from app.events import ThoughtEvent, ToolCallEvent, ToolResultEvent, emit
 from app.exceptions import TokenLimitExceeded
 from app.logger import logger
+from app.metrics import TOOL_CALLS, TOOL_LATENCY, metric_context
+from app.observation import current_observation_store, observation_scope
 from app.prompt.toolcall import NEXT_STEP_PROMPT, SYSTEM_PROMPT
 from app.schema import TOOL_CHOICE_TYPE, AgentState, Message, ToolCall, ToolChoice
 from app.tool import CreateChatCompletion, Terminate, ToolCollection
+from app.tool.base import ToolConcurrency
+from app.tool.read_observation import ReadObservation
 
 
 TOOL_CALL_REQUIRED = "Tool calls required but none provided"
@@ -36,33 +43,82 @@ class ToolCallAgent(ReActAgent):
     max_steps: int = 30
     max_observe: Optional[Union[int, bool]] = None
 
+    max_context_tokens: Optional[int] = Field(
+        default=None,
+        description="Prompt token budget per step; older history is compacted to fit (None disables)",
+    )
+
+    stream_tool_calls: bool = Field(
+        default=False,
+        description="Stream tool calls and start executing each one as soon as its arguments are complete",
+    )
+
+    observation_threshold: Optional[int] = Field(
+        default=None,
+        description="Tool outputs longer than this many characters are stored on disk and previewed (None disables)",
+    )
+
+    memoize_tools: bool = Field(
+        default=False,
+        description="Reuse results of repeated idempotent tool calls within a run",
+    )
+
+    # Screenshots captured per tool call index, consumed when building tool messages
+    _tool_images: Dict[int, Optional[str]] = PrivateAttr(default_factory=dict)
+    max_concurrent_tools: int = Field(
+        default=4,
+        description="Maximum number of tool calls from one response that run at once",
+    )
+
+    # Scheduled tool calls of the current response, keyed by their index in it,
+    # as models may repeat or omit tool call ids
+    _dispatched_tools: Dict[int, asyncio.Task] = PrivateAttr(default_factory=dict)
+    # Latest scheduled call per tool name, and the latest side-effecting call
+    _last_tool_calls: Dict[str, asyncio.Task] = PrivateAttr(default_factory=dict)
+    _tool_barrier: Optional[asyncio.Task] = PrivateAttr(default=None)
+    _tool_semaphore: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+
     async def think(self) -> bool:
         """Process current state and decide next actions using tools"""
         if self.next_step_prompt:
             user_msg = Message.user_message(self.next_step_prompt)
             self.messages += [user_msg]
 
+        system_msgs = (
+            [Message.system_message(self.system_prompt)] if self.system_prompt else None
+        )
+        tools = self.available_tools.to_params()
+        if self.max_context_tokens:
+            self.compact_memory(self.max_context_tokens, system_msgs, tools)
+
         try:
             # Get response with tool options
-            response = await self.llm.ask_tool(
-                messages=self.messages,
-                system_msgs=(
-                    [Message.system_message(self.system_prompt)]
-                    if self.system_prompt
-                    else None
-                ),
-                tools=self.available_tools.to_params(),
-                tool_choice=self.tool_choices,
-            )
+            response = await self._ask(system_msgs, tools)
         except ValueError:
+            self._cancel_dispatched_tools()
             raise
         except Exception as e:
-            # Check if this is a RetryError containing TokenLimitExceeded
-            if hasattr(e, "__cause__") and isinstance(e.__cause__, TokenLimitExceeded):
-                token_limit_error = e.__cause__
-                logger.error(
-                    f"🚨 Token limit error (from RetryError): {token_limit_error}"
+            self._cancel_dispatched_tools()
+            # TokenLimitExceeded may arrive wrapped in a RetryError
+            token_limit_error = self._token_limit_error(e)
+            if token_limit_error is None:
+                raise
+
+            response = None
+            if self._compact_to_context_window(system_msgs, tools):
+                logger.warning(
+                    f"🗜️ {self.name} compacted its history to fit the context window, retrying"
                 )
+                try:
+                    response = await self._ask(system_msgs, tools)
+                except Exception as retry_error:
+                    self._cancel_dispatched_tools()
+                    token_limit_error = self._token_limit_error(retry_error)
+                    if token_limit_error is None:
+                        raise
+
+            if response is None:
+                logger.error(f"🚨 Token limit error: {token_limit_error}")
                 self.memory.add_message(
                     Message.assistant_message(
                         f"Maximum token limit reached, cannot continue execution: {str(token_limit_error)}"
@@ -70,7 +126,6 @@ class ToolCallAgent(ReActAgent):
                 )
                 self.state = AgentState.FINISHED
                 return False
-            raise
 
         self.tool_calls = tool_calls = (
             response.tool_calls if response and response.tool_calls else []
@@ -88,6 +143,16 @@ class ToolCallAgent(ReActAgent):
             )
             logger.info(f"🔧 Tool arguments: {tool_calls[0].function.arguments}")
 
+        if content:
+            emit(ThoughtEvent, content=content)
+        for call in tool_calls:
+            emit(
+                ToolCallEvent,
+                tool_call_id=call.id,
+                name=call.function.name,
+                arguments=call.function.arguments,
+            )
+
         try:
             if response is None:
                 raise RuntimeError("No response received from the LLM")
@@ -120,6 +185,7 @@ class ToolCallAgent(ReActAgent):
 
             return bool(self.tool_calls)
         except Exception as e:
+            self._cancel_dispatched_tools()
             logger.error(f"🚨 Oops! The {self.name}'s thinking process hit a snag: {e}")
             self.memory.add_message(
                 Message.assistant_message(
@@ -128,43 +194,201 @@ class ToolCallAgent(ReActAgent):
             )
             return False
 
+    async def _ask(self, system_msgs: Optional[List[Message]], tools: List[dict]):
+        """Request the next response, streaming it when enabled."""
+        ask_tool = (
+            self._ask_tool_streaming
+            if self.stream_tool_calls and self.tool_choices != ToolChoice.NONE
+            else self.llm.ask_tool
+        )
+        return await ask_tool(
+            messages=self.messages,
+            system_msgs=system_msgs,
+            tools=tools,
+            tool_choice=self.tool_choices,
+        )
+
+    @staticmethod
+    def _token_limit_error(error: BaseException) -> Optional[TokenLimitExceeded]:
+        """Return the TokenLimitExceeded behind error, if any."""
+        if isinstance(error, TokenLimitExceeded):
+            return error
+        if isinstance(error.__cause__, TokenLimitExceeded):
+            return error.__cause__
+        return None
+
+    def compact_memory(
+        self,
+        max_tokens: int,
+        system_msgs: Optional[List[Message]] = None,
+        tools: Optional[List[dict]] = None,
+    ) -> bool:
+        """Compact memory so the next request fits in `max_tokens`.
+
+        Args:
+            max_tokens: Token budget for the whole request
+            system_msgs: System messages sent with the request
+            tools: Tool schemas sent with the request
+
+        Returns:
+            bool: Whether the request now fits in the budget
+        """
+        overhead = self.llm.count_prompt_tokens(system_msgs or [])
+        if tools:
+            overhead += self.llm.token_counter.count_tools(tools)
+        if max_tokens <= overhead:
+            return False
+
+        before = len(self.memory.messages)
+        fits = self.memory.compact(max_tokens - overhead, self.llm.count_prompt_tokens)
+        if len(self.memory.messages) < before:
+            logger.info(
+                f"🗜️ Compacted {self.name}'s history from {before} to {len(self.memory.messages)} messages"
+            )
+        return fits
+
+    def _compact_to_context_window(
+        self, system_msgs: Optional[List[Message]], tools: List[dict]
+    ) -> bool:
+        """Compact memory if the next request alone is over the context window.
+
+        The budget is the per-request window: the LLM's `context_window`, or
+        `max_context_tokens` if smaller. What is left of the cumulative
+        `max_input_tokens` is not a prompt size, and squeezing the history
+        into it would only buy a step or two with a crippled context.
+
+        Returns:
+            bool: Whether compaction made the next request fit
+        """
+        windows = [self.llm.context_window, self.max_context_tokens]
+        windows = [window for window in windows if window]
+        if not windows:
+            return False
+        window = min(windows)
+        prompt_tokens = self.llm.count_prompt_tokens(
+            (system_msgs or []) + self.memory.messages
+        )
+        if tools:
+            prompt_tokens += self.llm.token_counter.count_tools(tools)
+        if prompt_tokens <= window:
+            return False  # The cumulative budget is spent; compaction cannot help
+        return self.compact_memory(window, system_msgs, tools)
+
+    async def _ask_tool_streaming(self, **kwargs):
+        """Stream the LLM response, dispatching tool calls as soon as they complete."""
+        async with await self.llm.ask_tool_stream(**kwargs) as stream:
+            async for event in stream:
+                if event.tool_call:
+                    logger.info(
+                        f"⚡ Dispatching tool '{event.tool_call.function.name}' while the response streams"
+                    )
+                    self._dispatch_tool_call(event.tool_call_index, event.tool_call)
+        return stream.message
+
+    def _dispatch_tool_call(self, index: int, command: ToolCall) -> asyncio.Task:
+        """Schedule a tool call according to its tool's concurrency mode.
+
+        Side-effecting calls wait for every earlier call and block every later
+        one. Other calls only wait for the last side-effecting call, plus the
+        previous call to the same tool when that tool is exclusive, and then
+        run concurrently, bounded by `max_concurrent_tools`.
+        """
+        tool = self.available_tools.get_tool(command.function.name)
+        mode = tool.concurrency if tool else ToolConcurrency.SIDE_EFFECT
+
+        if mode == ToolConcurrency.SIDE_EFFECT:
+            wait_for = [t for t in self._dispatched_tools.values() if not t.done()]
+        else:
+            wait_for = [self._tool_barrier] if self._tool_barrier else []
+            previous = self._last_tool_calls.get(command.function.name)
+            if mode == ToolConcurrency.EXCLUSIVE and previous:
+                wait_for.append(previous)
+
+        if self._tool_semaphore is None:
+            self._tool_semaphore = asyncio.Semaphore(max(1, self.max_concurrent_tools))
+        semaphore = self._tool_semaphore
+
+        async def run() -> str:
+            if wait_for:
+                await asyncio.wait(wait_for)
+            async with semaphore:
+                return await self.execute_tool(command, index)
+
+        task = asyncio.create_task(run())
+        self._dispatched_tools[index] = task
+        self._last_tool_calls[command.function.name] = task
+        if mode == ToolConcurrency.SIDE_EFFECT:
+            self._tool_barrier = task
+        return task
+
+    def _cancel_dispatched_tools(self) -> None:
+        """Cancel tool calls dispatched for a response that will not be acted on."""
+        for task in self._dispatched_tools.values():
+            task.cancel()
+        self._dispatched_tools.clear()
+        self._last_tool_calls.clear()
+        self._tool_barrier = None
+        self._tool_semaphore = None
+
     async def act(self) -> str:
         """Execute tool calls and handle their results"""
         if not self.tool_calls:
+            self._cancel_dispatched_tools()
             if self.tool_choices == ToolChoice.REQUIRED:
                 raise ValueError(TOOL_CALL_REQUIRED)
 
             # Return last message content if no tool calls
             return self.messages[-1].content or "No content or commands to execute"
 
-        results = []
-        for command in self.tool_calls:
-            # Reset base64_image for each tool call
-            self._current_base64_image = None
-
-            result = await self.execute_tool(command)
-
-            if self.max_observe:
-                result = result[: self.max_observe]
-
-            logger.info(
-                f"🎯 Tool '{command.function.name}' completed its mission! Result: {result}"
-            )
-
-            # Add tool response to memory
-            tool_msg = Message.tool_message(
-                content=result,
-                tool_call_id=command.id,
-                name=command.function.name,
-                base64_image=self._current_base64_image,
-            )
-            self.memory.add_message(tool_msg)
-            results.append(result)
+        try:
+            # Start every call up front; compatible calls overlap, and results
+            # are still recorded in the order the model emitted them
+            for index, command in enumerate(self.tool_calls):
+                if index not in self._dispatched_tools:
+                    self._dispatch_tool_call(index, command)
+
+            results = []
+            for index, command in enumerate(self.tool_calls):
+                result = await self._dispatched_tools[index]
+
+                store = current_observation_store()
+                spilled = store.spill(result) if store else result
+                if spilled is not result:
+                    # The preview is already short, and must keep its handle
+                    result = spilled
+                elif self.max_observe:
+                    result = result[: self.max_observe]
+
+                logger.info(
+                    f"🎯 Tool '{command.function.name}' completed its mission! Result: {result}"
+                )
 
+                # Add tool response to memory
+                tool_msg = Message.tool_message(
+                    content=result,
+                    tool_call_id=command.id,
+                    name=command.function.name,
+                    base64_image=self._tool_images.pop(index, None),
+                )
+                self.memory.add_message(tool_msg)
+                emit(
+                    ToolResultEvent,
+                    tool_call_id=command.id,
+                    name=command.function.name,
+                    content=result,
+                )
+                results.append(result)
+        finally:
+            # Also stops tools still running when act itself is cancelled
+            self._cancel_dispatched_tools()
         return "\n\n".join(results)
 
-    async def execute_tool(self, command: ToolCall) -> str:
-        """Execute a single tool call with robust error handling"""
+    async def execute_tool(self, command: ToolCall, index: Optional[int] = None) -> str:
+        """Execute a single tool call with robust error handling
+
+        `index` is the call's position in the current response; a screenshot
+        the tool returns is kept under it for the call's tool message.
+        """
         if not command or not command.function or not command.function.name:
             return "Error: Invalid command format"
 
@@ -178,7 +402,17 @@ class ToolCallAgent(ReActAgent):
 
             # Execute the tool
             logger.info(f"🔧 Activating tool: '{name}'...")
-            result = await self.available_tools.execute(name=name, tool_input=args)
+            started = time.monotonic()
+            status = "error"
+            try:
+                with metric_context(tool=name):
+                    result = await self.available_tools.execute(
+                        name=name, tool_input=args
+                    )
+                status = "error" if getattr(result, "error", None) else "ok"
+            finally:
+                TOOL_LATENCY.observe(time.monotonic() - started, tool=name)
+                TOOL_CALLS.inc(tool=name, status=status)
 
             # Handle special tools
             await self._handle_special_tool(name=name, result=result)
@@ -187,6 +421,8 @@ class ToolCallAgent(ReActAgent):
             if hasattr(result, "base64_image") and result.base64_image:
                 # Store the base64_image for later use in tool_message
                 self._current_base64_image = result.base64_image
+                if index is not None:
+                    self._tool_images[index] = result.base64_image
 
                 # Format result for display
                 observation = (
@@ -234,6 +470,22 @@ class ToolCallAgent(ReActAgent):
         """Check if tool name is in special tools list"""
         return name.lower() in [n.lower() for n in self.special_tool_names]
 
+    def tool_states(self) -> Dict[str, dict]:
+        """State of the agent's stateful tools, by tool name."""
+        states = {}
+        for tool in self.available_tools:
+            state = tool.state_dict()
+            if state is not None:
+                states[tool.name] = state
+        return states
+
+    def load_tool_states(self, states: Dict[str, dict]) -> None:
+        """Restore tool state captured by `tool_states`."""
+        for name, state in states.items():
+            tool = self.available_tools.get_tool(name)
+            if tool:
+                tool.load_state_dict(state)
+
     async def cleanup(self):
         """Clean up resources used by the agent's tools."""
         logger.info(f"🧹 Cleaning up resources for agent '{self.name}'...")
@@ -250,9 +502,23 @@ class ToolCallAgent(ReActAgent):
                     )
         logger.info(f"✨ Cleanup complete for agent '{self.name}'.")
 
-    async def run(self, request: Optional[str] = None) -> str:
+    async def run(
+        self, request: Optional[str] = None, run_id: Optional[str] = None
+    ) -> str:
         """Run the agent with cleanup when done."""
+        if self.memoize_tools:
+            self.available_tools.enable_memo()
+        observations = nullcontext()
+        if self.observation_threshold:
+            if ReadObservation().name not in self.available_tools.tool_map:
+                self.available_tools.add_tool(ReadObservation())
+            # The store lives with the memory, so handles stay readable in
+            # later runs over the same memory
+            store = self.memory.observation_store()
+            store.threshold = self.observation_threshold
+            observations = observation_scope(store)
         try:
-            return await super().run(request)
+            with observations:
+                return await super().run(request, run_id)
         finally:
             await self.cleanup()
@@ -0,0 +1,217 @@
+"""Batch submission of independent LLM requests in the OpenAI Batch format."""
+
+import asyncio
+import io
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+from app.logger import logger
+
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchError(Exception):
+    """Raised when a batch job or one of its requests fails."""
+
+
+class BatchJob:
+    """A submitted batch whose results resolve one future per request."""
+
+    def __init__(self, job_id: Optional[str], custom_ids: List[str]):
+        self.id = job_id
+        self.custom_ids = custom_ids
+        self.status = "submitted" if job_id else "completed"
+        self.futures: Dict[str, asyncio.Future] = {
+            custom_id: asyncio.get_running_loop().create_future()
+            for custom_id in custom_ids
+        }
+        # Bookkeeping the LLM needs when results come back, keyed by custom_id
+        self.cache_keys: Dict[str, Optional[str]] = {}
+
+    @property
+    def pending(self) -> List[str]:
+        return [cid for cid, future in self.futures.items() if not future.done()]
+
+    def __len__(self) -> int:
+        return len(self.custom_ids)
+
+
+class BatchBackend(ABC):
+    """Transport for batch jobs: uploads request lines and fetches result lines."""
+
+    @abstractmethod
+    async def submit(self, lines: List[dict]) -> str:
+        """Submit request lines and return the backend's job id."""
+
+    @abstractmethod
+    async def poll(self, job_id: str) -> Optional[List[dict]]:
+        """Return the result lines once the job has finished, otherwise None.
+
+        Raises:
+            BatchError: If the job ended without producing any results
+        """
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """Runs jobs through the OpenAI Files and Batches APIs."""
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        endpoint: str = BATCH_ENDPOINT,
+        completion_window: str = "24h",
+    ):
+        self.client = client
+        self.endpoint = endpoint
+        self.completion_window = completion_window
+
+    async def submit(self, lines: List[dict]) -> str:
+        payload = "".join(json.dumps(line) + "\n" for line in lines)
+        input_file = await self.client.files.create(
+            file=("batch_input.jsonl", io.BytesIO(payload.encode("utf-8"))),
+            purpose="batch",
+        )
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=self.endpoint,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    async def poll(self, job_id: str) -> Optional[List[dict]]:
+        batch = await self.client.batches.retrieve(job_id)
+        if batch.status not in TERMINAL_STATUSES:
+            return None
+
+        results = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                results.extend(_parse_jsonl(content.text))
+
+        if not results:
+            errors = getattr(batch, "errors", None)
+            raise BatchError(f"Batch {job_id} ended as '{batch.status}': {errors}")
+        return results
+
+
+class LocalBatchBackend(BatchBackend):
+    """File-based stand-in that answers batch lines with a local handler.
+
+    Input and output files are written to `directory` in the same JSONL format
+    the hosted API uses, which makes it suitable for tests and offline runs.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict], Awaitable[dict]],
+        directory: Path,
+    ):
+        self.handler = handler
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, job_id: str, kind: str) -> Path:
+        return self.directory / f"{job_id}_{kind}.jsonl"
+
+    async def submit(self, lines: List[dict]) -> str:
+        job_id = f"batch_{uuid.uuid4().hex[:12]}"
+        with open(self._path(job_id, "input"), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(line) + "\n" for line in lines)
+        return job_id
+
+    async def poll(self, job_id: str) -> Optional[List[dict]]:
+        output_path = self._path(job_id, "output")
+        if not output_path.exists():
+            with open(self._path(job_id, "input"), encoding="utf-8") as f:
+                lines = _parse_jsonl(f.read())
+            results = [await self._answer(line) for line in lines]
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(result) + "\n" for result in results)
+
+        with open(output_path, encoding="utf-8") as f:
+            return _parse_jsonl(f.read())
+
+    async def _answer(self, line: dict) -> dict:
+        result: Dict[str, Any] = {
+            "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+            "custom_id": line["custom_id"],
+            "response": None,
+            "error": None,
+        }
+        try:
+            body = await self.handler(line["body"])
+            result["response"] = {"status_code": 200, "body": body}
+        except Exception as e:
+            result["error"] = {"code": type(e).__name__, "message": str(e)}
+        return result
+
+
+def build_request_line(custom_id: str, params: dict) -> dict:
+    """Wrap chat completion parameters as one line of a batch input file."""
+    # Client-side options have no meaning inside a batch body
+    body = {
+        k: v
+        for k, v in params.items()
+        if k not in ("timeout", "stream") and v is not None
+    }
+    if not body.get("tools"):
+        body.pop("tools", None)
+        body.pop("tool_choice", None)
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": body,
+    }
+
+
+def result_error(result: dict) -> Optional[str]:
+    """Describe why a batch result line failed, or None if it succeeded."""
+    if result.get("error"):
+        error = result["error"]
+        return f"{error.get('code')}: {error.get('message')}"
+    response = result.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") != 200:
+        message = body.get("error", {}).get("message", "no response body")
+        return f"HTTP {response.get('status_code')}: {message}"
+    if body.get("error"):
+        return f"API error: {body['error'].get('message')}"
+    if not body.get("choices"):
+        return "Response has no choices"
+    return None
+
+
+async def wait_for_results(
+    backend: BatchBackend,
+    job_id: str,
+    poll_interval: float,
+    timeout: Optional[float] = None,
+) -> List[dict]:
+    """Poll a backend until the job finishes.
+
+    Raises:
+        TimeoutError: If the job is still running after `timeout` seconds
+    """
+    started = time.monotonic()
+    while True:
+        results = await backend.poll(job_id)
+        if results is not None:
+            return results
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Batch {job_id} did not finish within {timeout}s")
+        logger.debug(f"Batch {job_id} still running; polling in {poll_interval}s")
+        await asyncio.sleep(poll_interval)
+
+
+def _parse_jsonl(text: str) -> List[dict]:
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
@@ -1,16 +1,47 @@
+import asyncio
+import functools
 import json
 import sys
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 import boto3
 
 
-# Global variables to track the current tool use ID across function calls
-# Tmp solution
-CURRENT_TOOLUSE_ID = None
+# boto3 is synchronous, so Bedrock calls run on a bounded pool of worker
+# threads instead of blocking the event loop
+MAX_WORKERS = 16
+CONVERSION_CACHE_SIZE = 4096
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix="bedrock"
+            )
+        return _executor
+
+
+@functools.lru_cache(maxsize=None)
+def _get_runtime_client():
+    """Create the bedrock-runtime client once; boto3 clients are thread-safe."""
+    return boto3.client("bedrock-runtime")
+
+
+async def _run_in_executor(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(fn, *args, **kwargs)
+    )
 
 
 # Class to handle OpenAI-style response formatting
@@ -39,7 +70,7 @@ class BedrockClient:
     def __init__(self):
         # Initialize Bedrock client, you need to configure AWS env first
         try:
-            self.client = boto3.client("bedrock-runtime")
+            self.client = _get_runtime_client()
             self.chat = Chat(self.client)
         except Exception as e:
             print(f"Error initializing Bedrock client: {e}")
@@ -52,6 +83,213 @@ class Chat:
         self.completions = ChatCompletions(client)
 
 
+def _text_of(content: Any) -> str:
+    """Flatten OpenAI message content (a string or a list of parts) to text."""
+    if isinstance(content, list):
+        return "".join(
+            item if isinstance(item, str) else item.get("text", "") for item in content
+        )
+    return content or ""
+
+
+@functools.lru_cache(maxsize=CONVERSION_CACHE_SIZE)
+def _convert_message(message_json: str) -> Tuple[str, Dict]:
+    """Convert one OpenAI message to Bedrock format.
+
+    The conversion depends only on the message itself, so it is memoized on
+    the message's JSON and repeated history is converted once per process.
+
+    Returns:
+        Tuple of ("system", system block) or ("message", Bedrock message)
+    """
+    message = json.loads(message_json)
+    role = message.get("role")
+    if role == "system":
+        return "system", {"text": _text_of(message.get("content"))}
+    if role == "user":
+        return "message", {
+            "role": "user",
+            "content": [{"text": _text_of(message.get("content"))}],
+        }
+    if role == "assistant":
+        content = []
+        text = _text_of(message.get("content"))
+        tool_calls = message.get("tool_calls") or []
+        # Bedrock rejects blank text blocks, which tool-only turns often carry
+        if text or not tool_calls:
+            content.append({"text": text})
+        for tool_call in tool_calls:
+            content.append(
+                {
+                    "toolUse": {
+                        "toolUseId": tool_call["id"],
+                        "name": tool_call["function"]["name"],
+                        "input": json.loads(
+                            tool_call["function"].get("arguments") or "{}"
+                        ),
+                    }
+                }
+            )
+        return "message", {"role": "assistant", "content": content}
+    if role == "tool":
+        return "message", {
+            "role": "user",
+            "content": [
+                {
+                    "toolResult": {
+                        "toolUseId": message.get("tool_call_id"),
+                        "content": [{"text": _text_of(message.get("content"))}],
+                    }
+                }
+            ],
+        }
+    raise ValueError(f"Invalid role: {role}")
+
+
+@functools.lru_cache(maxsize=256)
+def _convert_tool(tool_json: str) -> Optional[Dict]:
+    tool = json.loads(tool_json)
+    if tool.get("type") != "function":
+        return None
+    function = tool.get("function", {})
+    return {
+        "toolSpec": {
+            "name": function.get("name", ""),
+            "description": function.get("description", ""),
+            "inputSchema": {
+                "json": {
+                    "type": "object",
+                    "properties": function.get("parameters", {}).get("properties", {}),
+                    "required": function.get("parameters", {}).get("required", []),
+                }
+            },
+        }
+    }
+
+
+class BedrockStream:
+    """Async iterator of OpenAI-style chunks from a Bedrock event stream.
+
+    A worker thread drains the synchronous boto3 event stream and hands each
+    converted chunk to the event loop, so the loop is never blocked while the
+    model generates.
+    """
+
+    _DONE = object()
+
+    def __init__(self, event_stream):
+        self._event_stream = event_stream
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        self._stopped = threading.Event()
+        self._future = self._loop.run_in_executor(_get_executor(), self._produce)
+
+    def _put(self, item) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            # The event loop is gone, so nobody is left to read the stream
+            self._stopped.set()
+
+    def _produce(self) -> None:
+        try:
+            for event in self._event_stream or []:
+                if self._stopped.is_set():
+                    break
+                chunk = self._convert_event(event)
+                if chunk is not None:
+                    self._put(chunk)
+        except Exception as e:
+            self._put(e)
+        finally:
+            self._put(self._DONE)
+
+    @staticmethod
+    def _convert_event(event: dict) -> Optional[OpenAIResponse]:
+        """Convert a converse_stream event to a chat.completion.chunk."""
+        delta: Dict[str, Any] = {"role": None, "content": None, "tool_calls": None}
+        finish_reason = None
+        usage = None
+
+        if "messageStart" in event:
+            delta["role"] = event["messageStart"].get("role", "assistant")
+        elif "contentBlockStart" in event:
+            block = event["contentBlockStart"]
+            tool_use = block.get("start", {}).get("toolUse")
+            if not tool_use:
+                return None
+            delta["tool_calls"] = [
+                {
+                    "index": block.get("contentBlockIndex", 0),
+                    "id": tool_use["toolUseId"],
+                    "type": "function",
+                    "function": {"name": tool_use["name"], "arguments": ""},
+                }
+            ]
+        elif "contentBlockDelta" in event:
+            block = event["contentBlockDelta"]
+            block_delta = block.get("delta", {})
+            if "text" in block_delta:
+                delta["content"] = block_delta["text"]
+            elif "toolUse" in block_delta:
+                delta["tool_calls"] = [
+                    {
+                        "index": block.get("contentBlockIndex", 0),
+                        "id": None,
+                        "type": "function",
+                        "function": {
+                            "name": None,
+                            "arguments": block_delta["toolUse"].get("input", ""),
+                        },
+                    }
+                ]
+            else:
+                return None
+        elif "messageStop" in event:
+            finish_reason = event["messageStop"].get("stopReason", "end_turn")
+        elif "metadata" in event:
+            bedrock_usage = event["metadata"].get("usage", {})
+            usage = {
+                "completion_tokens": bedrock_usage.get("outputTokens", 0),
+                "prompt_tokens": bedrock_usage.get("inputTokens", 0),
+                "total_tokens": bedrock_usage.get("totalTokens", 0),
+            }
+        else:
+            return None
+
+        return OpenAIResponse(
+            {
+                "id": f"chatcmpl-{uuid.uuid4()}",
+                "created": int(time.time()),
+                "object": "chat.completion.chunk",
+                "choices": (
+                    []
+                    if usage
+                    else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                ),
+                "usage": usage,
+            }
+        )
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> OpenAIResponse:
+        item = await self._queue.get()
+        if item is self._DONE:
+            raise StopAsyncIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def aclose(self) -> None:
+        """Stop reading the event stream early."""
+        self._stopped.set()
+        close = getattr(self._event_stream, "close", None)
+        if close:
+            close()
+
+
 # Core class handling chat completions functionality
 class ChatCompletions:
     def __init__(self, client):
@@ -59,76 +297,35 @@ class ChatCompletions:
 
     def _convert_openai_tools_to_bedrock_format(self, tools):
         # Convert OpenAI function calling format to Bedrock tool format
-        bedrock_tools = []
-        for tool in tools:
-            if tool.get("type") == "function":
-                function = tool.get("function", {})
-                bedrock_tool = {
-                    "toolSpec": {
-                        "name": function.get("name", ""),
-                        "description": function.get("description", ""),
-                        "inputSchema": {
-                            "json": {
-                                "type": "object",
-                                "properties": function.get("parameters", {}).get(
-                                    "properties", {}
-                                ),
-                                "required": function.get("parameters", {}).get(
-                                    "required", []
-                                ),
-                            }
-                        },
-                    }
-                }
-                bedrock_tools.append(bedrock_tool)
-        return bedrock_tools
+        converted = (
+            _convert_tool(json.dumps(tool, sort_keys=True, default=str))
+            for tool in tools
+        )
+        return [tool for tool in converted if tool is not None]
 
     def _convert_openai_messages_to_bedrock_format(self, messages):
         # Convert OpenAI message format to Bedrock message format
         bedrock_messages = []
         system_prompt = []
         for message in messages:
-            if message.get("role") == "system":
-                system_prompt = [{"text": message.get("content")}]
-            elif message.get("role") == "user":
-                bedrock_message = {
-                    "role": message.get("role", "user"),
-                    "content": [{"text": message.get("content")}],
-                }
-                bedrock_messages.append(bedrock_message)
-            elif message.get("role") == "assistant":
-                bedrock_message = {
-                    "role": "assistant",
-                    "content": [{"text": message.get("content")}],
-                }
-                openai_tool_calls = message.get("tool_calls", [])
-                if openai_tool_calls:
-                    bedrock_tool_use = {
-                        "toolUseId": openai_tool_calls[0]["id"],
-                        "name": openai_tool_calls[0]["function"]["name"],
-                        "input": json.loads(
-                            openai_tool_calls[0]["function"]["arguments"]
-                        ),
-                    }
-                    bedrock_message["content"].append({"toolUse": bedrock_tool_use})
-                    global CURRENT_TOOLUSE_ID
-                    CURRENT_TOOLUSE_ID = openai_tool_calls[0]["id"]
-                bedrock_messages.append(bedrock_message)
-            elif message.get("role") == "tool":
-                bedrock_message = {
+            kind, converted = _convert_message(
+                json.dumps(message, sort_keys=True, default=str)
+            )
+            if kind == "system":
+                system_prompt = [converted]
+            elif (
+                bedrock_messages
+                and "toolResult" in converted["content"][0]
+                and "toolResult" in bedrock_messages[-1]["content"][0]
+            ):
+                # Results for one turn's parallel tool calls share a user message
+                previous = bedrock_messages[-1]
+                bedrock_messages[-1] = {
                     "role": "user",
-                    "content": [
-                        {
-                            "toolResult": {
-                                "toolUseId": CURRENT_TOOLUSE_ID,
-                                "content": [{"text": message.get("content")}],
-                            }
-                        }
-                    ],
+                    "content": previous["content"] + converted["content"],
                 }
-                bedrock_messages.append(bedrock_message)
             else:
-                raise ValueError(f"Invalid role: {message.get('role')}")
+                bedrock_messages.append(converted)
         return system_prompt, bedrock_messages
 
     def _convert_bedrock_response_to_openai_format(self, bedrock_response):
@@ -146,10 +343,8 @@ class ChatCompletions:
             for content_item in bedrock_response["output"]["message"]["content"]:
                 if content_item.get("toolUse"):
                     bedrock_tool_use = content_item["toolUse"]
-                    global CURRENT_TOOLUSE_ID
-                    CURRENT_TOOLUSE_ID = bedrock_tool_use["toolUseId"]
                     openai_tool_call = {
-                        "id": CURRENT_TOOLUSE_ID,
+                        "id": bedrock_tool_use["toolUseId"],
                         "type": "function",
                         "function": {
                             "name": bedrock_tool_use["name"],
@@ -192,6 +387,28 @@ class ChatCompletions:
         }
         return OpenAIResponse(openai_format)
 
+    def _build_request(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        tools: Optional[List[dict]] = None,
+    ) -> Dict[str, Any]:
+        (
+            system_prompt,
+            bedrock_messages,
+        ) = self._convert_openai_messages_to_bedrock_format(messages)
+        request = {
+            "modelId": model,
+            "system": system_prompt,
+            "messages": bedrock_messages,
+            "inferenceConfig": {"temperature": temperature, "maxTokens": max_tokens},
+        }
+        if tools:
+            request["toolConfig"] = {"tools": tools}
+        return request
+
     async def _invoke_bedrock(
         self,
         model: str,
@@ -203,17 +420,8 @@ class ChatCompletions:
         **kwargs,
     ) -> OpenAIResponse:
         # Non-streaming invocation of Bedrock model
-        (
-            system_prompt,
-            bedrock_messages,
-        ) = self._convert_openai_messages_to_bedrock_format(messages)
-        response = self.client.converse(
-            modelId=model,
-            system=system_prompt,
-            messages=bedrock_messages,
-            inferenceConfig={"temperature": temperature, "maxTokens": max_tokens},
-            toolConfig={"tools": tools} if tools else None,
-        )
+        request = self._build_request(model, messages, max_tokens, temperature, tools)
+        response = await _run_in_executor(self.client.converse, **request)
         openai_response = self._convert_bedrock_response_to_openai_format(response)
         return openai_response
 
@@ -226,76 +434,12 @@ class ChatCompletions:
         tools: Optional[List[dict]] = None,
         tool_choice: Literal["none", "auto", "required"] = "auto",
         **kwargs,
-    ) -> OpenAIResponse:
-        # Streaming invocation of Bedrock model
-        (
-            system_prompt,
-            bedrock_messages,
-        ) = self._convert_openai_messages_to_bedrock_format(messages)
-        response = self.client.converse_stream(
-            modelId=model,
-            system=system_prompt,
-            messages=bedrock_messages,
-            inferenceConfig={"temperature": temperature, "maxTokens": max_tokens},
-            toolConfig={"tools": tools} if tools else None,
-        )
-
-        # Initialize response structure
-        bedrock_response = {
-            "output": {"message": {"role": "", "content": []}},
-            "stopReason": "",
-            "usage": {},
-            "metrics": {},
-        }
-        bedrock_response_text = ""
-        bedrock_response_tool_input = ""
-
-        # Process streaming response
-        stream = response.get("stream")
-        if stream:
-            for event in stream:
-                if event.get("messageStart", {}).get("role"):
-                    bedrock_response["output"]["message"]["role"] = event[
-                        "messageStart"
-                    ]["role"]
-                if event.get("contentBlockDelta", {}).get("delta", {}).get("text"):
-                    bedrock_response_text += event["contentBlockDelta"]["delta"]["text"]
-                    print(
-                        event["contentBlockDelta"]["delta"]["text"], end="", flush=True
-                    )
-                if event.get("contentBlockStop", {}).get("contentBlockIndex") == 0:
-                    bedrock_response["output"]["message"]["content"].append(
-                        {"text": bedrock_response_text}
-                    )
-                if event.get("contentBlockStart", {}).get("start", {}).get("toolUse"):
-                    bedrock_tool_use = event["contentBlockStart"]["start"]["toolUse"]
-                    tool_use = {
-                        "toolUseId": bedrock_tool_use["toolUseId"],
-                        "name": bedrock_tool_use["name"],
-                    }
-                    bedrock_response["output"]["message"]["content"].append(
-                        {"toolUse": tool_use}
-                    )
-                    global CURRENT_TOOLUSE_ID
-                    CURRENT_TOOLUSE_ID = bedrock_tool_use["toolUseId"]
-                if event.get("contentBlockDelta", {}).get("delta", {}).get("toolUse"):
-                    bedrock_response_tool_input += event["contentBlockDelta"]["delta"][
-                        "toolUse"
-                    ]["input"]
-                    print(
-                        event["contentBlockDelta"]["delta"]["toolUse"]["input"],
-                        end="",
-                        flush=True,
-                    )
-                if event.get("contentBlockStop", {}).get("contentBlockIndex") == 1:
-                    bedrock_response["output"]["message"]["content"][1]["toolUse"][
-                        "input"
-                    ] = json.loads(bedrock_response_tool_input)
-        print()
-        openai_response = self._convert_bedrock_response_to_openai_format(
-            bedrock_response
-        )
-        return openai_response
+    ) -> BedrockStream:
+        # Streaming invocation of Bedrock model; opening the stream happens
+        # here so connection errors surface before iteration starts
+        request = self._build_request(model, messages, max_tokens, temperature, tools)
+        response = await _run_in_executor(self.client.converse_stream, **request)
+        return BedrockStream(response.get("stream"))
 
     def create(
         self,
@@ -307,7 +451,7 @@ class ChatCompletions:
         tools: Optional[List[dict]] = None,
         tool_choice: Literal["none", "auto", "required"] = "auto",
         **kwargs,
-    ) -> OpenAIResponse:
+    ):
         # Main entry point for chat completion
         bedrock_tools = []
         if tools is not None:
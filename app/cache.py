@@ -0,0 +1,259 @@
+"""Response caching and request coalescing for LLM calls."""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.config import PROJECT_ROOT, LLMCacheSettings
+from app.logger import logger
+from app.metrics import LLM_CACHE_HITS, LLM_CACHE_MISSES, LLM_COALESCED
+
+
+T = TypeVar("T")
+
+
+class ResponseCache:
+    """Two-tier response cache: an in-process LRU backed by a sqlite store.
+
+    Entries are keyed on a hash of the request payload and stored as strings.
+    Both tiers honour the TTL; the memory tier is bounded by entry count and
+    the disk tier evicts least recently used rows once it exceeds its size.
+    Async callers use `aget` and `aset`, which keep sqlite I/O off the event
+    loop.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_memory_entries: int = 512,
+        max_disk_entries: int = 10000,
+        ttl_seconds: Optional[int] = None,
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_entries = 0
+
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_accessed "
+                "ON responses (accessed_at)"
+            )
+            self._conn.commit()
+            self._disk_entries = self._conn.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    @classmethod
+    def from_settings(cls, settings: LLMCacheSettings) -> "ResponseCache":
+        """Create a cache from the `[llm_cache]` configuration section."""
+        path = Path(settings.path)
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        return cls(
+            path=path,
+            max_memory_entries=settings.max_memory_entries,
+            max_disk_entries=settings.max_disk_entries,
+            ttl_seconds=settings.ttl_seconds,
+        )
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Build a stable key from the request payload."""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and (
+            time.time() - created_at > self.ttl_seconds
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    LLM_CACHE_HITS.inc()
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if not self._expired(created_at):
+                        self._conn.execute(
+                            "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                            (time.time(), key),
+                        )
+                        self._conn.commit()
+                        self._remember(key, created_at, value)
+                        self.hits += 1
+                        LLM_CACHE_HITS.inc()
+                        return value
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._disk_entries -= 1
+
+            self.misses += 1
+            LLM_CACHE_MISSES.inc()
+            return None
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Like `get`, but reads the sqlite tier off the event loop."""
+        if self._conn is None:
+            return self.get(key)
+        with self._lock:
+            entry = self._memory.get(key)
+            fresh = entry is not None and not self._expired(entry[0])
+        if fresh:
+            return self.get(key)  # Served from memory, without touching disk
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """Like `set`, but writes the sqlite tier off the event loop."""
+        if self._conn is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def set(self, key: str, value: str) -> None:
+        """Store value under key in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._conn is None:
+                return
+            try:
+                existed = self._conn.execute(
+                    "SELECT 1 FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                if not existed:
+                    self._disk_entries += 1
+                if self._disk_entries > self.max_disk_entries:
+                    self._evict_disk()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist cached LLM response: {e}")
+
+    def _remember(self, key: str, created_at: float, value: str) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        """Drop expired rows, then least recently used rows beyond the size limit."""
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+        overflow = (
+            self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            - self.max_disk_entries
+        )
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+        self._disk_entries = self._conn.execute(
+            "SELECT COUNT(*) FROM responses"
+        ).fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+                self._disk_entries = 0
+
+    def close(self) -> None:
+        """Close the underlying sqlite connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight await the same result instead of repeating it. If the leading call
+    is cancelled, waiting callers run the work themselves.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.calls = 0  # upstream executions
+        self.saved = 0  # executions avoided by sharing a result
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            future = self._in_flight.get(key)
+            if future is None:
+                break
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    continue  # The leader was cancelled; try again ourselves
+                raise
+            self.saved += 1
+            LLM_COALESCED.inc()
+            logger.debug(f"Coalesced duplicate in-flight request {key[:12]}")
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.calls += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
@@ -0,0 +1,263 @@
+"""Record and replay LLM responses and tool results for offline runs.
+
+While a cassette is recording, every upstream LLM response and every tool
+result is appended to a JSONL file. While it is replaying, the same calls are
+answered from that file without touching the network, the browser or the
+sandbox, so an agent run is repeatable offline and its timing measures only
+the framework's own work.
+
+Example:
+    with use_cassette(Cassette("cassettes/task.jsonl", Cassette.RECORD)):
+        await Manus().run(prompt)
+"""
+
+import functools
+import json
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from pydantic import BaseModel, ValidationError
+
+from app.exceptions import CassetteMiss
+from app.logger import logger
+
+
+_current_cassette: ContextVar[Optional["Cassette"]] = ContextVar(
+    "cassette", default=None
+)
+
+
+def current_cassette() -> Optional["Cassette"]:
+    """The cassette recording or replaying in this context, if any."""
+    return _current_cassette.get()
+
+
+@contextmanager
+def use_cassette(cassette: "Cassette") -> Iterator["Cassette"]:
+    """Record to or replay from cassette for the duration of the block."""
+    token = _current_cassette.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _current_cassette.reset(token)
+        cassette.close()
+
+
+def recorded(key: str) -> Callable:
+    """Capture an async function returning a ToolResult in the active cassette.
+
+    For tool methods called directly rather than through `ToolCollection`,
+    such as the browser state capture that precedes each browsing step.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            cassette = current_cassette()
+            if cassette is None:
+                return await fn(*args, **kwargs)
+            return await cassette.tool_call(key, lambda: fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def _dump(value: Any) -> Any:
+    """Convert an SDK response object into JSON-compatible data."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _dump(item) for key, item in value.items()}
+    if hasattr(value, "__dict__"):
+        return {key: _dump(item) for key, item in vars(value).items()}
+    return value
+
+
+def _load(data: dict, model: type) -> Any:
+    """Rebuild an SDK response object from recorded data."""
+    try:
+        return model.model_validate(data)
+    except ValidationError:
+        # Bedrock responses only mimic the OpenAI shape
+        from app.bedrock import OpenAIResponse
+
+        return OpenAIResponse(data)
+
+
+class _RecordingStream:
+    """Passes a completion stream through, recording its chunks at the end."""
+
+    def __init__(self, cassette: "Cassette", key: str, response):
+        self._cassette = cassette
+        self._key = key
+        self._response = response
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        chunks = []
+        async for chunk in self._response:
+            chunks.append(_dump(chunk))
+            yield chunk
+        self._cassette.record("llm.stream", self._key, {"chunks": chunks})
+
+    async def aclose(self) -> None:
+        """Close the recorded stream; a stream closed early is not recorded."""
+        aclose = getattr(self._response, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def _replay_stream(chunks: List[dict]) -> AsyncIterator[Any]:
+    for chunk in chunks:
+        yield _load(chunk, ChatCompletionChunk)
+
+
+class Cassette:
+    """A JSONL file of recorded LLM responses and tool results.
+
+    Replayed calls are matched on a hash of the request. Repeats of one
+    request are served in the order they were recorded. A request whose hash
+    was never recorded, for example because its prompt embeds a timestamp,
+    falls back to the oldest unused recording of the same kind, so a replay
+    of the same task stays on track. Once nothing is left, `CassetteMiss` is
+    raised rather than making a live call.
+    """
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, path: Path | str, mode: str):
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.recorded = 0
+        self.replayed = 0
+        self.fallbacks = 0
+
+        self._file = None
+        self._responses: List[Any] = []
+        self._used: List[bool] = []
+        self._by_key: Dict[Tuple[str, str], Deque[int]] = defaultdict(deque)
+        self._by_kind: Dict[str, Deque[int]] = defaultdict(deque)
+
+        if mode == self.RECORD:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "w", encoding="utf-8")
+        else:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._add(entry["kind"], entry["key"], entry["response"])
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == self.REPLAY
+
+    def _add(self, kind: str, key: str, response: Any) -> None:
+        index = len(self._responses)
+        self._responses.append(response)
+        self._used.append(False)
+        self._by_key[(kind, key)].append(index)
+        self._by_kind[kind].append(index)
+
+    def record(self, kind: str, key: str, response: Any) -> None:
+        """Append one interaction to the cassette file."""
+        entry = {"kind": kind, "key": key, "response": response}
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        self.recorded += 1
+
+    def take(self, kind: str, key: str) -> Any:
+        """Return the recorded response for a request.
+
+        Raises:
+            CassetteMiss: If no unused recording of this kind is left
+        """
+        index = self._next_unused(self._by_key.get((kind, key)))
+        if index is None:
+            index = self._next_unused(self._by_kind.get(kind))
+            if index is None:
+                raise CassetteMiss(f"No recorded {kind} response left in {self.path}")
+            self.fallbacks += 1
+            logger.warning(
+                f"Cassette has no {kind} recording for this exact request; "
+                "replaying the next one in recorded order"
+            )
+        self._used[index] = True
+        self.replayed += 1
+        return self._responses[index]
+
+    def _next_unused(self, indexes: Optional[Deque[int]]) -> Optional[int]:
+        while indexes:
+            index = indexes.popleft()
+            if not self._used[index]:
+                return index
+        return None
+
+    async def completion(
+        self, key: str, stream: bool, create: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Replay a chat completion, or make it with `create` and record it."""
+        if self.replaying:
+            if stream:
+                return _replay_stream(self.take("llm.stream", key)["chunks"])
+            return _load(self.take("llm", key), ChatCompletion)
+
+        response = await create()
+        if stream:
+            return _RecordingStream(self, key, response)
+        self.record("llm", key, _dump(response))
+        return response
+
+    async def tool_call(self, key: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        """Replay a tool result, or run the tool with `run` and record it."""
+        from app.tool.base import ToolResult
+
+        if self.replaying:
+            recorded = self.take("tool", key)
+            return ToolResult(
+                output=None if recorded["error"] else recorded["text"],
+                error=recorded["error"],
+                base64_image=recorded["base64_image"],
+            )
+
+        result = await run()
+        error = getattr(result, "error", None)
+        self.record(
+            "tool",
+            key,
+            {
+                "text": str(result) if result is not None else "",
+                "error": error,
+                "base64_image": getattr(result, "base64_image", None),
+            },
+        )
+        return result
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+        logger.info(
+            f"📼 Cassette {self.path}: {self.recorded} recorded, "
+            f"{self.replayed} replayed ({self.fallbacks} out of order)"
+        )
@@ -0,0 +1,84 @@
+"""Step-level checkpoints that let an interrupted run continue where it stopped."""
+
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, Field
+
+from app.config import PROJECT_ROOT, config
+from app.schema import AgentState, Memory
+
+
+CheckpointT = TypeVar("CheckpointT", bound=BaseModel)
+
+
+class AgentCheckpoint(BaseModel):
+    """Agent state after its last completed step."""
+
+    run_id: str = Field(..., description="Run the checkpoint belongs to")
+    agent: str = Field(..., description="Name of the checkpointed agent")
+    current_step: int = Field(..., description="Last completed step")
+    state: AgentState = Field(..., description="Agent state after that step")
+    memory: Memory = Field(..., description="Conversation so far")
+    next_step_prompt: Optional[str] = Field(
+        None, description="Next step prompt, which stuck handling may have changed"
+    )
+    results: List[str] = Field(
+        default_factory=list, description="Step results reported so far"
+    )
+    tool_states: Dict[str, dict] = Field(
+        default_factory=dict, description="State of stateful tools, by tool name"
+    )
+    observations: Dict[str, str] = Field(
+        default_factory=dict, description="Spilled observations, by handle"
+    )
+    saved_at: float = Field(default_factory=time.time)
+
+
+class CheckpointStore:
+    """Keeps one JSON checkpoint per key in a directory.
+
+    Checkpoints are written to a temporary file and renamed into place, so a
+    crash mid-write leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+
+    @classmethod
+    def from_config(cls) -> Optional["CheckpointStore"]:
+        """The store configured under [checkpoint], or None when disabled."""
+        settings = config.checkpoint
+        if not settings or not settings.enabled:
+            return None
+        return cls(PROJECT_ROOT / settings.directory)
+
+    def path(self, key: str) -> Path:
+        return self.directory / (re.sub(r"[^\w.-]", "_", key) + ".json")
+
+    def save(self, key: str, checkpoint: BaseModel) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(checkpoint.model_dump_json())
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self, key: str, model: Type[CheckpointT]) -> Optional[CheckpointT]:
+        path = self.path(key)
+        if not path.exists():
+            return None
+        return model.model_validate_json(path.read_text(encoding="utf-8"))
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    def delete(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
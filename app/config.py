@@ -24,9 +24,34 @@ class LLMSettings(BaseModel):
         None,
         description="Maximum input tokens to use across all requests (None for unlimited)",
     )
+    context_window: Optional[int] = Field(
+        None,
+        description="Maximum input tokens of a single request (None for unlimited)",
+    )
     temperature: float = Field(1.0, description="Sampling temperature")
     api_type: str = Field(..., description="Azure, Openai, or Ollama")
     api_version: str = Field(..., description="Azure Openai version if AzureOpenai")
+    rpm: Optional[int] = Field(
+        None, description="Client-side requests per minute limit (None for unlimited)"
+    )
+    tpm: Optional[int] = Field(
+        None, description="Client-side tokens per minute limit (None for unlimited)"
+    )
+    max_concurrency: int = Field(
+        16, description="Maximum number of concurrent requests to this endpoint"
+    )
+    endpoints: List[str] = Field(
+        default_factory=list,
+        description="Names of [llm.*] configs to route between when api_type is 'router'",
+    )
+    hedge_percentile: Optional[float] = Field(
+        95.0,
+        description="Latency percentile after which a router request is hedged (0 or None disables hedging)",
+    )
+    hedge_default_delay: float = Field(
+        10.0,
+        description="Seconds before hedging on an endpoint with no latency samples yet",
+    )
 
 
 class ProxySettings(BaseModel):
@@ -106,6 +131,82 @@ class MCPSettings(BaseModel):
     )
 
 
+class LLMCacheSettings(BaseModel):
+    """Configuration for the LLM response cache"""
+
+    enabled: bool = Field(False, description="Whether to cache LLM responses")
+    path: str = Field(
+        "cache/llm_responses.sqlite",
+        description="Location of the on-disk store, relative to the project root",
+    )
+    max_memory_entries: int = Field(
+        512, description="Maximum number of responses kept in the in-process LRU"
+    )
+    max_disk_entries: int = Field(
+        10000, description="Maximum number of responses kept on disk"
+    )
+    ttl_seconds: Optional[int] = Field(
+        7 * 24 * 3600,
+        description="Seconds before a cached response expires (None for never)",
+    )
+
+
+class CheckpointSettings(BaseModel):
+    """Configuration for step-level agent checkpoints"""
+
+    enabled: bool = Field(False, description="Whether to checkpoint agent runs")
+    directory: str = Field(
+        "checkpoints",
+        description="Directory holding checkpoints, relative to the project root",
+    )
+
+
+class PlanCacheSettings(BaseModel):
+    """Configuration for the plan template cache"""
+
+    enabled: bool = Field(
+        True, description="Whether to reuse plans made for similar requests"
+    )
+    path: str = Field(
+        "cache/plan_templates.json",
+        description="File holding the plan templates, relative to the project root",
+    )
+    threshold: float = Field(
+        1.0,
+        description="Minimum word similarity of a near-matching request; the default 1 only reuses plans of identical templates",
+    )
+    max_entries: int = Field(1000, description="Maximum number of plan templates kept")
+
+
+class PlanStoreSettings(BaseModel):
+    """Configuration for durable plan storage"""
+
+    enabled: bool = Field(
+        False, description="Whether plans are kept on disk and survive restarts"
+    )
+    path: str = Field(
+        "cache/plans.sqlite",
+        description="Location of the plan database, relative to the project root",
+    )
+
+
+class TracingSettings(BaseModel):
+    """Configuration for span tracing"""
+
+    enabled: bool = Field(False, description="Whether to record spans")
+    chrome_trace_path: Optional[str] = Field(
+        "logs/trace.json",
+        description="Chrome trace file spans are appended to, relative to the project root (None disables)",
+    )
+    otlp_endpoint: Optional[str] = Field(
+        None,
+        description="OTLP/HTTP traces endpoint, e.g. http://localhost:4318/v1/traces",
+    )
+    service_name: str = Field(
+        "openmanus", description="Service name reported over OTLP"
+    )
+
+
 class AppConfig(BaseModel):
     llm: Dict[str, LLMSettings]
     sandbox: Optional[SandboxSettings] = Field(
@@ -118,6 +219,21 @@ class AppConfig(BaseModel):
         None, description="Search configuration"
     )
     mcp_config: Optional[MCPSettings] = Field(None, description="MCP configuration")
+    llm_cache: Optional[LLMCacheSettings] = Field(
+        None, description="LLM response cache configuration"
+    )
+    checkpoint: Optional[CheckpointSettings] = Field(
+        None, description="Agent checkpoint configuration"
+    )
+    tracing: Optional[TracingSettings] = Field(
+        None, description="Tracing configuration"
+    )
+    plan_cache: Optional[PlanCacheSettings] = Field(
+        None, description="Plan template cache configuration"
+    )
+    plan_store: Optional[PlanStoreSettings] = Field(
+        None, description="Plan storage configuration"
+    )
 
     class Config:
         arbitrary_types_allowed = True
@@ -172,9 +288,16 @@ class Config:
             "api_key": base_llm.get("api_key"),
             "max_tokens": base_llm.get("max_tokens", 4096),
             "max_input_tokens": base_llm.get("max_input_tokens"),
+            "context_window": base_llm.get("context_window"),
             "temperature": base_llm.get("temperature", 1.0),
             "api_type": base_llm.get("api_type", ""),
             "api_version": base_llm.get("api_version", ""),
+            "rpm": base_llm.get("rpm"),
+            "tpm": base_llm.get("tpm"),
+            "max_concurrency": base_llm.get("max_concurrency", 16),
+            "endpoints": base_llm.get("endpoints", []),
+            "hedge_percentile": base_llm.get("hedge_percentile", 95.0),
+            "hedge_default_delay": base_llm.get("hedge_default_delay", 10.0),
         }
 
         # handle browser config.
@@ -227,6 +350,36 @@ class Config:
         else:
             mcp_settings = MCPSettings()
 
+        llm_cache_config = raw_config.get("llm_cache", {})
+        if llm_cache_config:
+            llm_cache_settings = LLMCacheSettings(**llm_cache_config)
+        else:
+            llm_cache_settings = LLMCacheSettings()
+
+        checkpoint_config = raw_config.get("checkpoint", {})
+        if checkpoint_config:
+            checkpoint_settings = CheckpointSettings(**checkpoint_config)
+        else:
+            checkpoint_settings = CheckpointSettings()
+
+        tracing_config = raw_config.get("tracing", {})
+        if tracing_config:
+            tracing_settings = TracingSettings(**tracing_config)
+        else:
+            tracing_settings = TracingSettings()
+
+        plan_cache_config = raw_config.get("plan_cache", {})
+        if plan_cache_config:
+            plan_cache_settings = PlanCacheSettings(**plan_cache_config)
+        else:
+            plan_cache_settings = PlanCacheSettings()
+
+        plan_store_config = raw_config.get("plan_store", {})
+        if plan_store_config:
+            plan_store_settings = PlanStoreSettings(**plan_store_config)
+        else:
+            plan_store_settings = PlanStoreSettings()
+
         config_dict = {
             "llm": {
                 "default": default_settings,
@@ -239,6 +392,11 @@ class Config:
             "browser_config": browser_settings,
             "search_config": search_settings,
             "mcp_config": mcp_settings,
+            "llm_cache": llm_cache_settings,
+            "checkpoint": checkpoint_settings,
+            "tracing": tracing_settings,
+            "plan_cache": plan_cache_settings,
+            "plan_store": plan_store_settings,
         }
 
         self._config = AppConfig(**config_dict)
@@ -264,6 +422,31 @@ class Config:
         """Get the MCP configuration"""
         return self._config.mcp_config
 
+    @property
+    def llm_cache(self) -> LLMCacheSettings:
+        """Get the LLM response cache configuration"""
+        return self._config.llm_cache
+
+    @property
+    def checkpoint(self) -> CheckpointSettings:
+        """Get the agent checkpoint configuration"""
+        return self._config.checkpoint
+
+    @property
+    def tracing(self) -> TracingSettings:
+        """Get the tracing configuration"""
+        return self._config.tracing
+
+    @property
+    def plan_cache(self) -> PlanCacheSettings:
+        """Get the plan template cache configuration"""
+        return self._config.plan_cache
+
+    @property
+    def plan_store(self) -> PlanStoreSettings:
+        """Get the plan storage configuration"""
+        return self._config.plan_store
+
     @property
     def workspace_root(self) -> Path:
         """Get the workspace root directory"""
@@ -0,0 +1,138 @@
+"""Typed events describing an agent run while it happens.
+
+Agents, tools and the LLM report progress through `emit`, which hands the
+event to the sink installed for the current context. `BaseAgent.run_stream`
+installs a sink and yields the events to its caller; without a sink, `emit`
+returns immediately without building the event.
+
+Events carry the run, agent and step they happened in, taken from the
+labels set by `metric_context`, so events of sub-agents driven by a flow can
+be told apart.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from typing import Any, Callable, Iterator, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.metrics import current_labels
+
+
+class EventType(str, Enum):
+    STEP_START = "step_start"
+    STEP_END = "step_end"
+    THOUGHT = "thought"
+    TEXT_DELTA = "text_delta"
+    TOOL_CALL = "tool_call"
+    TOOL_RESULT = "tool_result"
+    TOKEN_USAGE = "token_usage"
+    FINAL_ANSWER = "final_answer"
+
+
+class AgentEvent(BaseModel):
+    """Base class of the events yielded by `BaseAgent.run_stream`."""
+
+    type: EventType
+    run_id: str = Field(default="", description="Run the event belongs to")
+    agent: str = Field(default="", description="Name of the agent that emitted it")
+    step: int = Field(default=0, description="Step of the agent, 0 outside steps")
+    timestamp: float = Field(default_factory=time.time)
+
+
+class StepStartEvent(AgentEvent):
+    type: Literal[EventType.STEP_START] = EventType.STEP_START
+    max_steps: int
+
+
+class StepEndEvent(AgentEvent):
+    type: Literal[EventType.STEP_END] = EventType.STEP_END
+    result: str
+
+
+class ThoughtEvent(AgentEvent):
+    """Text the model produced alongside, or instead of, tool calls."""
+
+    type: Literal[EventType.THOUGHT] = EventType.THOUGHT
+    content: str
+
+
+class TextDeltaEvent(AgentEvent):
+    """A chunk of a streamed completion, as it arrives."""
+
+    type: Literal[EventType.TEXT_DELTA] = EventType.TEXT_DELTA
+    content: str
+
+
+class ToolCallEvent(AgentEvent):
+    type: Literal[EventType.TOOL_CALL] = EventType.TOOL_CALL
+    tool_call_id: str
+    name: str
+    arguments: str = Field(description="Arguments as the JSON the model produced")
+
+
+class ToolResultEvent(AgentEvent):
+    type: Literal[EventType.TOOL_RESULT] = EventType.TOOL_RESULT
+    tool_call_id: str
+    name: str
+    content: str = Field(description="Observation added to the agent's memory")
+
+
+class TokenUsageEvent(AgentEvent):
+    type: Literal[EventType.TOKEN_USAGE] = EventType.TOKEN_USAGE
+    model: str
+    input_tokens: int
+    completion_tokens: int
+    total_input_tokens: int
+    total_completion_tokens: int
+
+
+class FinalAnswerEvent(AgentEvent):
+    """The run's summary, the same string `BaseAgent.run` returns."""
+
+    type: Literal[EventType.FINAL_ANSWER] = EventType.FINAL_ANSWER
+    content: str
+
+
+EventSink = Callable[[AgentEvent], None]
+
+_event_sink: ContextVar[Optional[EventSink]] = ContextVar("event_sink", default=None)
+
+
+@contextmanager
+def event_sink(sink: EventSink) -> Iterator[None]:
+    """Deliver events emitted inside the block to `sink`."""
+    token = _event_sink.set(sink)
+    try:
+        yield
+    finally:
+        _event_sink.reset(token)
+
+
+def events_enabled() -> bool:
+    """Whether anything receives the events emitted in this context."""
+    return _event_sink.get() is not None
+
+
+def emit(event_type: type, **fields: Any) -> bool:
+    """Build an event and deliver it to the current sink, if there is one.
+
+    Args:
+        event_type: The `AgentEvent` subclass to build
+        **fields: Event fields; run, agent and step default to the labels of
+            the current `metric_context`
+
+    Returns:
+        bool: Whether the event was delivered
+    """
+    sink = _event_sink.get()
+    if sink is None:
+        return False
+    labels = current_labels()
+    fields.setdefault("run_id", labels.get("run", ""))
+    fields.setdefault("agent", labels.get("agent", ""))
+    fields.setdefault("step", int(labels.get("step", 0)))
+    sink(event_type(**fields))
+    return True
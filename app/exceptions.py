@@ -11,3 +11,7 @@ class OpenManusError(Exception):
 
 class TokenLimitExceeded(OpenManusError):
     """Exception raised when the token limit is exceeded"""
+
+
+class CassetteMiss(OpenManusError):
+    """Raised when a replayed cassette has no recording for a request"""
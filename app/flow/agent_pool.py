@@ -0,0 +1,133 @@
+"""Pools of interchangeable executor agents for flows.
+
+A pool builds agents from a factory on demand, up to its size, and leases
+them out one step at a time. Leased agents are reset first, so nothing from
+an earlier step leaks into the next one, while the agent objects and their
+tools are kept: browser contexts, sandboxes and HTTP clients stay warm across
+steps. Steps that run at the same time get different agents.
+
+Example:
+    pool = AgentPool(Manus, max_size=4)
+    async with pool.lease() as agent:
+        await agent.run("Research the history of the company")
+    await pool.cleanup()
+"""
+
+import asyncio
+import inspect
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+
+from app.agent.base import BaseAgent
+from app.logger import logger
+from app.schema import AgentState, Memory
+
+
+AgentBuilder = Callable[[], Union[BaseAgent, Awaitable[BaseAgent]]]
+
+
+class AgentPool:
+    """Leases executor agents built by a factory.
+
+    Args:
+        factory: Builds a new agent, e.g. the agent class; may also be a
+            coroutine function
+        max_size: Maximum number of agents, and so of concurrent leases
+        reset_memory: Whether leased agents start from a fresh or forked
+            memory. When False, an agent keeps its memory between leases.
+    """
+
+    def __init__(
+        self,
+        factory: Optional[AgentBuilder],
+        max_size: int = 4,
+        reset_memory: bool = True,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.factory = factory
+        self.max_size = max_size
+        self.reset_memory = reset_memory
+        self.agents: List[BaseAgent] = []
+        self._idle: List[BaseAgent] = []
+        self._prompts: Dict[int, tuple] = {}
+        self._slots = asyncio.Semaphore(max_size)
+
+    @classmethod
+    def of(cls, agent: BaseAgent) -> "AgentPool":
+        """A pool of one existing agent, which keeps its memory between leases."""
+        pool = cls(None, max_size=1, reset_memory=False)
+        pool._add(agent)
+        pool._idle.append(agent)
+        return pool
+
+    @property
+    def available(self) -> int:
+        """Number of leases that can be granted without waiting."""
+        return self.max_size - self.leased
+
+    @property
+    def leased(self) -> int:
+        return len(self.agents) - len(self._idle)
+
+    @asynccontextmanager
+    async def lease(self, memory: Optional[Memory] = None) -> AsyncIterator[BaseAgent]:
+        """Borrow an agent for the duration of the block.
+
+        Waits while every agent is leased and the pool is full.
+
+        Args:
+            memory: Memory to fork into the agent; a copy is taken, so the
+                original is left untouched. Fresh memory when omitted.
+        """
+        async with self._slots:
+            agent = self._idle.pop() if self._idle else await self._build()
+            self._recycle(agent, memory)
+            try:
+                yield agent
+            finally:
+                self._idle.append(agent)
+
+    async def _build(self) -> BaseAgent:
+        if self.factory is None:
+            raise RuntimeError("Agent pool has no factory to build agents with")
+        agent = self.factory()
+        if inspect.isawaitable(agent):
+            agent = await agent
+        self._add(agent)
+        logger.info(
+            f"🏊 Agent pool built {agent.name} ({len(self.agents)}/{self.max_size})"
+        )
+        return agent
+
+    def _add(self, agent: BaseAgent) -> None:
+        self.agents.append(agent)
+        self._prompts[id(agent)] = (agent.system_prompt, agent.next_step_prompt)
+
+    def _recycle(self, agent: BaseAgent, memory: Optional[Memory]) -> None:
+        """Reset an agent so a new step starts from a clean slate."""
+        agent.state = AgentState.IDLE
+        agent.current_step = 0
+        # Prompts may be amended during a run, e.g. when the agent gets stuck
+        agent.system_prompt, agent.next_step_prompt = self._prompts[id(agent)]
+        if self.reset_memory:
+            agent.memory = (
+                memory.model_copy(deep=True)
+                if memory is not None
+                else Memory(max_messages=agent.memory.max_messages)
+            )
+
+    async def cleanup(self) -> None:
+        """Release the resources of every agent the pool built."""
+        if self.factory is None:
+            return  # The agents belong to whoever passed them in
+        for agent in self.agents:
+            cleanup = getattr(agent, "cleanup", None)
+            if cleanup is None:
+                continue
+            try:
+                await cleanup()
+            except Exception as e:
+                logger.warning(f"Error cleaning up pooled agent {agent.name}: {e}")
+        self.agents.clear()
+        self._idle.clear()
@@ -1,7 +1,8 @@
 from enum import Enum
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
 from app.agent.base import BaseAgent
+from app.flow.agent_pool import AgentBuilder
 from app.flow.base import BaseFlow
 from app.flow.planning import PlanningFlow
 
@@ -17,8 +18,20 @@ class FlowFactory:
     def create_flow(
         flow_type: FlowType,
         agents: Union[BaseAgent, List[BaseAgent], Dict[str, BaseAgent]],
+        executor_factories: Optional[Dict[str, AgentBuilder]] = None,
+        pool_size: int = 4,
         **kwargs,
     ) -> BaseFlow:
+        """Create a flow.
+
+        Args:
+            flow_type: Kind of flow to create
+            agents: Agents of the flow
+            executor_factories: Builders of pooled executor agents, by key,
+                letting steps of one kind run in parallel on separate agents
+            pool_size: Maximum number of agents built per factory
+            **kwargs: Further fields of the flow
+        """
         flows = {
             FlowType.PLANNING: PlanningFlow,
         }
@@ -27,4 +40,9 @@ class FlowFactory:
         if not flow_class:
             raise ValueError(f"Unknown flow type: {flow_type}")
 
-        return flow_class(agents, **kwargs)
+        return flow_class(
+            agents,
+            executor_factories=executor_factories,
+            pool_size=pool_size,
+            **kwargs,
+        )
@@ -0,0 +1,284 @@
+"""Reuse of plans made for similar requests.
+
+Many requests differ only in their parameters: "research acme.com's pricing"
+and "research example.org's pricing" want the same plan. The cache reduces a
+request to a template by replacing the parts that look like parameters
+(URLs, e-mail addresses, domains and file names, quoted strings, numbers and
+proper nouns) with placeholders, and remembers the plan made for each
+template, with the parameters in its steps replaced by slots. A later
+request with the same template, or one similar enough to it, gets that plan
+back with its own parameters filled in, without asking the LLM.
+
+Example:
+    cache = PlanCache()
+    cache.store("Research Acme's website", plan)
+    cache.lookup("Research Globex's website")  # plan, with Acme -> Globex
+"""
+
+import json
+import os
+import re
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.config import PROJECT_ROOT, config
+from app.logger import logger
+from app.metrics import PLAN_CACHE_HITS, PLAN_CACHE_MISSES
+
+
+# Alternatives are tried left to right, so the more specific kinds come first
+_PARAMETER_PATTERN = re.compile(
+    r"(?P<url>https?://[^\s\"'<>]*[^\s\"'<>.,;:!?)])"
+    r"|(?P<email>[\w.+-]+@[\w-]+(?:\.[\w-]+)+)"
+    r"|(?P<dotted>\b[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}\b)"
+    r"|\"(?P<quoted>[^\"]+)\"|(?<!\w)'(?P<single_quoted>[^']+)'(?!\w)"
+    r"|(?P<number>\b\d+(?:[.,:/-]\d+)*\b)"
+    r"|(?P<name>\b[A-Z][\w&-]*(?:[ \t]+[A-Z][\w&-]*)*)"
+)
+_SENTENCE_START = re.compile(r"(?:^|[.!?:]\s+|\n\s*)$")
+_SLOT = re.compile(r"\{\{param(\d+)\}\}")
+_TOKEN = re.compile(r"\{\w+\}|\w+")
+
+
+def parameterize(request: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Split a request into its template and its parameters.
+
+    Returns:
+        The lowercased template, with a `{kind}` placeholder per parameter,
+        and the (kind, value) of each parameter in order
+    """
+    parts, parameters = [], []
+    position = 0
+    for match in _PARAMETER_PATTERN.finditer(request):
+        kind = match.lastgroup
+        value = match.group(kind)
+        # Quotes go into the parameter's placeholder, not the template
+        start, end = match.span() if "quoted" in kind else match.span(kind)
+        if kind == "name" and _SENTENCE_START.search(request[:start]):
+            # A capital at the start of a sentence says nothing about the word
+            rest = value.partition(" ")[2].strip()
+            if not rest:
+                continue
+            start, value = end - len(rest), rest
+        kind = "quoted" if kind == "single_quoted" else kind
+        parts.append(request[position:start])
+        parts.append("{" + kind + "}")
+        parameters.append((kind, value))
+        position = end
+    parts.append(request[position:])
+    template = " ".join("".join(parts).lower().split())
+    return template, parameters
+
+
+class PlanTemplate(BaseModel):
+    """A cached plan, with slots where the parameters of its request went."""
+
+    template: str = Field(..., description="Template of the request")
+    kinds: List[str] = Field(..., description="Kind of each parameter, in order")
+    title: str = Field(..., description="Plan title, with parameter slots")
+    steps: List[str] = Field(..., description="Plan steps, with parameter slots")
+    step_dependencies: Optional[List[List[int]]] = Field(
+        None, description="Earlier steps each step waits for"
+    )
+    hits: int = Field(0, description="Number of times the plan was reused")
+    last_used: float = Field(default_factory=time.time)
+
+    def fill(self, values: List[str]) -> dict:
+        """The plan with the slots replaced by `values`."""
+
+        def substitute(text: str) -> str:
+            return _SLOT.sub(lambda m: values[int(m.group(1))], text)
+
+        return {
+            "title": substitute(self.title),
+            "steps": [substitute(step) for step in self.steps],
+            "step_dependencies": self.step_dependencies,
+        }
+
+
+class PlanCache:
+    """Plans by request template, with a similarity index for near matches.
+
+    Requests with the same template reuse a plan directly. Otherwise the
+    templates sharing a word with the request are scored by the Jaccard
+    similarity of their words, and the best one is reused if it scores at
+    least `threshold` and has the same kinds of parameters. Templates are
+    persisted to a JSON file, when given a path, so they outlive the process.
+
+    Args:
+        path: JSON file templates are loaded from and saved to
+        threshold: Minimum similarity of a near match, in [0, 1]; the
+            default 1 only reuses plans of identical templates, as a near
+            match can differ from the request in more than its parameters
+        max_entries: Maximum number of templates; the least recently used
+            go first
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        threshold: float = 1.0,
+        max_entries: int = 1000,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, PlanTemplate] = {}
+        self._index: Dict[str, Set[str]] = defaultdict(set)
+        self._template_tokens: Dict[str, Set[str]] = {}
+        if path is not None and path.exists():
+            self._load()
+
+    @classmethod
+    def from_config(cls) -> Optional["PlanCache"]:
+        """The cache configured under [plan_cache], or None when disabled."""
+        settings = config.plan_cache
+        if not settings or not settings.enabled:
+            return None
+        path = Path(settings.path)
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        return cls(path, threshold=settings.threshold, max_entries=settings.max_entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def lookup(self, request: str) -> Optional[dict]:
+        """The cached plan for a request, filled with its parameters.
+
+        Returns:
+            The title, steps and step dependencies of the plan, or None on a
+            miss
+        """
+        template, parameters = parameterize(request)
+        entry = self._match(template, [kind for kind, _ in parameters])
+        if entry is None:
+            self.misses += 1
+            PLAN_CACHE_MISSES.inc()
+            return None
+
+        self.hits += 1
+        PLAN_CACHE_HITS.inc()
+        entry.hits += 1
+        entry.last_used = time.time()
+        if entry.template != template:
+            logger.info(
+                f"📋 Reusing the plan of the near match '{entry.template}' "
+                f"for '{template}'"
+            )
+        logger.info(
+            f"📋 Reusing the cached plan for '{entry.template}' "
+            f"(hit rate {self.hit_rate:.0%})"
+        )
+        return entry.fill([value for _, value in parameters])
+
+    def store(self, request: str, plan: dict) -> None:
+        """Remember the plan made for a request.
+
+        Args:
+            request: The request the plan was made for
+            plan: Plan with at least a title and steps, as kept by the
+                planning tool
+        """
+        template, parameters = parameterize(request)
+        texts = [plan["title"], *plan["steps"]]
+        if any(_SLOT.search(text) for text in texts):
+            return  # The slots could not be told apart from the plan's text
+
+        # Longest first, so a parameter inside another one is not split up
+        order = sorted(
+            range(len(parameters)), key=lambda i: len(parameters[i][1]), reverse=True
+        )
+        for i in order:
+            value = re.compile(rf"(?<!\w){re.escape(parameters[i][1])}(?!\w)")
+            texts = [value.sub(f"{{{{param{i}}}}}", text) for text in texts]
+
+        self._remove(template)
+        self._add(
+            PlanTemplate(
+                template=template,
+                kinds=[kind for kind, _ in parameters],
+                title=texts[0],
+                steps=texts[1:],
+                step_dependencies=plan.get("step_dependencies"),
+            )
+        )
+        while len(self._entries) > self.max_entries:
+            self._remove(
+                min(self._entries.values(), key=lambda e: e.last_used).template
+            )
+        self.save()
+
+    def _match(self, template: str, kinds: List[str]) -> Optional[PlanTemplate]:
+        entry = self._entries.get(template)
+        if entry is not None or self.threshold >= 1:
+            return entry
+
+        # Words shared with each template that has any, from the index
+        tokens = self._tokens(template)
+        shared = Counter()
+        for token in tokens:
+            shared.update(self._index.get(token, ()))
+
+        best, best_score = None, self.threshold
+        for candidate, common in shared.items():
+            union = len(tokens) + len(self._template_tokens[candidate]) - common
+            score = common / union
+            if score >= best_score and self._entries[candidate].kinds == kinds:
+                best, best_score = self._entries[candidate], score
+        return best
+
+    @staticmethod
+    def _tokens(template: str) -> Set[str]:
+        return set(_TOKEN.findall(template))
+
+    def _add(self, entry: PlanTemplate) -> None:
+        self._entries[entry.template] = entry
+        tokens = self._template_tokens[entry.template] = self._tokens(entry.template)
+        for token in tokens:
+            self._index[token].add(entry.template)
+
+    def _remove(self, template: str) -> None:
+        if self._entries.pop(template, None) is None:
+            return
+        for token in self._template_tokens.pop(template):
+            self._index[token].discard(template)
+            if not self._index[token]:
+                del self._index[token]
+
+    def _load(self) -> None:
+        try:
+            entries = json.loads(self.path.read_text(encoding="utf-8"))
+            for entry in entries:
+                self._add(PlanTemplate.model_validate(entry))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable plan cache {self.path}: {e}")
+
+    def save(self) -> None:
+        """Write the templates to the cache file, if there is one."""
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump([e.model_dump() for e in self._entries.values()], f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Failed to save plan cache {self.path}: {e}")
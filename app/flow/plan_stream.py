@@ -0,0 +1,82 @@
+"""Read plan steps out of `planning` tool-call arguments while they stream."""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class PlanStepParser:
+    """Incrementally scans the JSON arguments of a `planning` call.
+
+    Each string of the top-level `steps` array is reported as soon as its
+    closing quote arrives, long before the whole arguments object parses.
+    Other top-level string fields, such as the title, are collected in
+    `fields`.
+
+    Example:
+        parser = PlanStepParser()
+        parser.feed('{"title": "Trip", "steps": ["Book fli')
+        parser.feed('ghts", "Book ho')  # -> ["Book flights"]
+    """
+
+    def __init__(self):
+        self.steps: List[str] = []
+        self.fields: Dict[str, Any] = {}
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._key: Optional[str] = None
+        self._expect_value = False
+        self._in_steps = False
+
+    def feed(self, fragment: str) -> List[str]:
+        """Consume the next fragment and return the steps it completed."""
+        self._buffer += fragment
+        completed = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    step = self._on_string(
+                        json.loads(buffer[self._string_start : i + 1])
+                    )
+                    if step is not None:
+                        completed.append(step)
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                if char == "[" and self._depth == 1 and self._key == "steps":
+                    self._in_steps = True
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._in_steps = False
+                    self._expect_value = False
+            elif char == ":" and self._depth == 1:
+                self._expect_value = True
+            elif char == "," and self._depth == 1:
+                self._expect_value = False
+        self._pos = len(buffer)
+        return completed
+
+    def _on_string(self, value: str) -> Optional[str]:
+        if self._depth == 1:
+            if self._expect_value:
+                self.fields[self._key] = value
+                self._expect_value = False
+            else:
+                self._key = value
+        elif self._in_steps and self._depth == 2:
+            self.steps.append(value)
+            return value
+        return None
@@ -1,15 +1,25 @@
+import asyncio
 import json
+import re
 import time
+import uuid
+from collections import Counter
 from enum import Enum
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
-from pydantic import Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from app.agent.base import BaseAgent
+from app.checkpoint import CheckpointStore
+from app.exceptions import ToolError
+from app.flow.agent_pool import AgentBuilder, AgentPool
 from app.flow.base import BaseFlow
+from app.flow.plan_cache import PlanCache
+from app.flow.plan_stream import PlanStepParser
 from app.llm import LLM
 from app.logger import logger
-from app.schema import AgentState, Message, ToolChoice
+from app.sandbox.client import get_sandbox_client, shared_sandbox
+from app.schema import AgentState, Memory, Message, ToolChoice
 from app.tool import PlanningTool
 
 
@@ -42,18 +52,81 @@ class PlanStepStatus(str, Enum):
         }
 
 
+class FlowCheckpoint(BaseModel):
+    """Planning flow state after its last completed plan step."""
+
+    run_id: str = Field(..., description="Run the checkpoint belongs to")
+    active_plan_id: str = Field(..., description="Plan being executed")
+    planning_state: dict = Field(..., description="State of the planning tool")
+    agent_memories: Dict[str, Memory] = Field(
+        default_factory=dict, description="Memory of each agent, by agent key"
+    )
+    agent_observations: Dict[str, Dict[str, str]] = Field(
+        default_factory=dict,
+        description="Spilled observations of each agent's memory, by agent key",
+    )
+    result: str = Field("", description="Step results reported so far")
+    saved_at: float = Field(default_factory=time.time)
+
+
 class PlanningFlow(BaseFlow):
     """A flow that manages planning and execution of tasks using agents."""
 
     llm: LLM = Field(default_factory=lambda: LLM())
     planning_tool: PlanningTool = Field(default_factory=PlanningTool)
     executor_keys: List[str] = Field(default_factory=list)
-    active_plan_id: str = Field(default_factory=lambda: f"plan_{int(time.time())}")
+    active_plan_id: str = Field(default_factory=lambda: f"plan_{uuid.uuid4().hex[:12]}")
     current_step_index: Optional[int] = None
+    max_parallel_steps: int = Field(
+        default=4, description="Maximum number of plan steps executed at once"
+    )
+    executor_pools: Dict[str, AgentPool] = Field(
+        default_factory=dict,
+        description="Pools leasing the agents that execute steps, by executor key",
+    )
+    stream_planning: bool = Field(
+        default=False,
+        description="Stream the planning response and start the first step before the rest of the plan is generated",
+    )
+    delta_plan_prompts: bool = Field(
+        default=True,
+        description="Show executors the plan's progress and the steps changed since they last saw it, instead of the whole plan",
+    )
+    fork_step_memory: bool = Field(
+        default=False,
+        description="Start each pooled step from a copy of the memory of the step it depends on, instead of an empty memory",
+    )
+    plan_cache: Optional[PlanCache] = Field(
+        default_factory=PlanCache.from_config,
+        description="Reuses the plans of similar earlier requests; None disables it",
+    )
+    run_id: str = Field(default_factory=lambda: uuid.uuid4().hex[:8])
+    checkpoint_store: Optional[CheckpointStore] = Field(
+        default_factory=CheckpointStore.from_config,
+        description="Where plan step checkpoints are saved; None disables them",
+    )
+
+    # Memory each step finished with, for steps forking it
+    _step_memories: Dict[int, Memory] = PrivateAttr(default_factory=dict)
+    _terminated: bool = PrivateAttr(default=False)
+    # Plan version each executor that keeps its memory last saw, by id
+    _plan_versions_seen: Dict[int, int] = PrivateAttr(default_factory=dict)
 
     def __init__(
-        self, agents: Union[BaseAgent, List[BaseAgent], Dict[str, BaseAgent]], **data
+        self,
+        agents: Union[BaseAgent, List[BaseAgent], Dict[str, BaseAgent]],
+        executor_factories: Optional[Dict[str, AgentBuilder]] = None,
+        pool_size: int = 4,
+        **data,
     ):
+        """
+        Args:
+            agents: Agents of the flow; the primary one also summarizes the plan
+            executor_factories: Builders of pooled executor agents, by executor
+                key. Up to `pool_size` agents are built per key, so steps of
+                one kind can run in parallel.
+            pool_size: Maximum number of agents built per executor factory
+        """
         # Set executor keys before super().__init__
         if "executors" in data:
             data["executor_keys"] = data.pop("executors")
@@ -70,9 +143,15 @@ class PlanningFlow(BaseFlow):
         # Call parent's init with the processed data
         super().__init__(agents, **data)
 
+        for key, factory in (executor_factories or {}).items():
+            self.executor_pools.setdefault(key, AgentPool(factory, max_size=pool_size))
+        # Agents passed in directly execute one step at a time, keeping memory
+        for key, agent in self.agents.items():
+            self.executor_pools.setdefault(key, AgentPool.of(agent))
+
         # Set executor_keys to all agent keys if not specified
         if not self.executor_keys:
-            self.executor_keys = list(self.agents.keys())
+            self.executor_keys = list(executor_factories or self.agents.keys())
 
     def get_executor(self, step_type: Optional[str] = None) -> BaseAgent:
         """
@@ -98,8 +177,12 @@ class PlanningFlow(BaseFlow):
                 raise ValueError("No primary agent available")
 
             # Create initial plan if input provided
+            running = None
             if input_text:
-                await self._create_initial_plan(input_text)
+                if self.stream_planning:
+                    running = await self._create_initial_plan_streaming(input_text)
+                else:
+                    await self._create_initial_plan(input_text)
 
                 # Verify plan was created successfully
                 if self.active_plan_id not in self.planning_tool.plans:
@@ -107,47 +190,187 @@ class PlanningFlow(BaseFlow):
                         f"Plan creation failed. Plan ID {self.active_plan_id} not found in planning tool."
                     )
                     return f"Failed to create plan for: {input_text}"
+                self._save_checkpoint("")
 
-            result = ""
-            while True:
-                # Get current step to execute
-                self.current_step_index, step_info = await self._get_current_step_info()
+            return await self._execute_plan(running=running)
+        except Exception as e:
+            logger.error(f"Error in PlanningFlow: {str(e)}")
+            return f"Execution failed: {str(e)}"
 
-                # Exit if no more steps or plan completed
-                if self.current_step_index is None:
-                    result += await self._finalize_plan()
-                    break
+    async def resume(self, run_id: str) -> str:
+        """Continue an interrupted flow from its last completed plan step.
 
-                # Execute current step with appropriate agent
-                step_type = step_info.get("type") if step_info else None
-                executor = self.get_executor(step_type)
-                step_result = await self._execute_step(executor, step_info)
-                result += step_result + "\n"
+        A step that was interrupted midway continues from its executor's last
+        completed agent step when the executor checkpointed one.
 
-                # Check if agent wants to terminate
-                if hasattr(executor, "state") and executor.state == AgentState.FINISHED:
-                    break
+        Raises:
+            RuntimeError: If checkpoints are disabled.
+            ValueError: If there is no checkpoint for the run.
+        """
+        if not self.checkpoint_store:
+            raise RuntimeError("Checkpoints are disabled for this flow")
+        checkpoint = self.checkpoint_store.load(f"{run_id}-flow", FlowCheckpoint)
+        if checkpoint is None:
+            raise ValueError(f"No checkpoint for flow run {run_id}")
+
+        self.run_id = run_id
+        self.active_plan_id = checkpoint.active_plan_id
+        self.planning_tool.load_state_dict(checkpoint.planning_state)
+        for key, memory in checkpoint.agent_memories.items():
+            if key in self.agents:
+                self.agents[key].memory = memory
+                memory.observation_store().load(
+                    checkpoint.agent_observations.get(key, {})
+                )
+        logger.info(f"♻️ Resuming flow run {run_id} on plan {self.active_plan_id}")
 
-            return result
+        try:
+            return await self._execute_plan(checkpoint.result)
         except Exception as e:
             logger.error(f"Error in PlanningFlow: {str(e)}")
             return f"Execution failed: {str(e)}"
 
-    async def _create_initial_plan(self, request: str) -> None:
-        """Create an initial plan based on the request using the flow's LLM and PlanningTool."""
-        logger.info(f"Creating initial plan with ID: {self.active_plan_id}")
+    async def _execute_plan(
+        self,
+        result: str = "",
+        running: Optional[Dict[asyncio.Task, Tuple[int, str]]] = None,
+    ) -> str:
+        """Execute the remaining steps of the active plan.
+
+        Every step whose dependencies are completed is started at once, on an
+        agent leased from its executor's pool, up to `max_parallel_steps` at a
+        time. Plans without dependencies run one step after another.
+
+        A step that fails is marked blocked and not retried. The steps that
+        depend on it, directly or not, are skipped and stay not started,
+        while independent steps run on; the summary reports both. In plans
+        without dependencies every later step depends on the one before, so
+        a failure ends the plan there.
+
+        Args:
+            result: Step results reported so far
+            running: Steps started before the plan was complete, by task
+        """
+        running = running if running is not None else {}
+        self._terminated = False
+        try:
+            while True:
+                if not self._terminated:
+                    await self._start_ready_steps(running)
+                if not running:
+                    break
 
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in sorted(done, key=lambda t: running[t][0]):
+                    running.pop(task)
+                    result += task.result() + "\n"
+                self._save_checkpoint(result)
+        finally:
+            for task in running:
+                task.cancel()
+            # Let cancelled steps finish unwinding, releasing their leases
+            await asyncio.gather(*running, return_exceptions=True)
+
+        # Stop without a summary if an executor asked to terminate
+        if not self._terminated:
+            result += await self._finalize_plan()
+        if self.checkpoint_store:
+            self.checkpoint_store.delete(f"{self.run_id}-flow")
+        return result
+
+    async def _start_ready_steps(
+        self, running: Dict[asyncio.Task, Tuple[int, str]]
+    ) -> None:
+        """Start ready steps on idle executors, recording them in `running`."""
+        started = {index for index, _ in running.values()}
+        leases = Counter(key for _, key in running.values())
+        for index, step_info in self._get_ready_steps():
+            if len(running) >= self.max_parallel_steps:
+                return
+            if index in started:
+                continue
+            executor_key = self._idle_executor_key(step_info.get("type"), leases)
+            if executor_key is None:
+                continue
+
+            await self._mark_step(index, PlanStepStatus.IN_PROGRESS)
+            self.current_step_index = index
+            leases[executor_key] += 1
+            task = asyncio.create_task(self._execute_step(executor_key, step_info))
+            running[task] = (index, executor_key)
+
+    def _idle_executor_key(
+        self, step_type: Optional[str], leases: Counter
+    ) -> Optional[str]:
+        """Key of the executor that should take a step, or None if it is busy.
+
+        Steps of a type naming an executor wait for that executor; other steps
+        take any executor whose pool has an agent to spare.
+        """
+        if step_type and step_type in self.executor_pools:
+            keys = [step_type]
+        else:
+            keys = [key for key in self.executor_keys if key in self.executor_pools]
+            keys = keys or [self.primary_agent_key]
+        for key in keys:
+            if leases[key] < self.executor_pools[key].max_size:
+                return key
+        return None
+
+    async def cleanup(self) -> None:
+        """Clean up the agents built by executor pools and the steps' sandbox."""
+        for pool in self.executor_pools.values():
+            await pool.cleanup()
+        await get_sandbox_client().cleanup()
+
+    def _save_checkpoint(self, result: str) -> None:
+        if not self.checkpoint_store:
+            return
+        self.checkpoint_store.save(
+            f"{self.run_id}-flow",
+            FlowCheckpoint(
+                run_id=self.run_id,
+                active_plan_id=self.active_plan_id,
+                planning_state=self.planning_tool.state_dict(),
+                agent_memories={
+                    key: agent.memory for key, agent in self.agents.items()
+                },
+                agent_observations={
+                    key: agent.memory.observation_store().dump()
+                    for key, agent in self.agents.items()
+                },
+                result=result,
+            ),
+        )
+
+    def _planning_messages(self, request: str) -> Tuple[Message, Message]:
+        """System and user messages asking the LLM to plan the request."""
         # Create a system message for plan creation
         system_message = Message.system_message(
             "You are a planning assistant. Create a concise, actionable plan with clear steps. "
             "Focus on key milestones rather than detailed sub-steps. "
-            "Optimize for clarity and efficiency."
+            "Optimize for clarity and efficiency. "
+            "When some steps do not depend on each other, say so with step_dependencies so they can run in parallel."
         )
 
         # Create a user message with the request
         user_message = Message.user_message(
             f"Create a reasonable plan with clear steps to accomplish the task: {request}"
         )
+        return system_message, user_message
+
+    async def _create_initial_plan(self, request: str) -> None:
+        """Create an initial plan based on the request using the flow's LLM and PlanningTool."""
+        logger.info(f"Creating initial plan with ID: {self.active_plan_id}")
+        if await self._create_plan_from_cache(request):
+            return
+        await self._request_plan(request)
+
+    async def _request_plan(self, request: str) -> None:
+        """Ask the LLM for a plan of the request."""
+        system_message, user_message = self._planning_messages(request)
 
         # Call LLM with PlanningTool
         response = await self.llm.ask_tool(
@@ -161,106 +384,253 @@ class PlanningFlow(BaseFlow):
         if response.tool_calls:
             for tool_call in response.tool_calls:
                 if tool_call.function.name == "planning":
-                    # Parse the arguments
-                    args = tool_call.function.arguments
-                    if isinstance(args, str):
-                        try:
-                            args = json.loads(args)
-                        except json.JSONDecodeError:
-                            logger.error(f"Failed to parse tool arguments: {args}")
+                    if await self._apply_planning_call(tool_call.function.arguments):
+                        self._cache_plan(request)
+                        return
+
+        await self._create_default_plan(request)
+
+    async def _create_initial_plan_streaming(
+        self, request: str
+    ) -> Dict[asyncio.Task, Tuple[int, str]]:
+        """Create the initial plan from a streamed LLM response.
+
+        The first step cannot depend on any other, so it starts as soon as
+        its text has streamed, under a provisional one-step plan that the
+        complete plan then updates. Falls back to a non-streamed request if
+        the stream fails or ends without a complete, valid plan.
+
+        Returns:
+            The steps already running, for `_execute_plan`
+        """
+        logger.info(f"Creating initial plan with ID: {self.active_plan_id} (streaming)")
+        if await self._create_plan_from_cache(request):
+            return {}
+        system_message, user_message = self._planning_messages(request)
+
+        running: Dict[asyncio.Task, Tuple[int, str]] = {}
+        parser = PlanStepParser()
+        planning_call = None
+        try:
+            stream = await self.llm.ask_tool_stream(
+                messages=[user_message],
+                system_msgs=[system_message],
+                tools=[self.planning_tool.to_param()],
+                tool_choice=ToolChoice.AUTO,
+            )
+            # Leaving early once the plan is applied still frees the stream
+            async with stream:
+                async for event in stream:
+                    if event.arguments_delta and event.tool_name == "planning":
+                        if planning_call is None:
+                            planning_call = event.tool_call_index
+                        if event.tool_call_index != planning_call:
                             continue
+                        steps = parser.feed(event.arguments_delta)
+                        if steps and not running:
+                            title = parser.fields.get("title") or self._default_title(
+                                request
+                            )
+                            running = await self._start_first_step(title, steps[0])
+                    elif (
+                        event.tool_call and event.tool_call.function.name == "planning"
+                    ):
+                        if await self._apply_planning_call(
+                            event.tool_call.function.arguments
+                        ):
+                            self._cache_plan(request)
+                            return running
+        except Exception as e:
+            logger.warning(f"Streaming plan creation failed, retrying without: {e}")
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            self.planning_tool.plans.pop(self.active_plan_id, None)
+            await self._request_plan(request)
+            return {}
+
+        if running:
+            # The stream ended without a usable plan, so only the provisional
+            # one-step plan exists; ask again to complete it
+            logger.warning("Streamed plan was incomplete, requesting it again")
+            try:
+                await self._request_plan(request)
+            except Exception as e:
+                logger.warning(f"Plan request failed: {e}")
+                await self._create_default_plan(request)
+        elif self.active_plan_id not in self.planning_tool.plans:
+            await self._create_default_plan(request)
+        return running
+
+    async def _start_first_step(
+        self, title: str, step: str
+    ) -> Dict[asyncio.Task, Tuple[int, str]]:
+        """Start the first step of a plan that is still being generated."""
+        await self.planning_tool.execute(
+            command="create", plan_id=self.active_plan_id, title=title, steps=[step]
+        )
+        step_info = self._step_info(0, step)
+        executor_key = self._idle_executor_key(step_info.get("type"), Counter())
+        await self._mark_step(0, PlanStepStatus.IN_PROGRESS)
+        self.current_step_index = 0
+        logger.info("⚡ Starting the first step while the rest of the plan streams")
+        task = asyncio.create_task(self._execute_step(executor_key, step_info))
+        return {task: (0, executor_key)}
+
+    async def _apply_planning_call(self, args: Union[str, dict]) -> bool:
+        """Run a planning tool call from the LLM against the active plan.
+
+        Returns:
+            bool: Whether the arguments could be parsed and were applied
+        """
+        # Parse the arguments
+        if isinstance(args, str):
+            try:
+                args = json.loads(args)
+            except json.JSONDecodeError:
+                logger.error(f"Failed to parse tool arguments: {args}")
+                return False
+
+        # Ensure plan_id is set correctly and execute the tool
+        args["plan_id"] = self.active_plan_id
+        if args.get("command") == "create" and (
+            self.active_plan_id in self.planning_tool.plans
+        ):
+            # Replace the provisional plan of a streamed response, keeping
+            # the status of the steps already started
+            args["command"] = "update"
+
+        steps = args.get("steps")
+        if steps is None and args.get("command") == "update":
+            plan = self.planning_tool.plans.get(self.active_plan_id)
+            steps = plan["steps"] if plan else None
+        if isinstance(steps, list) and args.get("step_dependencies") is not None:
+            try:
+                self.planning_tool.validate_dependencies(
+                    steps, args["step_dependencies"]
+                )
+            except ToolError as e:
+                # A bad graph is no reason to lose the plan; run it in order
+                logger.warning(f"Running the plan's steps in order instead: {e}")
+                args.pop("step_dependencies")
+
+        result = await self.planning_tool.execute(**args)
+        logger.info(f"Plan creation result: {str(result)}")
+        return True
 
-                    # Ensure plan_id is set correctly and execute the tool
-                    args["plan_id"] = self.active_plan_id
+    async def _create_plan_from_cache(self, request: str) -> bool:
+        """Create the active plan from the plan of a similar earlier request.
+
+        Returns:
+            bool: Whether the plan cache had a plan for the request
+        """
+        if self.plan_cache is None:
+            return False
+        plan = self.plan_cache.lookup(request)
+        if plan is None:
+            return False
+        try:
+            await self.planning_tool.execute(
+                command="create", plan_id=self.active_plan_id, **plan
+            )
+        except Exception as e:
+            logger.warning(f"Cached plan could not be used, planning anew: {e}")
+            self.planning_tool.plans.pop(self.active_plan_id, None)
+            return False
+        return True
 
-                    # Execute the tool via ToolCollection instead of directly
-                    result = await self.planning_tool.execute(**args)
+    def _cache_plan(self, request: str) -> None:
+        """Remember the plan the LLM made for the request."""
+        if (
+            self.plan_cache is not None
+            and self.active_plan_id in self.planning_tool.plans
+        ):
+            self.plan_cache.store(
+                request, self.planning_tool.plans[self.active_plan_id]
+            )
 
-                    logger.info(f"Plan creation result: {str(result)}")
-                    return
+    @staticmethod
+    def _default_title(request: str) -> str:
+        return f"Plan for: {request[:50]}{'...' if len(request) > 50 else ''}"
 
+    async def _create_default_plan(self, request: str) -> None:
         # If execution reached here, create a default plan
         logger.warning("Creating default plan")
+        steps = ["Analyze request", "Execute task", "Verify results"]
+        command = "create"
+        provisional = self.planning_tool.plans.get(self.active_plan_id)
+        if provisional:
+            # Keep the steps of a provisional plan, which may already be running
+            steps = provisional["steps"] + steps[len(provisional["steps"]) :]
+            command = "update"
 
         # Create default plan using the ToolCollection
         await self.planning_tool.execute(
             **{
-                "command": "create",
+                "command": command,
                 "plan_id": self.active_plan_id,
-                "title": f"Plan for: {request[:50]}{'...' if len(request) > 50 else ''}",
-                "steps": ["Analyze request", "Execute task", "Verify results"],
+                "title": self._default_title(request),
+                "steps": steps,
             }
         )
 
-    async def _get_current_step_info(self) -> tuple[Optional[int], Optional[dict]]:
+    def _get_ready_steps(self) -> List[Tuple[int, dict]]:
         """
-        Parse the current plan to identify the first non-completed step's index and info.
-        Returns (None, None) if no active step is found.
+        Find the steps of the active plan that can start now.
+        Returns (index, step info) pairs in plan order.
         """
         if (
             not self.active_plan_id
             or self.active_plan_id not in self.planning_tool.plans
         ):
             logger.error(f"Plan with ID {self.active_plan_id} not found")
-            return None, None
-
-        try:
-            # Direct access to plan data from planning tool storage
-            plan_data = self.planning_tool.plans[self.active_plan_id]
-            steps = plan_data.get("steps", [])
-            step_statuses = plan_data.get("step_statuses", [])
-
-            # Find first non-completed step
-            for i, step in enumerate(steps):
-                if i >= len(step_statuses):
-                    status = PlanStepStatus.NOT_STARTED.value
-                else:
-                    status = step_statuses[i]
-
-                if status in PlanStepStatus.get_active_statuses():
-                    # Extract step type/category if available
-                    step_info = {"text": step}
-
-                    # Try to extract step type from the text (e.g., [SEARCH] or [CODE])
-                    import re
-
-                    type_match = re.search(r"\[([A-Z_]+)\]", step)
-                    if type_match:
-                        step_info["type"] = type_match.group(1).lower()
-
-                    # Mark current step as in_progress
-                    try:
-                        await self.planning_tool.execute(
-                            command="mark_step",
-                            plan_id=self.active_plan_id,
-                            step_index=i,
-                            step_status=PlanStepStatus.IN_PROGRESS.value,
-                        )
-                    except Exception as e:
-                        logger.warning(f"Error marking step as in_progress: {e}")
-                        # Update step status directly if needed
-                        if i < len(step_statuses):
-                            step_statuses[i] = PlanStepStatus.IN_PROGRESS.value
-                        else:
-                            while len(step_statuses) < i:
-                                step_statuses.append(PlanStepStatus.NOT_STARTED.value)
-                            step_statuses.append(PlanStepStatus.IN_PROGRESS.value)
-
-                        plan_data["step_statuses"] = step_statuses
-
-                    return i, step_info
-
-            return None, None  # No active step found
-
-        except Exception as e:
-            logger.warning(f"Error finding current step index: {e}")
-            return None, None
+            return []
+
+        steps = self.planning_tool.plans[self.active_plan_id].get("steps", [])
+        return [
+            (i, self._step_info(i, steps[i]))
+            for i in self.planning_tool.ready_steps(self.active_plan_id)
+        ]
+
+    @staticmethod
+    def _step_info(index: int, text: str) -> dict:
+        step_info = {"index": index, "text": text}
+
+        # Try to extract step type from the text (e.g., [SEARCH] or [CODE])
+        type_match = re.search(r"\[([A-Z_]+)\]", text)
+        if type_match:
+            step_info["type"] = type_match.group(1).lower()
+        return step_info
+
+    async def _execute_step(self, executor_key: str, step_info: dict) -> str:
+        """Execute a step with an agent leased from the executor's pool."""
+        step_index = step_info["index"]
+        memory = None
+        if self.fork_step_memory:
+            dependencies = self.planning_tool.get_dependencies(
+                self.planning_tool.plans[self.active_plan_id]
+            )[step_index]
+            memory = self._step_memories.get(max(dependencies, default=-1))
+
+        pool = self.executor_pools[executor_key]
+        async with pool.lease(memory) as executor:
+            if pool.reset_memory:
+                # The agent has not seen the plan with this memory
+                self._plan_versions_seen.pop(id(executor), None)
+            step_result = await self._run_step(executor, step_info)
+            if self.fork_step_memory:
+                self._step_memories[step_index] = executor.memory
+            # Check if agent wants to terminate
+            if executor.state == AgentState.FINISHED:
+                self._terminated = True
+            return step_result
 
-    async def _execute_step(self, executor: BaseAgent, step_info: dict) -> str:
-        """Execute the current step with the specified agent using agent.run()."""
+    async def _run_step(self, executor: BaseAgent, step_info: dict) -> str:
+        """Execute a step with the specified agent using agent.run()."""
         # Prepare context for the agent with current plan status
-        plan_status = await self._get_plan_text()
-        step_text = step_info.get("text", f"Step {self.current_step_index}")
+        step_index = step_info["index"]
+        plan_status = await self._get_step_plan_text(executor, step_index)
+        step_text = step_info.get("text", f"Step {step_index}")
 
         # Create a prompt for the agent to execute the current step
         step_prompt = f"""
@@ -268,38 +638,46 @@ class PlanningFlow(BaseFlow):
         {plan_status}
 
         YOUR CURRENT TASK:
-        You are now working on step {self.current_step_index}: "{step_text}"
+        You are now working on step {step_index}: "{step_text}"
 
         Please execute this step using the appropriate tools. When you're done, provide a summary of what you accomplished.
         """
 
-        # Use agent.run() to execute the step
+        # Use agent.run() to execute the step; the step's own run id keeps
+        # checkpoints of steps running in parallel apart
+        step_run_id = f"{self.run_id}-step{step_index}"
         try:
-            step_result = await executor.run(step_prompt)
+            # Steps share the flow's sandbox, which is cleaned up with the flow
+            with shared_sandbox():
+                if executor.has_checkpoint(step_run_id):
+                    step_result = await executor.resume(step_run_id)
+                else:
+                    step_result = await executor.run(step_prompt, run_id=step_run_id)
 
             # Mark the step as completed after successful execution
-            await self._mark_step_completed()
+            await self._mark_step(step_index, PlanStepStatus.COMPLETED)
+            logger.info(
+                f"Marked step {step_index} as completed in plan {self.active_plan_id}"
+            )
 
             return step_result
         except Exception as e:
-            logger.error(f"Error executing step {self.current_step_index}: {e}")
-            return f"Error executing step {self.current_step_index}: {str(e)}"
-
-    async def _mark_step_completed(self) -> None:
-        """Mark the current step as completed."""
-        if self.current_step_index is None:
-            return
-
+            logger.error(f"Error executing step {step_index}: {e}")
+            # Block the step, and the steps depending on it, instead of retrying
+            await self._mark_step(step_index, PlanStepStatus.BLOCKED, notes=str(e))
+            return f"Error executing step {step_index}: {str(e)}"
+
+    async def _mark_step(
+        self, step_index: int, status: PlanStepStatus, notes: Optional[str] = None
+    ) -> None:
+        """Set the status of a step of the active plan."""
         try:
-            # Mark the step as completed
             await self.planning_tool.execute(
                 command="mark_step",
                 plan_id=self.active_plan_id,
-                step_index=self.current_step_index,
-                step_status=PlanStepStatus.COMPLETED.value,
-            )
-            logger.info(
-                f"Marked step {self.current_step_index} as completed in plan {self.active_plan_id}"
+                step_index=step_index,
+                step_status=status.value,
+                step_notes=notes,
             )
         except Exception as e:
             logger.warning(f"Failed to update plan status: {e}")
@@ -309,13 +687,39 @@ class PlanningFlow(BaseFlow):
                 step_statuses = plan_data.get("step_statuses", [])
 
                 # Ensure the step_statuses list is long enough
-                while len(step_statuses) <= self.current_step_index:
+                while len(step_statuses) <= step_index:
                     step_statuses.append(PlanStepStatus.NOT_STARTED.value)
 
                 # Update the status
-                step_statuses[self.current_step_index] = PlanStepStatus.COMPLETED.value
+                step_statuses[step_index] = status.value
                 plan_data["step_statuses"] = step_statuses
 
+    async def _get_step_plan_text(self, executor: BaseAgent, step_index: int) -> str:
+        """The plan status to show an executor working on a step.
+
+        With `delta_plan_prompts`, an executor sees the whole plan once per
+        memory; after that only the progress, the step, the steps it depends
+        on and the steps changed since it last saw the plan are shown, so the
+        prompt stays short however long the plan grows.
+        """
+        if not self.delta_plan_prompts:
+            return await self._get_plan_text()
+        try:
+            plan = self.planning_tool.plans[self.active_plan_id]
+            seen = self._plan_versions_seen.get(id(executor))
+            if seen is None:
+                self._plan_versions_seen[id(executor)] = plan.get("version", 0)
+                return await self._get_plan_text()
+            dependencies = self.planning_tool.get_dependencies(plan)[step_index]
+            text, version = self.planning_tool.format_plan_delta(
+                self.active_plan_id, since=seen, include=[*dependencies, step_index]
+            )
+            self._plan_versions_seen[id(executor)] = version
+            return text
+        except Exception as e:
+            logger.error(f"Error getting plan changes: {e}")
+            return self._generate_plan_text_from_storage()
+
     async def _get_plan_text(self) -> str:
         """Get the current plan as formatted text."""
         try:
@@ -1,5 +1,9 @@
+import asyncio
+import json
 import math
-from typing import Dict, List, Optional, Union
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Tuple, Union
 
 import tiktoken
 from openai import (
@@ -10,18 +14,46 @@ from openai import (
     OpenAIError,
     RateLimitError,
 )
-from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat import (
+    ChatCompletion,
+    ChatCompletionMessage,
+    ChatCompletionMessageToolCall,
+)
+from openai.types.chat.chat_completion_message_tool_call import Function
+from pydantic import BaseModel, ValidationError
 from tenacity import (
+    RetryCallState,
     retry,
     retry_if_exception_type,
+    retry_if_not_exception_type,
     stop_after_attempt,
     wait_random_exponential,
 )
 
+from app.batch import (
+    BatchError,
+    BatchJob,
+    OpenAIBatchBackend,
+    build_request_line,
+    result_error,
+    wait_for_results,
+)
 from app.bedrock import BedrockClient
+from app.cache import ResponseCache, SingleFlight
+from app.cassette import current_cassette
 from app.config import LLMSettings, config
-from app.exceptions import TokenLimitExceeded
+from app.events import TextDeltaEvent, TokenUsageEvent, emit, events_enabled
+from app.exceptions import CassetteMiss, TokenLimitExceeded
 from app.logger import logger  # Assuming a logger is set up in your app
+from app.metrics import (
+    LLM_COMPLETION_TOKENS,
+    LLM_INPUT_TOKENS,
+    LLM_LATENCY,
+    LLM_REQUESTS,
+    LLM_RETRIES,
+)
+from app.rate_limiter import RateLimiter
+from app.router import Endpoint, RouterClient
 from app.schema import (
     ROLE_VALUES,
     TOOL_CHOICE_TYPE,
@@ -29,6 +61,7 @@ from app.schema import (
     Message,
     ToolChoice,
 )
+from app.tracing import traced, tracer
 
 
 REASONING_MODELS = ["o1", "o3-mini"]
@@ -41,6 +74,52 @@ MULTIMODAL_MODELS = [
     "claude-3-haiku-20240307",
 ]
 
+# Request parameters that cannot change the response
+_TRANSPORT_PARAMS = frozenset({"timeout", "extra_headers"})
+
+
+def _retry_after_seconds(error: OpenAIError) -> Optional[float]:
+    """Extract the server's Retry-After hint from a rate-limit error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+async def _close_stream(stream) -> None:
+    """Close a streaming response, freeing its rate limiter slot early."""
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+_backoff = wait_random_exponential(min=1, max=60)
+
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """Back off before retrying an LLM call, except after a rate limit.
+
+    A rate-limited call is retried at once: the endpoint's RateLimiter has
+    already paused admission for Retry-After and narrowed its window, so it
+    paces the retry instead of a random backoff on top.
+    """
+    if isinstance(retry_state.outcome.exception(), RateLimitError):
+        return 0.0
+    return _backoff(retry_state)
+
+
+def _record_retry(retry_state: RetryCallState) -> None:
+    """Count a retried LLM call in the metrics."""
+    LLM_RETRIES.inc(method=retry_state.fn.__name__ if retry_state.fn else None)
+
 
 class TokenCounter:
     # Token constants
@@ -54,8 +133,28 @@ class TokenCounter:
     HIGH_DETAIL_TARGET_SHORT_SIDE = 768
     TILE_SIZE = 512
 
+    # Memoization limits
+    MESSAGE_CACHE_SIZE = 4096
+    TOOL_CACHE_SIZE = 256
+
     def __init__(self, tokenizer):
         self.tokenizer = tokenizer
+        self._message_cache: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._tool_cache: "OrderedDict[str, int]" = OrderedDict()
+
+    @staticmethod
+    def _lookup(cache: OrderedDict, key: Hashable) -> Optional[int]:
+        count = cache.get(key)
+        if count is not None:
+            cache.move_to_end(key)
+        return count
+
+    @staticmethod
+    def _store(cache: OrderedDict, key: Hashable, count: int, max_size: int) -> int:
+        cache[key] = count
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+        return count
 
     def count_text(self, text: str) -> int:
         """Calculate tokens for a text string"""
@@ -151,31 +250,272 @@ class TokenCounter:
                 token_count += self.count_text(function.get("arguments", ""))
         return token_count
 
+    def count_tools(self, tools: List[dict]) -> int:
+        """Calculate tokens for tool schemas, reusing counts across requests"""
+        token_count = 0
+        for tool in tools:
+            key = str(tool)
+            count = self._lookup(self._tool_cache, key)
+            if count is None:
+                count = self._store(
+                    self._tool_cache, key, self.count_text(key), self.TOOL_CACHE_SIZE
+                )
+            token_count += count
+        return token_count
+
+    @staticmethod
+    def _message_key(message: dict) -> Hashable:
+        """
+        Build a memoization key from a formatted message.
+
+        Text content is used as-is: formatted messages share the string objects
+        held by `Message`, so their hashes are computed once and reused.
+        """
+        content = message.get("content")
+        if isinstance(content, list):
+            content = tuple(
+                item
+                if isinstance(item, str)
+                else json.dumps(item, sort_keys=True, default=str)
+                for item in content
+            )
+        tool_calls = message.get("tool_calls")
+        if tool_calls:
+            tool_calls = json.dumps(tool_calls, sort_keys=True, default=str)
+        return (
+            message.get("role", ""),
+            content,
+            tool_calls,
+            message.get("name", ""),
+            message.get("tool_call_id", ""),
+        )
+
+    def count_message(self, message: dict) -> int:
+        """Calculate tokens for a single message, memoized on its content"""
+        key = self._message_key(message)
+        tokens = self._lookup(self._message_cache, key)
+        if tokens is not None:
+            return tokens
+
+        tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+
+        # Add role tokens
+        tokens += self.count_text(message.get("role", ""))
+
+        # Add content tokens
+        if "content" in message:
+            tokens += self.count_content(message["content"])
+
+        # Add tool calls tokens
+        if "tool_calls" in message:
+            tokens += self.count_tool_calls(message["tool_calls"])
+
+        # Add name and tool_call_id tokens
+        tokens += self.count_text(message.get("name", ""))
+        tokens += self.count_text(message.get("tool_call_id", ""))
+
+        return self._store(self._message_cache, key, tokens, self.MESSAGE_CACHE_SIZE)
+
     def count_message_tokens(self, messages: List[dict]) -> int:
         """Calculate the total number of tokens in a message list"""
         total_tokens = self.FORMAT_TOKENS  # Base format tokens
 
         for message in messages:
-            tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+            total_tokens += self.count_message(message)
 
-            # Add role tokens
-            tokens += self.count_text(message.get("role", ""))
+        return total_tokens
 
-            # Add content tokens
-            if "content" in message:
-                tokens += self.count_content(message["content"])
 
-            # Add tool calls tokens
-            if "tool_calls" in message:
-                tokens += self.count_tool_calls(message["tool_calls"])
+class ToolCallAssembler:
+    """Assembles streamed tool-call deltas into complete tool calls.
 
-            # Add name and tool_call_id tokens
-            tokens += self.count_text(message.get("name", ""))
-            tokens += self.count_text(message.get("tool_call_id", ""))
+    A call is considered complete as soon as its accumulated arguments parse
+    as a JSON object, which lets callers start executing it while the model
+    is still emitting later calls.
+    """
 
-            total_tokens += tokens
+    def __init__(self):
+        self._calls: Dict[int, dict] = {}
+        # Indexes of the calls returned so far, in the order they were returned
+        self.emitted: List[int] = []
 
-        return total_tokens
+    def feed(self, deltas: List) -> List[ChatCompletionMessageToolCall]:
+        """Apply tool-call deltas and return the calls completed by them."""
+        touched = []
+        for delta in deltas:
+            call = self._calls.setdefault(
+                delta.index, {"id": "", "name": "", "arguments": ""}
+            )
+            if delta.id:
+                call["id"] = delta.id
+            if delta.function:
+                if delta.function.name:
+                    call["name"] += delta.function.name
+                if delta.function.arguments:
+                    call["arguments"] += delta.function.arguments
+            touched.append(delta.index)
+
+        completed = []
+        for index in dict.fromkeys(touched):
+            if index not in self.emitted and self._is_complete(self._calls[index]):
+                self.emitted.append(index)
+                completed.append(self._to_tool_call(index))
+        return completed
+
+    def finish(self) -> List[ChatCompletionMessageToolCall]:
+        """Return every call that has not been emitted yet."""
+        indexes = [index for index in sorted(self._calls) if index not in self.emitted]
+        self.emitted.extend(indexes)
+        return [self._to_tool_call(index) for index in indexes]
+
+    def position(self, index: int) -> int:
+        """Position of the call at stream `index` among the assembled calls.
+
+        Streams may number calls from any offset (Bedrock counts text blocks
+        too), while `tool_calls` lists them from 0.
+        """
+        return sum(1 for other in self._calls if other < index)
+
+    def name(self, index: int) -> str:
+        """Function name of the call at `index`, as far as it has streamed."""
+        return self._calls[index]["name"] if index in self._calls else ""
+
+    @property
+    def tool_calls(self) -> List[ChatCompletionMessageToolCall]:
+        """All assembled calls in the order the model emitted them."""
+        return [self._to_tool_call(index) for index in sorted(self._calls)]
+
+    @staticmethod
+    def _is_complete(call: dict) -> bool:
+        arguments = call["arguments"].strip()
+        if not call["id"] or not call["name"] or not arguments.endswith("}"):
+            return False
+        try:
+            return isinstance(json.loads(arguments), dict)
+        except json.JSONDecodeError:
+            return False
+
+    def _to_tool_call(self, index: int) -> ChatCompletionMessageToolCall:
+        call = self._calls[index]
+        return ChatCompletionMessageToolCall(
+            id=call["id"],
+            type="function",
+            function=Function(name=call["name"], arguments=call["arguments"]),
+        )
+
+
+class ToolCallStreamEvent(BaseModel):
+    """A content token, a tool-call arguments fragment or a completed tool call
+    from a streaming tool request."""
+
+    content: Optional[str] = None
+    # A completed call, at `tool_call_index` in the assembled message
+    tool_call: Optional[ChatCompletionMessageToolCall] = None
+    # Arguments of the tool call at `tool_call_index` as they stream, for
+    # callers acting on calls before they complete
+    arguments_delta: Optional[str] = None
+    tool_call_index: Optional[int] = None
+    tool_name: Optional[str] = None
+
+
+class ToolCallStream:
+    """Async iterator over a streaming `ask_tool` response.
+
+    Yields `ToolCallStreamEvent`s as content tokens arrive and as tool calls
+    complete. Once exhausted, `message` holds the assembled response. Callers
+    that may stop iterating early must `aclose` it, or use `async with`, to
+    free the rate limiter slot of the underlying response.
+    """
+
+    def __init__(
+        self,
+        llm: "LLM",
+        response=None,
+        input_tokens: int = 0,
+        cache_key: Optional[str] = None,
+        cached: Optional[ChatCompletionMessage] = None,
+    ):
+        self._llm = llm
+        self._response = response
+        self._input_tokens = input_tokens
+        self._cache_key = cache_key
+        self._cached = cached
+        self.message: Optional[ChatCompletionMessage] = None
+
+    def __aiter__(self) -> AsyncIterator[ToolCallStreamEvent]:
+        return self._cached_events() if self._cached else self._events()
+
+    async def aclose(self) -> None:
+        """Close the underlying response; safe to call more than once."""
+        await _close_stream(self._response)
+
+    async def __aenter__(self) -> "ToolCallStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _cached_events(self) -> AsyncIterator[ToolCallStreamEvent]:
+        if self._cached.content:
+            yield ToolCallStreamEvent(content=self._cached.content)
+        for index, tool_call in enumerate(self._cached.tool_calls or []):
+            yield ToolCallStreamEvent(
+                arguments_delta=tool_call.function.arguments,
+                tool_call_index=index,
+                tool_name=tool_call.function.name,
+            )
+            yield ToolCallStreamEvent(tool_call=tool_call, tool_call_index=index)
+        self.message = self._cached
+
+    async def _events(self) -> AsyncIterator[ToolCallStreamEvent]:
+        assembler = ToolCallAssembler()
+        content_parts = []
+
+        async for chunk in self._response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content_parts.append(delta.content)
+                yield ToolCallStreamEvent(content=delta.content)
+            if delta.tool_calls:
+                start = len(assembler.emitted)
+                completed = assembler.feed(delta.tool_calls)
+                for fragment in delta.tool_calls:
+                    if fragment.function and fragment.function.arguments:
+                        yield ToolCallStreamEvent(
+                            arguments_delta=fragment.function.arguments,
+                            tool_call_index=assembler.position(fragment.index),
+                            tool_name=assembler.name(fragment.index),
+                        )
+                for index, tool_call in zip(assembler.emitted[start:], completed):
+                    yield ToolCallStreamEvent(
+                        tool_call=tool_call, tool_call_index=assembler.position(index)
+                    )
+
+        start = len(assembler.emitted)
+        remaining = assembler.finish()
+        for index, tool_call in zip(assembler.emitted[start:], remaining):
+            yield ToolCallStreamEvent(
+                tool_call=tool_call, tool_call_index=assembler.position(index)
+            )
+
+        content = "".join(content_parts)
+        tool_calls = assembler.tool_calls
+        self.message = ChatCompletionMessage(
+            role="assistant", content=content or None, tool_calls=tool_calls or None
+        )
+
+        # Usage is not reported for streams, so estimate completion tokens
+        completion_tokens = self._llm.count_tokens(content) + sum(
+            self._llm.count_tokens(call.function.arguments) for call in tool_calls
+        )
+        self._llm.update_token_count(self._input_tokens, completion_tokens)
+
+        if self._cache_key:
+            await self._llm.response_cache.aset(
+                self._cache_key, self.message.model_dump_json()
+            )
 
 
 class LLM:
@@ -194,8 +534,8 @@ class LLM:
         self, config_name: str = "default", llm_config: Optional[LLMSettings] = None
     ):
         if not hasattr(self, "client"):  # Only initialize if not already initialized
-            llm_config = llm_config or config.llm
-            llm_config = llm_config.get(config_name, llm_config["default"])
+            llm_configs = llm_config or config.llm
+            llm_config = llm_configs.get(config_name, llm_configs["default"])
             self.model = llm_config.model
             self.max_tokens = llm_config.max_tokens
             self.temperature = llm_config.temperature
@@ -212,6 +552,7 @@ class LLM:
                 if hasattr(llm_config, "max_input_tokens")
                 else None
             )
+            self.context_window = getattr(llm_config, "context_window", None)
 
             # Initialize tokenizer
             try:
@@ -220,19 +561,92 @@ class LLM:
                 # If the model is not in tiktoken's presets, use cl100k_base as default
                 self.tokenizer = tiktoken.get_encoding("cl100k_base")
 
-            if self.api_type == "azure":
-                self.client = AsyncAzureOpenAI(
-                    base_url=self.base_url,
-                    api_key=self.api_key,
-                    api_version=self.api_version,
-                )
-            elif self.api_type == "aws":
-                self.client = BedrockClient()
+            if self.api_type == "router":
+                self.client = self._create_router(llm_config, llm_configs)
             else:
-                self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+                self.client = self._create_client(llm_config)
 
             self.token_counter = TokenCounter(self.tokenizer)
 
+            # Bedrock and routers have no batch API, and Azure's needs its own
+            # endpoint and deployment names; others use OpenAI batch files
+            self.batch_backend = (
+                None
+                if self.api_type in ("aws", "azure", "router")
+                else OpenAIBatchBackend(self.client)
+            )
+
+            # Coalesces identical in-flight requests into one upstream call
+            self.request_coalescer = SingleFlight()
+
+            # Shared by every caller of this config, so concurrent agents queue
+            # instead of stampeding the endpoint
+            self.rate_limiter = RateLimiter(
+                rpm=llm_config.rpm,
+                tpm=llm_config.tpm,
+                max_concurrency=llm_config.max_concurrency,
+            )
+
+            # Opt-in response cache shared by every call on this instance
+            self.response_cache = (
+                ResponseCache.from_settings(config.llm_cache)
+                if config.llm_cache and config.llm_cache.enabled
+                else None
+            )
+
+    def fork(self) -> "LLM":
+        """Create a session-scoped view of this LLM.
+
+        The fork shares the thread-safe pieces (API client and its connection
+        pool, tokenizer, response cache, request coalescer, rate limiter) but
+        has its own token counters, so concurrent sessions neither mix their
+        usage nor spend each other's `max_input_tokens` budget.
+
+        Returns:
+            LLM: A new instance that is not registered as a singleton
+        """
+        forked = object.__new__(type(self))
+        forked.__dict__.update(self.__dict__)
+        forked.total_input_tokens = 0
+        forked.total_completion_tokens = 0
+        return forked
+
+    @staticmethod
+    def _create_client(llm_config: LLMSettings):
+        """Create the API client for a single endpoint configuration."""
+        if llm_config.api_type == "azure":
+            return AsyncAzureOpenAI(
+                base_url=llm_config.base_url,
+                api_key=llm_config.api_key,
+                api_version=llm_config.api_version,
+            )
+        elif llm_config.api_type == "aws":
+            return BedrockClient()
+        return AsyncOpenAI(api_key=llm_config.api_key, base_url=llm_config.base_url)
+
+    @classmethod
+    def _create_router(
+        cls, llm_config: LLMSettings, llm_configs: Dict[str, LLMSettings]
+    ) -> RouterClient:
+        """Create a router over the [llm.*] configs named in `endpoints`."""
+        endpoints = []
+        for name in llm_config.endpoints:
+            endpoint_config = llm_configs.get(name)
+            if endpoint_config is None:
+                raise ValueError(f"Unknown LLM endpoint config: {name}")
+            if endpoint_config.api_type == "router":
+                raise ValueError(f"Router endpoint '{name}' cannot be a router")
+            endpoints.append(
+                Endpoint(
+                    name, cls._create_client(endpoint_config), endpoint_config.model
+                )
+            )
+        return RouterClient(
+            endpoints,
+            hedge_percentile=llm_config.hedge_percentile,
+            hedge_default_delay=llm_config.hedge_default_delay,
+        )
+
     def count_tokens(self, text: str) -> int:
         """Calculate the number of tokens in a text"""
         if not text:
@@ -242,19 +656,103 @@ class LLM:
     def count_message_tokens(self, messages: List[dict]) -> int:
         return self.token_counter.count_message_tokens(messages)
 
+    def count_prompt_tokens(self, messages: List[Union[dict, Message]]) -> int:
+        """Calculate the tokens messages will use once formatted for this model"""
+        formatted = self.format_messages(messages, self.model in MULTIMODAL_MODELS)
+        return self.count_message_tokens(formatted)
+
     def update_token_count(self, input_tokens: int, completion_tokens: int = 0) -> None:
         """Update token counts"""
         # Only track tokens if max_input_tokens is set
         self.total_input_tokens += input_tokens
         self.total_completion_tokens += completion_tokens
-        logger.info(
+        LLM_INPUT_TOKENS.inc(input_tokens, model=self.model)
+        LLM_COMPLETION_TOKENS.inc(completion_tokens, model=self.model)
+        message = (
             f"Token usage: Input={input_tokens}, Completion={completion_tokens}, "
             f"Cumulative Input={self.total_input_tokens}, Cumulative Completion={self.total_completion_tokens}, "
             f"Total={input_tokens + completion_tokens}, Cumulative Total={self.total_input_tokens + self.total_completion_tokens}"
         )
+        if self.request_coalescer.saved:
+            message += f", Coalesced Requests={self.request_coalescer.saved}"
+        if self.response_cache:
+            message += f", Cache Hits={self.response_cache.hits}, Cache Misses={self.response_cache.misses}"
+        logger.info(message)
+        emit(
+            TokenUsageEvent,
+            model=self.model,
+            input_tokens=input_tokens,
+            completion_tokens=completion_tokens,
+            total_input_tokens=self.total_input_tokens,
+            total_completion_tokens=self.total_completion_tokens,
+        )
+
+    async def _create_completion(self, input_tokens: int, **params):
+        """Send a completion request, or replay it from the active cassette."""
+        cassette = current_cassette()
+        if cassette:
+            kind = "stream" if params.get("stream") else "completion"
+            return await cassette.completion(
+                self._request_key(kind, params),
+                bool(params.get("stream")),
+                lambda: self._send_completion(input_tokens, **params),
+            )
+        return await self._send_completion(input_tokens, **params)
+
+    async def _send_completion(self, input_tokens: int, **params):
+        """Send a completion request through this endpoint's rate limiter."""
+        with tracer.span("llm.request", model=self.model) as span:
+            requested = time.monotonic()
+            await self.rate_limiter.admit(input_tokens)
+            started = time.monotonic()
+            span.set(queued_seconds=round(started - requested, 6))
+            try:
+                with tracer.span("llm.network", model=self.model):
+                    response = await self.client.chat.completions.create(**params)
+            except BaseException as e:
+                self.rate_limiter.release()
+                if isinstance(e, Exception):
+                    LLM_REQUESTS.inc(model=self.model, status="error")
+                if isinstance(e, RateLimitError):
+                    self.rate_limiter.on_rate_limited(_retry_after_seconds(e))
+                raise
+        LLM_LATENCY.observe(time.monotonic() - started, model=self.model)
+        LLM_REQUESTS.inc(model=self.model, status="ok")
+        self.rate_limiter.on_success()
+        if params.get("stream"):
+            # A stream keeps its slot until it is drained
+            return self.rate_limiter.hold(response)
+        self.rate_limiter.release()
+        return response
+
+    @property
+    def _caching(self) -> bool:
+        """Whether the response cache may be used.
+
+        It is bypassed while a cassette is active, so recordings capture every
+        response and replays never depend on local cache contents.
+        """
+        return self.response_cache is not None and current_cassette() is None
+
+    def _request_key(self, kind: str, params: dict) -> str:
+        """Hash the parts of a request that determine its response.
+
+        Every parameter counts except the transport-only ones, so requests
+        differing in e.g. max_tokens or response_format never share a
+        response. An absent `stream` counts as False.
+        """
+        payload = {
+            name: value
+            for name, value in params.items()
+            if name not in _TRANSPORT_PARAMS
+        }
+        payload["stream"] = bool(payload.get("stream"))
+        return ResponseCache.make_key(kind=kind, params=payload)
 
     def check_token_limit(self, input_tokens: int) -> bool:
         """Check if token limits are exceeded"""
+        if self.context_window is not None and input_tokens > self.context_window:
+            return False
         if self.max_input_tokens is not None:
             return (self.total_input_tokens + input_tokens) <= self.max_input_tokens
         # If max_input_tokens is not set, always return True
@@ -262,6 +760,8 @@ class LLM:
 
     def get_limit_error_message(self, input_tokens: int) -> str:
         """Generate error message for token limit exceeded"""
+        if self.context_window is not None and input_tokens > self.context_window:
+            return f"Request exceeds the context window ({input_tokens} > {self.context_window} tokens)"
         if (
             self.max_input_tokens is not None
             and (self.total_input_tokens + input_tokens) > self.max_input_tokens
@@ -358,12 +858,15 @@ class LLM:
 
         return formatted_messages
 
+    @traced("llm.ask")
     @retry(
-        wait=wait_random_exponential(min=1, max=60),
+        wait=_retry_wait,
         stop=stop_after_attempt(6),
+        before_sleep=_record_retry,
         retry=retry_if_exception_type(
             (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
+        )  # Don't retry TokenLimitExceeded
+        & retry_if_not_exception_type(CassetteMiss),
     )
     async def ask(
         self,
@@ -371,6 +874,7 @@ class LLM:
         system_msgs: Optional[List[Union[dict, Message]]] = None,
         stream: bool = True,
         temperature: Optional[float] = None,
+        use_cache: bool = True,
     ) -> str:
         """
         Send a prompt to the LLM and get the response.
@@ -380,6 +884,7 @@ class LLM:
             system_msgs: Optional system messages to prepend
             stream (bool): Whether to stream the response
             temperature (float): Sampling temperature for the response
+            use_cache (bool): Whether to read from and write to the response cache
 
         Returns:
             str: The generated response
@@ -423,48 +928,19 @@ class LLM:
                     temperature if temperature is not None else self.temperature
                 )
 
-            if not stream:
-                # Non-streaming request
-                response = await self.client.chat.completions.create(
-                    **params, stream=False
-                )
-
-                if not response.choices or not response.choices[0].message.content:
-                    raise ValueError("Empty or invalid response from LLM")
-
-                # Update token counts
-                self.update_token_count(
-                    response.usage.prompt_tokens, response.usage.completion_tokens
-                )
-
-                return response.choices[0].message.content
-
-            # Streaming request, For streaming, update estimated token count before making the request
-            self.update_token_count(input_tokens)
-
-            response = await self.client.chat.completions.create(**params, stream=True)
-
-            collected_messages = []
-            completion_text = ""
-            async for chunk in response:
-                chunk_message = chunk.choices[0].delta.content or ""
-                collected_messages.append(chunk_message)
-                completion_text += chunk_message
-                print(chunk_message, end="", flush=True)
-
-            print()  # Newline after streaming
-            full_response = "".join(collected_messages).strip()
-            if not full_response:
-                raise ValueError("Empty response from streaming LLM")
-
-            # estimate completion tokens for streaming response
-            completion_tokens = self.count_tokens(completion_text)
-            logger.info(
-                f"Estimated completion tokens for streaming response: {completion_tokens}"
+            request_key = self._request_key("ask", params)
+            cache_key = request_key if use_cache and self._caching else None
+            if cache_key:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    self.update_token_count(0)
+                    return cached
+
+            # Identical requests already in flight share a single upstream call
+            return await self.request_coalescer.do(
+                request_key,
+                lambda: self._complete_text(params, input_tokens, stream, cache_key),
             )
-            self.total_completion_tokens += completion_tokens
-
-            return full_response
 
         except TokenLimitExceeded:
             # Re-raise token limit errors without logging
@@ -485,12 +961,88 @@ class LLM:
             logger.exception(f"Unexpected error in ask")
             raise
 
+    async def _complete_text(
+        self,
+        params: dict,
+        input_tokens: int,
+        stream: bool,
+        cache_key: Optional[str] = None,
+    ) -> str:
+        """Run a text completion request and return the response content."""
+        if not stream:
+            # Non-streaming request
+            response = await self._create_completion(
+                input_tokens, **params, stream=False
+            )
+
+            if not response.choices or not response.choices[0].message.content:
+                raise ValueError("Empty or invalid response from LLM")
+
+            # Update token counts
+            self.update_token_count(
+                response.usage.prompt_tokens, response.usage.completion_tokens
+            )
+
+            content = response.choices[0].message.content
+            if cache_key:
+                await self.response_cache.aset(cache_key, content)
+            return content
+
+        # Streaming request, For streaming, update estimated token count before making the request
+        self.update_token_count(input_tokens)
+
+        response = await self._create_completion(input_tokens, **params, stream=True)
+
+        collected_messages = []
+        completion_text = ""
+        usage = None
+        to_stdout = not events_enabled()
+        try:
+            async for chunk in response:
+                if not chunk.choices:
+                    # Usage-only chunk, such as Bedrock's final metadata event
+                    usage = getattr(chunk, "usage", None) or usage
+                    continue
+                chunk_message = chunk.choices[0].delta.content or ""
+                collected_messages.append(chunk_message)
+                completion_text += chunk_message
+                if to_stdout:
+                    print(chunk_message, end="", flush=True)
+                elif chunk_message:
+                    emit(TextDeltaEvent, content=chunk_message)
+        finally:
+            await _close_stream(response)
+
+        if to_stdout:
+            print()  # Newline after streaming
+        full_response = "".join(collected_messages).strip()
+        if not full_response:
+            raise ValueError("Empty response from streaming LLM")
+
+        if usage:
+            completion_tokens = usage.completion_tokens
+        else:
+            # estimate completion tokens for streaming response
+            completion_tokens = self.count_tokens(completion_text)
+            logger.info(
+                f"Estimated completion tokens for streaming response: {completion_tokens}"
+            )
+        self.total_completion_tokens += completion_tokens
+        LLM_COMPLETION_TOKENS.inc(completion_tokens, model=self.model)
+
+        if cache_key:
+            await self.response_cache.aset(cache_key, full_response)
+        return full_response
+
+    @traced("llm.ask_with_images")
     @retry(
-        wait=wait_random_exponential(min=1, max=60),
+        wait=_retry_wait,
         stop=stop_after_attempt(6),
+        before_sleep=_record_retry,
         retry=retry_if_exception_type(
             (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
+        )  # Don't retry TokenLimitExceeded
+        & retry_if_not_exception_type(CassetteMiss),
     )
     async def ask_with_images(
         self,
@@ -597,7 +1149,7 @@ class LLM:
 
             # Handle non-streaming request
             if not stream:
-                response = await self.client.chat.completions.create(**params)
+                response = await self._create_completion(input_tokens, **params)
 
                 if not response.choices or not response.choices[0].message.content:
                     raise ValueError("Empty or invalid response from LLM")
@@ -607,15 +1159,28 @@ class LLM:
 
             # Handle streaming request
             self.update_token_count(input_tokens)
-            response = await self.client.chat.completions.create(**params)
+            response = await self._create_completion(input_tokens, **params)
 
             collected_messages = []
-            async for chunk in response:
-                chunk_message = chunk.choices[0].delta.content or ""
-                collected_messages.append(chunk_message)
-                print(chunk_message, end="", flush=True)
-
-            print()  # Newline after streaming
+            to_stdout = not events_enabled()
+            try:
+                async for chunk in response:
+                    if not chunk.choices:
+                        # Usage-only chunk, such as Bedrock's final metadata event
+                        if getattr(chunk, "usage", None):
+                            self.update_token_count(0, chunk.usage.completion_tokens)
+                        continue
+                    chunk_message = chunk.choices[0].delta.content or ""
+                    collected_messages.append(chunk_message)
+                    if to_stdout:
+                        print(chunk_message, end="", flush=True)
+                    elif chunk_message:
+                        emit(TextDeltaEvent, content=chunk_message)
+            finally:
+                await _close_stream(response)
+
+            if to_stdout:
+                print()  # Newline after streaming
             full_response = "".join(collected_messages).strip()
 
             if not full_response:
@@ -641,12 +1206,88 @@ class LLM:
             logger.error(f"Unexpected error in ask_with_images: {e}")
             raise
 
+    def _build_tool_request(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]] = None,
+        timeout: int = 300,
+        tools: Optional[List[dict]] = None,
+        tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
+        temperature: Optional[float] = None,
+        **kwargs,
+    ) -> Tuple[dict, int]:
+        """
+        Validate a tool request and build its completion parameters.
+
+        Returns:
+            Tuple[dict, int]: The completion parameters and the estimated input tokens
+
+        Raises:
+            TokenLimitExceeded: If token limits are exceeded
+            ValueError: If tools, tool_choice, or messages are invalid
+        """
+        # Validate tool_choice
+        if tool_choice not in TOOL_CHOICE_VALUES:
+            raise ValueError(f"Invalid tool_choice: {tool_choice}")
+
+        # Check if the model supports images
+        supports_images = self.model in MULTIMODAL_MODELS
+
+        # Format messages
+        if system_msgs:
+            system_msgs = self.format_messages(system_msgs, supports_images)
+            messages = system_msgs + self.format_messages(messages, supports_images)
+        else:
+            messages = self.format_messages(messages, supports_images)
+
+        # Calculate input token count
+        input_tokens = self.count_message_tokens(messages)
+
+        # If there are tools, calculate token count for tool descriptions
+        if tools:
+            input_tokens += self.token_counter.count_tools(tools)
+
+        # Check if token limits are exceeded
+        if not self.check_token_limit(input_tokens):
+            error_message = self.get_limit_error_message(input_tokens)
+            # Raise a special exception that won't be retried
+            raise TokenLimitExceeded(error_message)
+
+        # Validate tools if provided
+        if tools:
+            for tool in tools:
+                if not isinstance(tool, dict) or "type" not in tool:
+                    raise ValueError("Each tool must be a dict with 'type' field")
+
+        # Set up the completion request
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "tools": tools,
+            "tool_choice": tool_choice,
+            "timeout": timeout,
+            **kwargs,
+        }
+
+        if self.model in REASONING_MODELS:
+            params["max_completion_tokens"] = self.max_tokens
+        else:
+            params["max_tokens"] = self.max_tokens
+            params["temperature"] = (
+                temperature if temperature is not None else self.temperature
+            )
+
+        return params, input_tokens
+
+    @traced("llm.ask_tool")
     @retry(
-        wait=wait_random_exponential(min=1, max=60),
+        wait=_retry_wait,
         stop=stop_after_attempt(6),
+        before_sleep=_record_retry,
         retry=retry_if_exception_type(
             (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
+        )  # Don't retry TokenLimitExceeded
+        & retry_if_not_exception_type(CassetteMiss),
     )
     async def ask_tool(
         self,
@@ -656,6 +1297,7 @@ class LLM:
         tools: Optional[List[dict]] = None,
         tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
         temperature: Optional[float] = None,
+        use_cache: bool = True,
         **kwargs,
     ) -> ChatCompletionMessage | None:
         """
@@ -668,6 +1310,7 @@ class LLM:
             tools: List of tools to use
             tool_choice: Tool choice strategy
             temperature: Sampling temperature for the response
+            use_cache: Whether to read from and write to the response cache
             **kwargs: Additional completion arguments
 
         Returns:
@@ -680,78 +1323,35 @@ class LLM:
             Exception: For unexpected errors
         """
         try:
-            # Validate tool_choice
-            if tool_choice not in TOOL_CHOICE_VALUES:
-                raise ValueError(f"Invalid tool_choice: {tool_choice}")
-
-            # Check if the model supports images
-            supports_images = self.model in MULTIMODAL_MODELS
-
-            # Format messages
-            if system_msgs:
-                system_msgs = self.format_messages(system_msgs, supports_images)
-                messages = system_msgs + self.format_messages(messages, supports_images)
-            else:
-                messages = self.format_messages(messages, supports_images)
-
-            # Calculate input token count
-            input_tokens = self.count_message_tokens(messages)
-
-            # If there are tools, calculate token count for tool descriptions
-            tools_tokens = 0
-            if tools:
-                for tool in tools:
-                    tools_tokens += self.count_tokens(str(tool))
-
-            input_tokens += tools_tokens
-
-            # Check if token limits are exceeded
-            if not self.check_token_limit(input_tokens):
-                error_message = self.get_limit_error_message(input_tokens)
-                # Raise a special exception that won't be retried
-                raise TokenLimitExceeded(error_message)
-
-            # Validate tools if provided
-            if tools:
-                for tool in tools:
-                    if not isinstance(tool, dict) or "type" not in tool:
-                        raise ValueError("Each tool must be a dict with 'type' field")
-
-            # Set up the completion request
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "tools": tools,
-                "tool_choice": tool_choice,
-                "timeout": timeout,
+            params, input_tokens = self._build_tool_request(
+                messages,
+                system_msgs=system_msgs,
+                timeout=timeout,
+                tools=tools,
+                tool_choice=tool_choice,
+                temperature=temperature,
                 **kwargs,
-            }
-
-            if self.model in REASONING_MODELS:
-                params["max_completion_tokens"] = self.max_tokens
-            else:
-                params["max_tokens"] = self.max_tokens
-                params["temperature"] = (
-                    temperature if temperature is not None else self.temperature
-                )
-
-            params["stream"] = False  # Always use non-streaming for tool requests
-            response: ChatCompletion = await self.client.chat.completions.create(
-                **params
             )
 
-            # Check if response is valid
-            if not response.choices or not response.choices[0].message:
-                print(response)
-                # raise ValueError("Invalid or empty response from LLM")
-                return None
+            params["stream"] = False  # Always use non-streaming for tool requests
 
-            # Update token counts
-            self.update_token_count(
-                response.usage.prompt_tokens, response.usage.completion_tokens
+            request_key = self._request_key("ask_tool", params)
+            cache_key = request_key if use_cache and self._caching else None
+            if cache_key:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    self.update_token_count(0)
+                    return ChatCompletionMessage.model_validate_json(cached)
+
+            # Identical requests already in flight share a single upstream call
+            message = await self.request_coalescer.do(
+                request_key,
+                lambda: self._complete_tool_request(params, input_tokens, cache_key),
             )
-
-            return response.choices[0].message
+            # Callers may mutate the message, so each gets its own copy
+            if isinstance(message, BaseModel):
+                message = message.model_copy(deep=True)
+            return message
 
         except TokenLimitExceeded:
             # Re-raise token limit errors without logging
@@ -771,3 +1371,220 @@ class LLM:
         except Exception as e:
             logger.error(f"Unexpected error in ask_tool: {e}")
             raise
+
+    async def _complete_tool_request(
+        self, params: dict, input_tokens: int, cache_key: Optional[str] = None
+    ) -> ChatCompletionMessage | None:
+        """Run a tool completion request and return the response message."""
+        response: ChatCompletion = await self._create_completion(input_tokens, **params)
+
+        # Check if response is valid
+        if not response.choices or not response.choices[0].message:
+            print(response)
+            # raise ValueError("Invalid or empty response from LLM")
+            return None
+
+        # Update token counts
+        self.update_token_count(
+            response.usage.prompt_tokens, response.usage.completion_tokens
+        )
+
+        message = response.choices[0].message
+        if cache_key and isinstance(message, ChatCompletionMessage):
+            await self.response_cache.aset(cache_key, message.model_dump_json())
+        return message
+
+    @traced("llm.ask_tool_stream")
+    async def ask_tool_stream(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]] = None,
+        timeout: int = 300,
+        tools: Optional[List[dict]] = None,
+        tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        **kwargs,
+    ) -> ToolCallStream:
+        """
+        Ask LLM using functions/tools and stream the response.
+
+        Unlike `ask_tool`, this returns as soon as the stream is open. Iterating
+        the result yields content tokens and each tool call as soon as its
+        arguments are complete, so callers can start executing tools while the
+        model is still generating.
+
+        Args:
+            messages: List of conversation messages
+            system_msgs: Optional system messages to prepend
+            timeout: Request timeout in seconds
+            tools: List of tools to use
+            tool_choice: Tool choice strategy
+            temperature: Sampling temperature for the response
+            use_cache: Whether to read from and write to the response cache
+            **kwargs: Additional completion arguments
+
+        Returns:
+            ToolCallStream: Async iterator of stream events
+
+        Raises:
+            TokenLimitExceeded: If token limits are exceeded
+            ValueError: If tools, tool_choice, or messages are invalid
+            OpenAIError: If opening the stream fails after retries
+        """
+        params, input_tokens = self._build_tool_request(
+            messages,
+            system_msgs=system_msgs,
+            timeout=timeout,
+            tools=tools,
+            tool_choice=tool_choice,
+            temperature=temperature,
+            **kwargs,
+        )
+        params["stream"] = True
+
+        cache_key = (
+            self._request_key("ask_tool", params)
+            if use_cache and self._caching
+            else None
+        )
+        if cache_key:
+            cached = await self.response_cache.aget(cache_key)
+            if cached is not None:
+                self.update_token_count(0)
+                return ToolCallStream(
+                    self, cached=ChatCompletionMessage.model_validate_json(cached)
+                )
+
+        response = await self._open_stream(input_tokens, params)
+        return ToolCallStream(
+            self, response, input_tokens=input_tokens, cache_key=cache_key
+        )
+
+    @retry(
+        wait=_retry_wait,
+        stop=stop_after_attempt(6),
+        before_sleep=_record_retry,
+        retry=retry_if_exception_type(OpenAIError),
+    )
+    async def _open_stream(self, input_tokens: int, params: dict):
+        """Open a streaming completion, retrying only the initial request."""
+        return await self._create_completion(input_tokens, **params)
+
+    async def submit_batch(
+        self, requests: List[dict], use_cache: bool = True
+    ) -> BatchJob:
+        """
+        Submit independent tool requests as a single batch job.
+
+        Each request holds the keyword arguments of `ask_tool` (messages,
+        system_msgs, tools, tool_choice, temperature, ...). Requests answered
+        by the response cache resolve immediately and are not uploaded.
+
+        Args:
+            requests: Keyword arguments for each request
+            use_cache: Whether to read from and write to the response cache
+
+        Returns:
+            BatchJob: Job with one future per request, keyed by custom_id
+
+        Raises:
+            TokenLimitExceeded: If a request exceeds the token limits
+            ValueError: If a request is invalid or batching is unsupported
+        """
+        if self.batch_backend is None:
+            raise ValueError(f"Batch submission is not supported for {self.api_type}")
+
+        lines = []
+        cached = {}
+        cache_keys = {}
+        for index, request in enumerate(requests):
+            custom_id = f"request-{index}"
+            params, _ = self._build_tool_request(**request)
+
+            cache_key = (
+                self._request_key("ask_tool", params)
+                if use_cache and self._caching
+                else None
+            )
+            cache_keys[custom_id] = cache_key
+            hit = await self.response_cache.aget(cache_key) if cache_key else None
+            if hit is not None:
+                cached[custom_id] = ChatCompletionMessage.model_validate_json(hit)
+                continue
+            lines.append(build_request_line(custom_id, params))
+
+        job_id = await self.batch_backend.submit(lines) if lines else None
+        job = BatchJob(job_id, [f"request-{i}" for i in range(len(requests))])
+        job.cache_keys = cache_keys
+        for custom_id, message in cached.items():
+            job.futures[custom_id].set_result(message)
+
+        logger.info(
+            f"Submitted batch {job_id} with {len(lines)} requests "
+            f"({len(cached)} answered from cache)"
+        )
+        return job
+
+    async def await_batch(
+        self,
+        job: BatchJob,
+        poll_interval: float = 30.0,
+        timeout: Optional[float] = None,
+        return_exceptions: bool = False,
+    ) -> List[Union[ChatCompletionMessage, BaseException]]:
+        """
+        Wait for a batch job and resolve its futures.
+
+        Args:
+            job: Job returned by `submit_batch`
+            poll_interval: Seconds between status checks
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+            return_exceptions: Return failed requests as exceptions instead of
+                raising the first failure
+
+        Returns:
+            List of response messages in request order
+
+        Raises:
+            BatchError: If a request failed and return_exceptions is False
+            TimeoutError: If the job does not finish within timeout
+        """
+        if job.pending:
+            results = await wait_for_results(
+                self.batch_backend, job.id, poll_interval, timeout
+            )
+            job.status = "completed"
+            for result in results:
+                future = job.futures.get(result.get("custom_id"))
+                if future is None or future.done():
+                    continue
+                error = result_error(result)
+                if error:
+                    future.set_exception(BatchError(error))
+                    continue
+
+                try:
+                    response = ChatCompletion.model_validate(result["response"]["body"])
+                except ValidationError as e:
+                    future.set_exception(BatchError(f"Unreadable response: {e}"))
+                    continue
+                if response.usage:
+                    self.update_token_count(
+                        response.usage.prompt_tokens, response.usage.completion_tokens
+                    )
+                message = response.choices[0].message
+                cache_key = job.cache_keys.get(result["custom_id"])
+                if cache_key:
+                    await self.response_cache.aset(cache_key, message.model_dump_json())
+                future.set_result(message)
+
+            for custom_id in job.pending:
+                job.futures[custom_id].set_exception(
+                    BatchError(f"No result returned for {custom_id}")
+                )
+
+        return await asyncio.gather(
+            *(job.futures[cid] for cid in job.custom_ids),
+            return_exceptions=return_exceptions,
+        )
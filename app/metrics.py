@@ -0,0 +1,353 @@
+"""Usage and latency metrics attributed to the run, agent, step and tool.
+
+Attribution labels live in a context variable, so every counter increment or
+latency observation made while a run is executing is tagged with that run
+without threading identifiers through call signatures. Tasks inherit the
+labels of the code that created them.
+"""
+
+import json
+import math
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Labels naming one run or step; their series are folded away once it is over
+RUN_LABELS = ("run", "step")
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_labels: ContextVar[Dict[str, str]] = ContextVar("metric_labels", default={})
+
+
+@contextmanager
+def metric_context(**labels) -> Iterator[None]:
+    """Attribute metrics recorded inside the block to the given labels.
+
+    Example:
+        with metric_context(run="a1b2", agent="manus"):
+            ...  # LLM and tool metrics recorded here carry both labels
+    """
+    merged = {**_labels.get()}
+    merged.update({k: str(v) for k, v in labels.items() if v is not None})
+    token = _labels.set(merged)
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def current_labels() -> Dict[str, str]:
+    """Return the attribution labels of the current context."""
+    return dict(_labels.get())
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    merged = {**_labels.get()}
+    merged.update({k: str(v) for k, v in labels.items() if v is not None})
+    return tuple(sorted(merged.items()))
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        name
+        + '="'
+        + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """A named metric whose series are keyed by their labels."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, description: str, lock: threading.Lock):
+        self.name = name
+        self.description = description
+        self._lock = lock
+        self._series: Dict[LabelKey, object] = {}
+
+    def series(self) -> Dict[LabelKey, object]:
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._series.items()}
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def retire(self, wanted: Dict[str, str], drop: Sequence[str]) -> None:
+        """Merge the series matching `wanted` into series without `drop` labels."""
+        with self._lock:
+            for key in [k for k in self._series if wanted.items() <= dict(k).items()]:
+                value = self._series.pop(key)
+                folded = tuple(pair for pair in key if pair[0] not in drop)
+                if folded in self._series:
+                    value = self._merge(self._series[folded], value)
+                self._series[folded] = value
+
+    @staticmethod
+    def _merge(a, b):
+        return a + b
+
+
+class Counter(Metric):
+    """A monotonically increasing total."""
+
+    type = "counter"
+
+    def inc(self, value: float = 1, **labels) -> None:
+        if value <= 0:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        """Sum of every series whose labels include the given ones."""
+        wanted = {k: str(v) for k, v in labels.items()}
+        return sum(
+            total
+            for key, total in self.series().items()
+            if wanted.items() <= dict(key).items()
+        )
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        lock: threading.Lock,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, lock)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    @staticmethod
+    def _copy(value):
+        counts, total, count = value
+        return list(counts), total, count
+
+    @staticmethod
+    def _merge(a, b):
+        return [x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts, total, count = self._series.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._series[key] = (counts, total + value, count + 1)
+
+    def stats(self, **labels) -> Tuple[float, int]:
+        """Total and count of observations whose labels include the given ones."""
+        wanted = {k: str(v) for k, v in labels.items()}
+        total, count = 0.0, 0
+        for key, (_, series_total, series_count) in self.series().items():
+            if wanted.items() <= dict(key).items():
+                total += series_total
+                count += series_count
+        return total, count
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them for export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self._register(Counter(name, description, self._lock))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, description, self._lock, buckets))
+
+    def _register(self, metric: Metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"Metric {metric.name} is already a {existing.type}")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def metrics(self) -> List[Metric]:
+        return list(self._metrics.values())
+
+    def reset(self) -> None:
+        """Drop every recorded series, keeping the metric definitions."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def retire(self, **labels) -> None:
+        """Fold the series of a finished run into series without run labels.
+
+        Process-wide totals are kept, but the number of series no longer
+        grows with every run and step a long-lived process executes. Call it
+        once the run's own `summary` is no longer needed.
+
+        Example:
+            metrics.retire(run="a1b2")
+        """
+        wanted = {k: str(v) for k, v in labels.items()}
+        for metric in self._metrics.values():
+            metric.retire(wanted, RUN_LABELS)
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            series = metric.series()
+            if not series:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for key, value in sorted(series.items()):
+                if isinstance(metric, Histogram):
+                    counts, total, count = value
+                    for bound, bucket_count in zip(metric.buckets, counts):
+                        labels = _format_labels(key, [("le", _format_value(bound))])
+                        lines.append(f"{metric.name}_bucket{labels} {bucket_count}")
+                    labels = _format_labels(key)
+                    lines.append(f"{metric.name}_sum{labels} {_format_value(total)}")
+                    lines.append(f"{metric.name}_count{labels} {count}")
+                else:
+                    lines.append(
+                        f"{metric.name}{_format_labels(key)} {_format_value(value)}"
+                    )
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def to_json(self) -> Dict[str, dict]:
+        """Render all metrics as a JSON-serializable dict."""
+        result = {}
+        for metric in self._metrics.values():
+            series = []
+            for key, value in sorted(metric.series().items()):
+                if isinstance(metric, Histogram):
+                    counts, total, count = value
+                    series.append(
+                        {
+                            "labels": dict(key),
+                            "count": count,
+                            "sum": total,
+                            "buckets": {
+                                _format_value(bound): bucket_count
+                                for bound, bucket_count in zip(metric.buckets, counts)
+                            },
+                        }
+                    )
+                else:
+                    series.append({"labels": dict(key), "value": value})
+            result[metric.name] = {
+                "type": metric.type,
+                "description": metric.description,
+                "series": series,
+            }
+        return result
+
+    def summary(self, **labels) -> Dict[str, float]:
+        """Totals of every metric restricted to series matching labels.
+
+        Histograms contribute `<name>_sum` and `<name>_count` entries.
+        """
+        result = {}
+        for metric in self._metrics.values():
+            if isinstance(metric, Histogram):
+                total, count = metric.stats(**labels)
+                if count:
+                    result[f"{metric.name}_sum"] = total
+                    result[f"{metric.name}_count"] = count
+            elif isinstance(metric, Counter):
+                value = metric.value(**labels)
+                if value:
+                    result[metric.name] = value
+        return result
+
+    def write(self, path: str, fmt: Optional[str] = None) -> None:
+        """Write all metrics to path as Prometheus text or JSON.
+
+        Args:
+            path: Output file path
+            fmt: "prometheus" or "json"; inferred from the suffix when omitted
+        """
+        fmt = fmt or ("json" if str(path).endswith(".json") else "prometheus")
+        with open(path, "w", encoding="utf-8") as f:
+            if fmt == "json":
+                json.dump(self.to_json(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+
+
+metrics = MetricsRegistry()
+
+LLM_REQUESTS = metrics.counter(
+    "openmanus_llm_requests_total", "LLM completion requests sent upstream"
+)
+LLM_LATENCY = metrics.histogram(
+    "openmanus_llm_request_seconds",
+    "LLM request latency; time to first chunk for streams",
+)
+LLM_INPUT_TOKENS = metrics.counter(
+    "openmanus_llm_input_tokens_total", "Prompt tokens sent to the LLM"
+)
+LLM_COMPLETION_TOKENS = metrics.counter(
+    "openmanus_llm_completion_tokens_total", "Completion tokens received from the LLM"
+)
+LLM_RETRIES = metrics.counter(
+    "openmanus_llm_retries_total", "LLM calls retried after an error"
+)
+LLM_CACHE_HITS = metrics.counter(
+    "openmanus_llm_cache_hits_total", "LLM requests answered by the response cache"
+)
+LLM_CACHE_MISSES = metrics.counter(
+    "openmanus_llm_cache_misses_total", "LLM requests not found in the response cache"
+)
+LLM_COALESCED = metrics.counter(
+    "openmanus_llm_coalesced_total", "LLM requests served by an identical in-flight one"
+)
+TOOL_CALLS = metrics.counter("openmanus_tool_calls_total", "Tool executions")
+TOOL_LATENCY = metrics.histogram("openmanus_tool_seconds", "Tool execution latency")
+TOOL_MEMO_HITS = metrics.counter(
+    "openmanus_tool_memo_hits_total", "Tool calls answered by the per-run memo"
+)
+PLAN_CACHE_HITS = metrics.counter(
+    "openmanus_plan_cache_hits_total", "Plans reused from the plan template cache"
+)
+PLAN_CACHE_MISSES = metrics.counter(
+    "openmanus_plan_cache_misses_total",
+    "Plan requests not found in the plan template cache",
+)
@@ -0,0 +1,212 @@
+"""Storage for tool outputs too large to keep in agent memory."""
+
+import re
+import shutil
+import tempfile
+import uuid
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+_current_store: ContextVar[Optional["ObservationStore"]] = ContextVar(
+    "observation_store", default=None
+)
+
+
+_SPILLED_HANDLE = re.compile(r"observation '(obs_[0-9a-f]+)'")
+
+
+def spilled_handle(text: str) -> Optional[str]:
+    """The handle named by a spilled observation's preview, if text is one."""
+    match = _SPILLED_HANDLE.search(text)
+    return match.group(1) if match else None
+
+
+def current_observation_store() -> Optional["ObservationStore"]:
+    """The observation store of the agent run executing in this context."""
+    return _current_store.get()
+
+
+@contextmanager
+def observation_scope(store: "ObservationStore") -> Iterator["ObservationStore"]:
+    """Make store the current one for the block."""
+    token = _current_store.set(store)
+    try:
+        yield store
+    finally:
+        _current_store.reset(token)
+
+
+class ObservationStore:
+    """Writes large observations to blob files and pages through them.
+
+    An observation longer than `threshold` characters is saved to a file in a
+    temporary directory owned by the store. Memory then keeps only a preview
+    of its head and tail plus a handle that `read_observation` accepts.
+
+    Handles are unique across stores, so a handle left in memory can never
+    name another store's output. The blobs are deleted once the store is no
+    longer referenced; copies of a store are the store itself.
+    """
+
+    def __init__(self, threshold: int = 10000, preview_chars: int = 2000):
+        self.threshold = threshold
+        self.preview_chars = preview_chars
+        self.directory: Optional[Path] = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    def __copy__(self) -> "ObservationStore":
+        return self
+
+    def __deepcopy__(self, memo) -> "ObservationStore":
+        return self
+
+    @property
+    def page_chars(self) -> int:
+        """Maximum characters returned by one read, kept below the threshold."""
+        return max(self.threshold // 2, 1)
+
+    def spill(self, observation: str) -> str:
+        """Store observation if it is large and return what memory should keep."""
+        if len(observation) <= self.threshold:
+            return observation
+
+        handle = self.put(observation)
+
+        half = min(self.preview_chars, self.threshold) // 2
+        lines = observation.count("\n") + 1
+        return (
+            f"{observation[:half]}\n"
+            f"... [{len(observation) - 2 * half} characters omitted] ...\n"
+            f"{observation[-half:]}\n\n"
+            f"[Output of {len(observation)} characters ({lines} lines) stored as "
+            f"observation '{handle}'. Use the `read_observation` tool with this "
+            f"handle to read it by line offset or search it with a pattern.]"
+        )
+
+    def put(self, observation: str) -> str:
+        """Store an observation regardless of its size and return its handle."""
+        handle = f"obs_{uuid.uuid4().hex[:12]}"
+        self._write(handle, observation)
+        return handle
+
+    def read(self, handle: str, offset: int = 0, limit: int = 100) -> str:
+        """Return up to `limit` lines starting at line `offset` (0-based).
+
+        Raises:
+            KeyError: If no observation is stored under the handle
+        """
+        total = 0
+        selected: List[str] = []
+        for number, line in enumerate(self._lines(handle)):
+            total = number + 1
+            if offset <= number < offset + limit:
+                selected.append(line)
+        if offset >= total and total:
+            return f"Offset {offset} is past the end of '{handle}' ({total} lines)"
+
+        body = self._clip("".join(selected))
+        last = offset + len(selected)
+        header = f"[{handle}: lines {offset}-{last - 1} of {total}]"
+        if last < total:
+            header += f" (next offset: {last})"
+        return f"{header}\n{body}"
+
+    def grep(
+        self, handle: str, pattern: str, context: int = 0, max_matches: int = 50
+    ) -> str:
+        """Return lines matching a regular expression, with line numbers.
+
+        Raises:
+            KeyError: If no observation is stored under the handle
+            re.error: If the pattern is not a valid regular expression
+        """
+        regex = re.compile(pattern)
+        recent: List[str] = []
+        output: List[str] = []
+        matches = 0
+        trailing = 0
+        last_emitted = -1
+        for number, line in enumerate(self._lines(handle)):
+            formatted = f"{number}: {line.rstrip()}"
+            if regex.search(line):
+                if matches == max_matches:
+                    output.append(f"... stopped after {max_matches} matches")
+                    break
+                matches += 1
+                first = number - len(recent)
+                if last_emitted >= 0 and first > last_emitted + 1:
+                    output.append("--")
+                output.extend(recent)
+                output.append(formatted)
+                recent.clear()
+                trailing = context
+                last_emitted = number
+            elif trailing:
+                output.append(formatted)
+                trailing -= 1
+                last_emitted = number
+            elif context:
+                recent = (recent + [formatted])[-context:]
+
+        if not matches:
+            return f"No lines of '{handle}' match {pattern!r}"
+        return self._clip(f"[{handle}: {matches} matching lines]\n" + "\n".join(output))
+
+    def dump(self) -> Dict[str, str]:
+        """Every stored observation by handle, e.g. for a checkpoint."""
+        if self.directory is None:
+            return {}
+        return {
+            path.stem: path.read_text(encoding="utf-8")
+            for path in self.directory.glob("obs_*.txt")
+        }
+
+    def load(self, observations: Dict[str, str]) -> None:
+        """Store observations captured by `dump` under their handles."""
+        for handle, observation in observations.items():
+            if self._valid(handle):
+                self._write(handle, observation)
+
+    def cleanup(self) -> None:
+        """Delete every stored observation."""
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self.directory = None
+
+    def _write(self, handle: str, observation: str) -> None:
+        if self.directory is None:
+            self.directory = Path(tempfile.mkdtemp(prefix="openmanus-observations-"))
+            self._finalizer = weakref.finalize(
+                self, shutil.rmtree, self.directory, ignore_errors=True
+            )
+        self._path(handle).write_text(observation, encoding="utf-8")
+
+    def _path(self, handle: str) -> Path:
+        return self.directory / f"{handle}.txt"
+
+    @staticmethod
+    def _valid(handle: str) -> bool:
+        return re.fullmatch(r"obs_[0-9a-f]+", handle) is not None
+
+    def _lines(self, handle: str) -> Iterator[str]:
+        if (
+            self.directory is None
+            or not self._valid(handle)
+            or not self._path(handle).exists()
+        ):
+            raise KeyError(handle)
+        with open(self._path(handle), encoding="utf-8") as f:
+            yield from f
+
+    def _clip(self, text: str) -> str:
+        if len(text) <= self.page_chars:
+            return text
+        return (
+            text[: self.page_chars]
+            + "\n... [page truncated; read fewer lines or narrow the pattern]"
+        )
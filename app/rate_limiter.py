@@ -0,0 +1,209 @@
+"""Client-side rate limiting for LLM endpoints."""
+
+import asyncio
+import inspect
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterable, Optional
+
+from app.logger import logger
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.refill_per_second = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated_at) * self.refill_per_second,
+        )
+        self.updated_at = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Async limiter shared by every caller of one LLM configuration.
+
+    Requests are admitted in FIFO order once a concurrency slot is free and the
+    requests-per-minute and tokens-per-minute buckets can cover them. The
+    concurrency window adapts AIMD-style: it grows by roughly one slot per
+    window of successful requests and halves on every rate-limit response,
+    which also pauses admission for the server's Retry-After delay.
+    """
+
+    DEFAULT_BACKOFF = 5.0  # seconds to pause when a 429 carries no Retry-After
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.concurrency = float(self.max_concurrency)
+
+        self._requests = TokenBucket(rpm) if rpm else None
+        self._tokens = TokenBucket(tpm) if tpm else None
+        self._blocked_until = 0.0
+        self._in_flight = 0
+
+        self.rate_limited_count = 0
+        self.total_wait_seconds = 0.0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue_lock: Optional[asyncio.Lock] = None
+        self._slot_freed: Optional[asyncio.Event] = None
+
+    def _bind_loop(self) -> None:
+        """(Re)create asyncio primitives for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._queue_lock = asyncio.Lock()
+            self._slot_freed = asyncio.Event()
+            self._in_flight = 0
+
+    async def admit(self, tokens: int = 0) -> None:
+        """Wait for admission of a request estimated at `tokens` input tokens.
+
+        The request holds a concurrency slot until `release` is called.
+        """
+        self._bind_loop()
+        started = time.monotonic()
+        async with self._queue_lock:
+            # Only the head of the queue waits here, so admission stays FIFO
+            while self._in_flight >= int(self.concurrency):
+                self._slot_freed.clear()
+                await self._slot_freed.wait()
+            self._in_flight += 1
+
+            try:
+                while True:
+                    delay = max(
+                        self._blocked_until - time.monotonic(),
+                        self._requests.delay_for(1) if self._requests else 0.0,
+                        self._tokens.delay_for(tokens) if self._tokens else 0.0,
+                    )
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+            except BaseException:
+                self.release()
+                raise
+
+            if self._requests:
+                self._requests.consume(1)
+            if self._tokens:
+                self._tokens.consume(tokens)
+
+        self.total_wait_seconds += time.monotonic() - started
+
+    def release(self) -> None:
+        """Free the concurrency slot of an admitted request."""
+        self._in_flight = max(0, self._in_flight - 1)
+        self._slot_freed.set()
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int = 0):
+        """Hold admission of a request for the duration of the block."""
+        await self.admit(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def hold(self, stream: AsyncIterable) -> "HeldStream":
+        """Wrap an admitted streaming response so it keeps its slot until it ends.
+
+        Long streams thus count against the concurrency window while they run.
+        """
+        return HeldStream(self, stream)
+
+    def on_success(self) -> None:
+        """Additive increase of the concurrency window."""
+        if self.concurrency < self.max_concurrency:
+            self.concurrency = min(
+                float(self.max_concurrency), self.concurrency + 1 / self.concurrency
+            )
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease of the window and a pause for Retry-After."""
+        self.rate_limited_count += 1
+        self.concurrency = max(float(self.min_concurrency), self.concurrency / 2)
+        pause = retry_after if retry_after is not None else self.DEFAULT_BACKOFF
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        logger.warning(
+            f"Rate limited by LLM endpoint; pausing {pause:.1f}s, "
+            f"concurrency window now {int(self.concurrency)}"
+        )
+
+
+class HeldStream:
+    """A streaming response holding a RateLimiter slot until it ends.
+
+    The slot is freed once the stream is drained, fails or is closed with
+    `aclose`, which is idempotent and also runs on leaving `async with`.
+    Callers that may stop iterating early must close the stream; one dropped
+    without being closed frees its slot when it is garbage collected.
+    """
+
+    def __init__(self, limiter: RateLimiter, stream: AsyncIterable):
+        self._stream = stream
+        self._iterator = None
+        self._release = weakref.finalize(self, limiter.release)
+
+    def __aiter__(self) -> "HeldStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        if not self._release.alive:
+            raise StopAsyncIteration
+        if self._iterator is None:
+            self._iterator = self._stream.__aiter__()
+        try:
+            return await self._iterator.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+
+    async def aclose(self) -> None:
+        """Free the slot and close the underlying stream, if still open."""
+        if not self._release.alive:
+            return
+        self._release()
+        close = getattr(self._stream, "aclose", None) or getattr(
+            self._stream, "close", None
+        )
+        if close is not None:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+    async def __aenter__(self) -> "HeldStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
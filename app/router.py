@@ -0,0 +1,205 @@
+"""Latency-aware routing and hedged requests across several LLM endpoints."""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from openai import BadRequestError
+
+from app.logger import logger
+
+
+class EndpointStats:
+    """Rolling latency samples and failure state for one endpoint."""
+
+    FAILURE_COOLDOWN = 30.0  # seconds an endpoint is ranked last after an error
+
+    def __init__(self, window: int = 100):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile latency in seconds, or None without samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self.percentile(95)
+
+    @property
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.latencies.append(latency)
+        self.cooldown_until = 0.0
+
+    def record_abandoned(self, elapsed: float) -> None:
+        """Record a request cancelled after `elapsed` seconds as a lower bound."""
+        self.requests += 1
+        self.latencies.append(elapsed)
+
+    def record_failure(self) -> None:
+        self.requests += 1
+        self.failures += 1
+        self.cooldown_until = time.monotonic() + self.FAILURE_COOLDOWN
+
+
+class Endpoint:
+    """An OpenAI-compatible client together with the model it serves."""
+
+    def __init__(self, name: str, client: Any, model: str):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.stats = EndpointStats()
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.name!r}, model={self.model!r})"
+
+
+class RouterCompletions:
+    """Exposes the router through the `client.chat.completions.create` shape."""
+
+    def __init__(self, router: "RouterClient"):
+        self.router = router
+
+    async def create(self, **params):
+        return await self.router.create(**params)
+
+
+class RouterChat:
+    def __init__(self, router: "RouterClient"):
+        self.completions = RouterCompletions(router)
+
+
+class RouterClient:
+    """Routes chat completions to the fastest healthy endpoint.
+
+    Endpoints are ranked by rolling median latency, with endpoints that failed
+    recently ranked last and endpoints without samples tried first so every
+    endpoint gets measured. A non-streaming request that has not answered
+    within the `hedge_percentile` latency of its endpoint is duplicated on the
+    next endpoint, and the first answer wins. Failed requests fail over to the
+    next endpoint. Streaming requests fail over but are never hedged.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        hedge_percentile: Optional[float] = 95.0,
+        hedge_default_delay: float = 10.0,
+    ):
+        if not endpoints:
+            raise ValueError("A router needs at least one endpoint")
+        self.endpoints = endpoints
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_delay = hedge_default_delay
+        self.hedged_requests = 0
+        self.chat = RouterChat(self)
+
+    def ranked(self) -> List[Endpoint]:
+        """Endpoints in the order they should be tried."""
+        return sorted(
+            self.endpoints,
+            key=lambda e: (e.stats.cooling_down, e.stats.p50 or 0.0),
+        )
+
+    def hedge_delay(self, endpoint: Endpoint) -> Optional[float]:
+        """Seconds to wait on endpoint before sending a hedged duplicate."""
+        if not self.hedge_percentile:
+            return None
+        delay = endpoint.stats.percentile(self.hedge_percentile)
+        return delay if delay is not None else self.hedge_default_delay
+
+    async def create(self, **params):
+        if params.get("stream"):
+            return await self._failover(params)
+        return await self._hedged(params)
+
+    async def _call(self, endpoint: Endpoint, params: Dict[str, Any]):
+        started = time.monotonic()
+        try:
+            response = await endpoint.client.chat.completions.create(
+                **{**params, "model": endpoint.model}
+            )
+        except asyncio.CancelledError:
+            # Usually a lost hedge race; it was at least this slow
+            endpoint.stats.record_abandoned(time.monotonic() - started)
+            raise
+        except Exception as e:
+            endpoint.stats.record_failure()
+            logger.warning(f"LLM endpoint '{endpoint.name}' failed: {e}")
+            raise
+        endpoint.stats.record_success(time.monotonic() - started)
+        return response
+
+    async def _failover(self, params: Dict[str, Any]):
+        """Try endpoints one at a time until one succeeds."""
+        last_error: Optional[Exception] = None
+        for endpoint in self.ranked():
+            try:
+                return await self._call(endpoint, params)
+            except BadRequestError:
+                raise  # The request itself is invalid; other endpoints agree
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    async def _hedged(self, params: Dict[str, Any]):
+        """Race the best endpoint against hedged duplicates on the next ones."""
+        candidates = self.ranked()
+        pending: Dict[asyncio.Task, Endpoint] = {}
+        last_error: Optional[Exception] = None
+
+        def launch() -> Endpoint:
+            endpoint = candidates.pop(0)
+            task = asyncio.create_task(self._call(endpoint, params))
+            pending[task] = endpoint
+            return endpoint
+
+        latest = launch()
+        try:
+            while pending:
+                timeout = self.hedge_delay(latest) if candidates else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    self.hedged_requests += 1
+                    logger.info(
+                        f"LLM endpoint '{latest.name}' slower than {timeout:.1f}s, "
+                        f"hedging on '{candidates[0].name}'"
+                    )
+                    latest = launch()
+                    continue
+
+                for task in done:
+                    pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if isinstance(error, BadRequestError):
+                        raise error
+                    last_error = error
+
+                if not pending and candidates:
+                    latest = launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
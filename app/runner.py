@@ -0,0 +1,267 @@
+"""Run many isolated agent sessions concurrently on one event loop."""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import AsyncIterator, Callable, Iterable, Iterator, Optional, Set, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.agent.base import BaseAgent
+from app.llm import LLM
+from app.logger import logger
+from app.metrics import metric_context, metrics
+from app.sandbox.client import sandbox_session
+
+
+AgentFactory = Callable[[LLM], BaseAgent]
+
+
+def default_agent_factory(llm: LLM) -> BaseAgent:
+    """Create a Manus agent bound to a session's LLM."""
+    from app.agent.manus import Manus
+
+    return Manus(llm=llm)
+
+
+class SessionResult(BaseModel):
+    """Outcome of one agent session."""
+
+    session_id: str = Field(..., description="Identifier of the session")
+    prompt: str = Field(..., description="Request the agent was given")
+    output: Optional[str] = Field(None, description="Agent output on success")
+    error: Optional[str] = Field(None, description="Error message on failure")
+    input_tokens: int = Field(0, description="Prompt tokens used by the session")
+    completion_tokens: int = Field(0, description="Completion tokens used")
+    duration: float = Field(0.0, description="Wall-clock seconds")
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class SessionRunner:
+    """Schedules agent sessions with per-session state isolation.
+
+    Each session gets a fresh agent (and with it fresh memory and tool
+    instances), a fork of the LLM with its own token counters and budget, and
+    its own sandbox client. Tools holding an LLM of their own, like the
+    browser tool, are switched to the session's fork when they hold the
+    runner's LLM, and get a fork of theirs otherwise. The API client,
+    tokenizer, response cache and rate limiter are shared, so sessions reuse
+    connections and queue fairly for the endpoint. At most `max_concurrency`
+    sessions run at once.
+    """
+
+    def __init__(
+        self,
+        agent_factory: AgentFactory = default_agent_factory,
+        max_concurrency: int = 4,
+        llm: Optional[LLM] = None,
+    ):
+        self.agent_factory = agent_factory
+        self.max_concurrency = max(1, max_concurrency)
+        self.llm = llm
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, prompt: str, session_id: Optional[str] = None) -> SessionResult:
+        """Run one session once a concurrency slot is free.
+
+        Errors are captured in the result rather than raised, so one failing
+        session never takes down the others.
+        """
+        session_id = session_id or uuid.uuid4().hex[:8]
+        async with self._get_semaphore():
+            return await self._run_session(session_id, prompt)
+
+    async def _run_session(self, session_id: str, prompt: str) -> SessionResult:
+        started = time.monotonic()
+        base_llm = self.llm or LLM()
+        llm = base_llm.fork()
+        result = SessionResult(session_id=session_id, prompt=prompt)
+
+        logger.info(f"🚀 Starting session {session_id}")
+        async with sandbox_session():
+            with metric_context(run=session_id):
+                agent = self.agent_factory(llm)
+                self._fork_tool_llms(agent, base_llm, llm)
+                try:
+                    result.output = await agent.run(prompt)
+                except Exception as e:
+                    logger.exception(f"Session {session_id} failed")
+                    result.error = f"{type(e).__name__}: {e}"
+                finally:
+                    cleanup = getattr(agent, "cleanup", None)
+                    if cleanup:
+                        await cleanup()
+
+        # The session's usage is in the result; keep only process totals
+        metrics.retire(run=session_id)
+        result.input_tokens = llm.total_input_tokens
+        result.completion_tokens = llm.total_completion_tokens
+        result.duration = time.monotonic() - started
+        logger.info(
+            f"🏁 Session {session_id} {'completed' if result.ok else 'failed'} "
+            f"in {result.duration:.1f}s"
+        )
+        return result
+
+    @staticmethod
+    def _fork_tool_llms(agent: BaseAgent, base_llm: LLM, llm: LLM) -> None:
+        """Give the agent's tools session-scoped LLMs, so they share no counters."""
+        for tool in getattr(agent, "available_tools", None) or ():
+            tool_llm = getattr(tool, "llm", None)
+            if isinstance(tool_llm, LLM):
+                tool.llm = llm if tool_llm is base_llm else tool_llm.fork()
+
+    async def run_many(
+        self, requests: Iterable[Tuple[str, str]]
+    ) -> AsyncIterator[SessionResult]:
+        """Run sessions concurrently and yield results as they finish.
+
+        Requests are pulled from the iterable only as concurrency slots free
+        up, so a lazily read input file is never loaded whole.
+
+        Args:
+            requests: (session_id, prompt) pairs
+
+        Yields:
+            SessionResult: Results in completion order. Sessions still running
+                when the consumer stops iterating are cancelled.
+        """
+        pending_requests = iter(requests)
+        tasks = set()
+
+        def fill() -> None:
+            for session_id, prompt in pending_requests:
+                tasks.add(asyncio.create_task(self.run(prompt, session_id)))
+                if len(tasks) >= self.max_concurrency:
+                    return
+
+        try:
+            fill()
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                tasks.difference_update(done)
+                fill()
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def read_prompts(
+    path: str,
+    prompt_field: str = "prompt",
+    id_field: str = "id",
+    skip_ids: Optional[Set[str]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Lazily read (session_id, prompt) pairs from a JSONL file.
+
+    Each line is either a JSON object carrying the prompt under `prompt_field`
+    or a bare JSON string. Lines without an `id_field` are identified by their
+    line number. Blank lines and ids in `skip_ids` are skipped.
+
+    Raises:
+        ValueError: If a line is not valid JSON or has no prompt
+    """
+    skip_ids = skip_ids or set()
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON: {e}") from e
+
+            if isinstance(record, str):
+                session_id, prompt = str(line_number), record
+            elif isinstance(record, dict) and isinstance(record.get(prompt_field), str):
+                session_id = str(record.get(id_field, line_number))
+                prompt = record[prompt_field]
+            else:
+                raise ValueError(
+                    f"{path}:{line_number}: expected a string or an object "
+                    f"with a '{prompt_field}' field"
+                )
+
+            if session_id not in skip_ids:
+                yield session_id, prompt
+
+
+def completed_session_ids(path: str) -> Set[str]:
+    """Ids of sessions that already succeeded in an output JSONL file.
+
+    A truncated last line, left behind by a crash mid-write, is ignored.
+    """
+    if not os.path.exists(path):
+        return set()
+    completed = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and record.get("error") is None:
+                completed.add(str(record.get("session_id")))
+    return completed
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    runner: Optional[SessionRunner] = None,
+    prompt_field: str = "prompt",
+    id_field: str = "id",
+    resume: bool = True,
+) -> Tuple[int, int]:
+    """Run every prompt in a JSONL file and append results to another.
+
+    Each result is written and flushed as soon as its session finishes, so a
+    crash loses only the sessions still running. With `resume`, sessions that
+    already succeeded in the output file are skipped and failed ones rerun.
+
+    Args:
+        input_path: JSONL file of prompts, see `read_prompts`
+        output_path: JSONL file that receives one `SessionResult` per line
+        runner: Runner that schedules the sessions; a default one if omitted
+        prompt_field: Field of each input object holding the prompt
+        id_field: Field of each input object holding the session id
+        resume: Whether to skip sessions already completed in `output_path`
+
+    Returns:
+        Tuple[int, int]: Number of succeeded and failed sessions in this run
+    """
+    runner = runner or SessionRunner()
+    skip_ids = completed_session_ids(output_path) if resume else set()
+    if skip_ids:
+        logger.info(f"Skipping {len(skip_ids)} sessions completed in {output_path}")
+
+    succeeded = failed = 0
+    started = time.monotonic()
+    requests = read_prompts(input_path, prompt_field, id_field, skip_ids)
+    with open(output_path, "a", encoding="utf-8") as out:
+        async for result in runner.run_many(requests):
+            out.write(result.model_dump_json() + "\n")
+            out.flush()
+            if result.ok:
+                succeeded += 1
+            else:
+                failed += 1
+
+    logger.info(
+        f"📦 Batch finished: {succeeded} succeeded, {failed} failed "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return succeeded, failed
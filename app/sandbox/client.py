@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, Protocol
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, Optional, Protocol
 
 from app.config import SandboxSettings
 from app.sandbox.core.sandbox import DockerSandbox
@@ -199,3 +201,53 @@ def create_sandbox_client() -> LocalSandboxClient:
 
 
 SANDBOX_CLIENT = create_sandbox_client()
+
+_session_client: ContextVar[Optional[LocalSandboxClient]] = ContextVar(
+    "sandbox_client", default=None
+)
+_shared: ContextVar[bool] = ContextVar("sandbox_shared", default=False)
+
+
+def get_sandbox_client() -> LocalSandboxClient:
+    """Returns the sandbox client of the current session.
+
+    Returns:
+        LocalSandboxClient: The session's client, or the process-wide
+            SANDBOX_CLIENT outside of a session.
+    """
+    return _session_client.get() or SANDBOX_CLIENT
+
+
+@asynccontextmanager
+async def sandbox_session() -> AsyncIterator[LocalSandboxClient]:
+    """Gives the enclosed code, and tasks it starts, a private sandbox client.
+
+    Yields:
+        LocalSandboxClient: The session's client, cleaned up on exit.
+    """
+    client = create_sandbox_client()
+    token = _session_client.set(client)
+    try:
+        yield client
+    finally:
+        _session_client.reset(token)
+        await client.cleanup()
+
+
+@contextmanager
+def shared_sandbox() -> Iterator[None]:
+    """Marks the current sandbox as owned by an enclosing scope, e.g. a flow.
+
+    Agent runs inside the block leave the sandbox running instead of cleaning
+    it up, so concurrent and consecutive runs share it; the owner cleans it up.
+    """
+    token = _shared.set(True)
+    try:
+        yield
+    finally:
+        _shared.reset(token)
+
+
+def is_sandbox_shared() -> bool:
+    """Whether the current sandbox is owned by an enclosing scope."""
+    return _shared.get()
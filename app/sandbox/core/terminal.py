@@ -15,6 +15,8 @@ from docker import APIClient
 from docker.errors import APIError
 from docker.models.containers import Container
 
+from app.tracing import traced
+
 
 class DockerSession:
     def __init__(self, container_id: str) -> None:
@@ -136,6 +138,7 @@ class DockerSession:
                 raise
         return buffer.decode("utf-8")
 
+    @traced("sandbox.execute")
     async def execute(self, command: str, timeout: Optional[int] = None) -> str:
         """Executes a command and returns cleaned output.
 
@@ -1,7 +1,9 @@
 from enum import Enum
-from typing import Any, List, Literal, Optional, Union
+from typing import Any, Callable, ClassVar, List, Literal, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from app.observation import ObservationStore, spilled_handle
 
 
 class Role(str, Enum):
@@ -160,24 +162,43 @@ class Memory(BaseModel):
     messages: List[Message] = Field(default_factory=list)
     max_messages: int = Field(default=100)
 
+    # Characters of an old observation kept when it is compacted
+    OBSERVATION_DIGEST_CHARS: ClassVar[int] = 300
+
+    # Large observations the messages refer to by handle; copies share it
+    _observations: Optional[ObservationStore] = PrivateAttr(default=None)
+
     def add_message(self, message: Message) -> None:
         """Add a message to memory"""
         self.messages.append(message)
-        # Optional: Implement message limit
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+        self._trim()
 
     def add_messages(self, messages: List[Message]) -> None:
         """Add multiple messages to memory"""
         self.messages.extend(messages)
-        # Optional: Implement message limit
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+        self._trim()
+
+    def _trim(self) -> None:
+        """Apply the message limit without orphaning tool responses."""
+        if len(self.messages) <= self.max_messages:
+            return
+        messages = self.messages[-self.max_messages :]
+        # Tool responses whose tool_calls were cut off would be rejected by the API
+        start = 0
+        while start < len(messages) and messages[start].role == Role.TOOL:
+            start += 1
+        self.messages = messages[start:]
 
     def clear(self) -> None:
         """Clear all messages"""
         self.messages.clear()
 
+    def observation_store(self) -> ObservationStore:
+        """The store holding observations spilled from this memory's messages."""
+        if self._observations is None:
+            self._observations = ObservationStore()
+        return self._observations
+
     def get_recent_messages(self, n: int) -> List[Message]:
         """Get n most recent messages"""
         return self.messages[-n:]
@@ -185,3 +206,100 @@ class Memory(BaseModel):
     def to_dict_list(self) -> List[dict]:
         """Convert messages to list of dicts"""
         return [msg.to_dict() for msg in self.messages]
+
+    def compact(
+        self,
+        max_tokens: int,
+        count_tokens: Callable[[List[Message]], int],
+        keep_recent: int = 3,
+    ) -> bool:
+        """Shrink the history until it fits in `max_tokens`.
+
+        System messages and the first user message are always kept, and an
+        assistant message is never separated from its tool responses. Each
+        stage runs only while the history is still over budget:
+
+        1. Drop screenshots from all but the latest message carrying one.
+        2. Replace old tool observations with a short digest, oldest first;
+           the full output stays readable through the observation store.
+        3. Drop the oldest message groups, keeping the last one.
+
+        Args:
+            max_tokens: Token budget for the messages
+            count_tokens: Returns the prompt tokens of a list of messages
+            keep_recent: Number of most recent message groups kept verbatim
+
+        Returns:
+            bool: Whether the history now fits in the budget
+        """
+
+        def fits() -> bool:
+            return count_tokens(self.messages) <= max_tokens
+
+        if fits():
+            return True
+
+        # 1. Stale screenshots
+        with_images = [m for m in self.messages if m.base64_image]
+        for message in with_images[:-1]:
+            message.base64_image = None
+        if with_images[:-1] and fits():
+            return True
+
+        # 2. Old observations
+        groups = self._groups()
+        for group in groups[: max(0, len(groups) - keep_recent)]:
+            for index in group:
+                message = self.messages[index]
+                if message.role == Role.TOOL and message.content:
+                    message.content = self._digest(message.content)
+            if fits():
+                return True
+
+        # 3. Oldest groups, anchors excepted
+        anchors = self._anchors()
+        for group in groups[:-1]:
+            if any(index in anchors for index in group):
+                continue
+            for index in group:
+                self.messages[index] = None
+            remaining = [m for m in self.messages if m is not None]
+            if count_tokens(remaining) <= max_tokens:
+                break
+        self.messages = [m for m in self.messages if m is not None]
+        return fits()
+
+    def _anchors(self) -> set:
+        """Indices of the system messages and the first user message."""
+        anchors = {i for i, m in enumerate(self.messages) if m.role == Role.SYSTEM}
+        first_user = next(
+            (i for i, m in enumerate(self.messages) if m.role == Role.USER), None
+        )
+        if first_user is not None:
+            anchors.add(first_user)
+        return anchors
+
+    def _groups(self) -> List[List[int]]:
+        """Message indices grouped so tool responses stay with their tool_calls."""
+        groups: List[List[int]] = []
+        call_ids: set = set()
+        for index, message in enumerate(self.messages):
+            if message.role == Role.TOOL and message.tool_call_id in call_ids:
+                groups[-1].append(index)
+                continue
+            groups.append([index])
+            call_ids = {call.id for call in message.tool_calls or []}
+        return groups
+
+    def _digest(self, content: str) -> str:
+        """Shorten an observation to its head and the handle of the full text."""
+        limit = self.OBSERVATION_DIGEST_CHARS
+        if len(content) <= limit:
+            return content
+        # A spilled preview already names the stored full output
+        handle = spilled_handle(content) or self.observation_store().put(content)
+        return (
+            f"{content[:limit].rstrip()}\n"
+            f"[... {len(content) - limit} characters omitted, stored as "
+            f"observation '{handle}']"
+        )
@@ -4,6 +4,7 @@ from app.tool.browser_use_tool import BrowserUseTool
 from app.tool.create_chat_completion import CreateChatCompletion
 from app.tool.deep_research import DeepResearch
 from app.tool.planning import PlanningTool
+from app.tool.read_observation import ReadObservation
 from app.tool.str_replace_editor import StrReplaceEditor
 from app.tool.terminate import Terminate
 from app.tool.tool_collection import ToolCollection
@@ -21,4 +22,5 @@ __all__ = [
     "ToolCollection",
     "CreateChatCompletion",
     "PlanningTool",
+    "ReadObservation",
 ]
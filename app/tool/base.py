@@ -1,13 +1,27 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from enum import Enum
+from typing import Any, Dict, Optional, Set
 
 from pydantic import BaseModel, Field
 
 
+class ToolConcurrency(str, Enum):
+    """How a tool's calls may overlap with other tool calls"""
+
+    # No side effects; may run alongside any other non side-effecting call
+    READ_ONLY = "read_only"
+    # Drives a stateful resource (e.g. the browser); calls to the same tool run
+    # in order, but may overlap with calls to other tools
+    EXCLUSIVE = "exclusive"
+    # Changes shared state; runs alone, after every earlier call has finished
+    SIDE_EFFECT = "side_effect"
+
+
 class BaseTool(ABC, BaseModel):
     name: str
     description: str
     parameters: Optional[dict] = None
+    concurrency: ToolConcurrency = ToolConcurrency.SIDE_EFFECT
 
     class Config:
         arbitrary_types_allowed = True
@@ -20,6 +34,29 @@ class BaseTool(ABC, BaseModel):
     async def execute(self, **kwargs) -> Any:
         """Execute the tool with given parameters."""
 
+    def memo_tags(self, **kwargs) -> Optional[Set[str]]:
+        """Resources a call's result depends on, if the result may be reused.
+
+        Returns None (the default) when the call must always run. An empty set
+        marks a result that depends on no local state, such as a web search.
+        """
+        return None
+
+    def invalidated_tags(self, **kwargs) -> Optional[Set[str]]:
+        """Resources a call that is not memoized may change.
+
+        Returns None (the default) when unknown, which invalidates every
+        memoized result that depends on some resource.
+        """
+        return None
+
+    def state_dict(self) -> Optional[Dict]:
+        """JSON-serializable state to checkpoint, or None for stateless tools."""
+        return None
+
+    def load_state_dict(self, state: Dict) -> None:
+        """Restore state previously returned by `state_dict`."""
+
     def to_param(self) -> Dict:
         """Convert tool to function call format."""
         return {
@@ -1,7 +1,7 @@
 import asyncio
 import base64
 import json
-from typing import Generic, Optional, TypeVar
+from typing import Generic, Optional, Set, TypeVar
 
 from browser_use import Browser as BrowserUseBrowser
 from browser_use import BrowserConfig
@@ -10,10 +10,12 @@ from browser_use.dom.service import DomService
 from pydantic import Field, field_validator
 from pydantic_core.core_schema import ValidationInfo
 
+from app.cassette import recorded
 from app.config import config
 from app.llm import LLM
-from app.tool.base import BaseTool, ToolResult
+from app.tool.base import BaseTool, ToolConcurrency, ToolResult
 from app.tool.web_search import WebSearch
+from app.tracing import traced
 
 
 _BROWSER_DESCRIPTION = """
@@ -52,6 +54,7 @@ Context = TypeVar("Context")
 
 class BrowserUseTool(BaseTool, Generic[Context]):
     name: str = "browser_use"
+    concurrency: ToolConcurrency = ToolConcurrency.EXCLUSIVE
     description: str = _BROWSER_DESCRIPTION
     parameters: dict = {
         "type": "object",
@@ -201,6 +204,13 @@ class BrowserUseTool(BaseTool, Generic[Context]):
 
         return self.context
 
+    def memo_tags(self, action: Optional[str] = None, **kwargs) -> Optional[Set[str]]:
+        """Extractions are reused until another action changes the page."""
+        return {"browser"} if action == "extract_content" else None
+
+    def invalidated_tags(self, **kwargs) -> Set[str]:
+        return {"browser"}
+
     async def execute(
         self,
         action: str,
@@ -490,6 +500,8 @@ Page content:
             except Exception as e:
                 return ToolResult(error=f"Browser action '{action}' failed: {str(e)}")
 
+    @traced("browser.get_current_state")
+    @recorded("browser_use.get_current_state")
     async def get_current_state(
         self, context: Optional[BrowserContext] = None
     ) -> ToolResult:
@@ -3,10 +3,12 @@ from typing import Any, List, Optional, Type, Union, get_args, get_origin
 from pydantic import BaseModel, Field
 
 from app.tool import BaseTool
+from app.tool.base import ToolConcurrency
 
 
 class CreateChatCompletion(BaseTool):
     name: str = "create_chat_completion"
+    concurrency: ToolConcurrency = ToolConcurrency.READ_ONLY
     description: str = (
         "Creates a structured completion with specified output formatting."
     )
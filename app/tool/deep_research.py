@@ -10,7 +10,7 @@ from app.exceptions import ToolError
 from app.llm import LLM
 from app.logger import logger
 from app.schema import ToolChoice
-from app.tool.base import BaseTool, ToolResult
+from app.tool.base import BaseTool, ToolConcurrency, ToolResult
 from app.tool.web_search import SearchResult, WebSearch
 
 
@@ -155,6 +155,7 @@ class DeepResearch(BaseTool):
     """Advanced research tool that explores a topic through iterative web searches."""
 
     name: str = "deep_research"
+    concurrency: ToolConcurrency = ToolConcurrency.READ_ONLY
     description: str = """
     Performs comprehensive research on a topic through multi-level web searches
     and content analysis. Returns a structured summary of findings with source
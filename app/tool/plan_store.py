@@ -0,0 +1,160 @@
+"""Durable storage for the plans of the planning tool."""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.config import PROJECT_ROOT, config
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    plan_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    plan_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL,
+    notes TEXT NOT NULL,
+    dependencies TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (plan_id, idx)
+);
+"""
+
+
+class PlanStore:
+    """Keeps plans in sqlite, with one row per plan and one per step.
+
+    Plans are read and written as the dicts the planning tool works with.
+    Marking a step rewrites that step's row and the plan's version only, so
+    its cost does not depend on the length of the plan.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        # Readers do not block the writer, and commits skip the fsync
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls) -> Optional["PlanStore"]:
+        """The store configured under [plan_store], or None when disabled."""
+        settings = config.plan_store
+        if not settings or not settings.enabled:
+            return None
+        path = Path(settings.path)
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        return cls(path)
+
+    def summaries(self, limit: int) -> Tuple[List[Tuple[str, str, int, int]], int]:
+        """The most recently written plans, without loading their steps.
+
+        Returns:
+            (plan_id, title, completed steps, total steps) of at most `limit`
+            plans, newest first, and the number of stored plans
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT plan_id, title, "
+                "(SELECT COUNT(*) FROM steps s WHERE s.plan_id = p.plan_id "
+                "AND s.status = 'completed'), "
+                "(SELECT COUNT(*) FROM steps s WHERE s.plan_id = p.plan_id) "
+                "FROM plans p ORDER BY p.rowid DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()
+        return rows, count
+
+    def load(self, plan_id: str) -> Optional[dict]:
+        """The stored plan, or None if there is none with that id."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, version FROM plans WHERE plan_id = ?", (plan_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            steps = self._conn.execute(
+                "SELECT text, status, notes, dependencies, version FROM steps "
+                "WHERE plan_id = ? ORDER BY idx",
+                (plan_id,),
+            ).fetchall()
+        title, version = row
+        return {
+            "plan_id": plan_id,
+            "title": title,
+            "steps": [step[0] for step in steps],
+            "step_statuses": [step[1] for step in steps],
+            "step_notes": [step[2] for step in steps],
+            "step_dependencies": [json.loads(step[3]) for step in steps],
+            "version": version,
+            "step_versions": [step[4] for step in steps],
+        }
+
+    def save(self, plan: dict) -> None:
+        """Write a whole plan, replacing any stored plan with its id."""
+        with self._lock, self._conn:
+            self._delete(plan["plan_id"])
+            self._conn.execute(
+                "INSERT INTO plans (plan_id, title, version) VALUES (?, ?, ?)",
+                (plan["plan_id"], plan["title"], plan.get("version", 0)),
+            )
+            self._conn.executemany(
+                "INSERT INTO steps (plan_id, idx, text, status, notes, "
+                "dependencies, version) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        plan["plan_id"],
+                        i,
+                        plan["steps"][i],
+                        plan["step_statuses"][i],
+                        plan["step_notes"][i],
+                        json.dumps(plan["step_dependencies"][i]),
+                        plan.get("step_versions", [0] * len(plan["steps"]))[i],
+                    )
+                    for i in range(len(plan["steps"]))
+                ],
+            )
+
+    def save_step(self, plan: dict, index: int) -> None:
+        """Write the status and notes of one step of a stored plan."""
+        version = plan.get("version", 0)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE steps SET status = ?, notes = ?, version = ? "
+                "WHERE plan_id = ? AND idx = ?",
+                (
+                    plan["step_statuses"][index],
+                    plan["step_notes"][index],
+                    version,
+                    plan["plan_id"],
+                    index,
+                ),
+            )
+            self._conn.execute(
+                "UPDATE plans SET version = ? WHERE plan_id = ?",
+                (version, plan["plan_id"]),
+            )
+
+    def delete(self, plan_id: str) -> None:
+        with self._lock, self._conn:
+            self._delete(plan_id)
+
+    def _delete(self, plan_id: str) -> None:
+        self._conn.execute("DELETE FROM steps WHERE plan_id = ?", (plan_id,))
+        self._conn.execute("DELETE FROM plans WHERE plan_id = ?", (plan_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,8 +1,13 @@
 # tool/planning.py
-from typing import Dict, List, Literal, Optional
+import copy
+from collections import Counter
+from typing import Dict, Iterable, List, Literal, Optional, Tuple
+
+from pydantic import Field
 
 from app.exceptions import ToolError
 from app.tool.base import BaseTool, ToolResult
+from app.tool.plan_store import PlanStore
 
 
 _PLANNING_TOOL_DESCRIPTION = """
@@ -10,6 +15,13 @@ A planning tool that allows the agent to create and manage plans for solving com
 The tool provides functionality for creating plans, updating plan steps, and tracking progress.
 """
 
+_STATUS_MARKS = {
+    "not_started": "[ ]",
+    "in_progress": "[→]",
+    "completed": "[✓]",
+    "blocked": "[!]",
+}
+
 
 class PlanningTool(BaseTool):
     """
@@ -61,6 +73,11 @@ class PlanningTool(BaseTool):
                 "description": "Additional notes for a step. Optional for mark_step command.",
                 "type": "string",
             },
+            "step_dependencies": {
+                "description": "For each step, the indices (0-based) of earlier steps that must be completed before it can start. Steps that do not depend on each other may be worked on in parallel. Optional for create and update commands; by default each step depends on the step before it.",
+                "type": "array",
+                "items": {"type": "array", "items": {"type": "integer"}},
+            },
         },
         "required": ["command"],
         "additionalProperties": False,
@@ -68,6 +85,19 @@ class PlanningTool(BaseTool):
 
     plans: dict = {}  # Dictionary to store plans by plan_id
     _current_plan_id: Optional[str] = None  # Track the current active plan
+    store: Optional[PlanStore] = Field(
+        default_factory=PlanStore.from_config,
+        exclude=True,
+        description="Durable storage plans are written through to; None keeps them in memory only",
+    )
+    max_delta_steps: int = Field(
+        default=10,
+        description="Maximum number of changed steps listed by a plan delta",
+    )
+    max_listed_plans: int = Field(
+        default=50,
+        description="Maximum number of plans, most recent first, shown by the list command",
+    )
 
     async def execute(
         self,
@@ -83,6 +113,7 @@ class PlanningTool(BaseTool):
             Literal["not_started", "in_progress", "completed", "blocked"]
         ] = None,
         step_notes: Optional[str] = None,
+        step_dependencies: Optional[List[List[int]]] = None,
         **kwargs,
     ):
         """
@@ -96,12 +127,13 @@ class PlanningTool(BaseTool):
         - step_index: Index of the step to update (used with mark_step command)
         - step_status: Status to set for a step (used with mark_step command)
         - step_notes: Additional notes for a step (used with mark_step command)
+        - step_dependencies: Indices of the steps each step waits for (used with create and update commands)
         """
 
         if command == "create":
-            return self._create_plan(plan_id, title, steps)
+            return self._create_plan(plan_id, title, steps, step_dependencies)
         elif command == "update":
-            return self._update_plan(plan_id, title, steps)
+            return self._update_plan(plan_id, title, steps, step_dependencies)
         elif command == "list":
             return self._list_plans()
         elif command == "get":
@@ -118,13 +150,17 @@ class PlanningTool(BaseTool):
             )
 
     def _create_plan(
-        self, plan_id: Optional[str], title: Optional[str], steps: Optional[List[str]]
+        self,
+        plan_id: Optional[str],
+        title: Optional[str],
+        steps: Optional[List[str]],
+        step_dependencies: Optional[List[List[int]]] = None,
     ) -> ToolResult:
         """Create a new plan with the given ID, title, and steps."""
         if not plan_id:
             raise ToolError("Parameter `plan_id` is required for command: create")
 
-        if plan_id in self.plans:
+        if self._plan(plan_id) is not None:
             raise ToolError(
                 f"A plan with ID '{plan_id}' already exists. Use 'update' to modify existing plans."
             )
@@ -148,26 +184,36 @@ class PlanningTool(BaseTool):
             "steps": steps,
             "step_statuses": ["not_started"] * len(steps),
             "step_notes": [""] * len(steps),
+            "step_dependencies": self.validate_dependencies(steps, step_dependencies),
+            # Bumped on every change, and recorded on the steps it changed
+            "version": 0,
+            "step_versions": [0] * len(steps),
         }
 
         self.plans[plan_id] = plan
         self._current_plan_id = plan_id  # Set as active plan
+        if self.store is not None:
+            self.store.save(plan)
 
         return ToolResult(
             output=f"Plan created successfully with ID: {plan_id}\n\n{self._format_plan(plan)}"
         )
 
     def _update_plan(
-        self, plan_id: Optional[str], title: Optional[str], steps: Optional[List[str]]
+        self,
+        plan_id: Optional[str],
+        title: Optional[str],
+        steps: Optional[List[str]],
+        step_dependencies: Optional[List[List[int]]] = None,
     ) -> ToolResult:
         """Update an existing plan with new title or steps."""
         if not plan_id:
             raise ToolError("Parameter `plan_id` is required for command: update")
 
-        if plan_id not in self.plans:
+        plan = self._plan(plan_id)
+        if plan is None:
             raise ToolError(f"No plan found with ID: {plan_id}")
-
-        plan = self.plans[plan_id]
+        version = self._bump_version(plan)
 
         if title:
             plan["title"] = title
@@ -184,44 +230,71 @@ class PlanningTool(BaseTool):
             old_steps = plan["steps"]
             old_statuses = plan["step_statuses"]
             old_notes = plan["step_notes"]
+            old_versions = plan["step_versions"]
 
             # Create new step statuses and notes
             new_statuses = []
             new_notes = []
+            new_versions = []
 
             for i, step in enumerate(steps):
                 # If the step exists at the same position in old steps, preserve status and notes
                 if i < len(old_steps) and step == old_steps[i]:
                     new_statuses.append(old_statuses[i])
                     new_notes.append(old_notes[i])
+                    new_versions.append(old_versions[i])
                 else:
                     new_statuses.append("not_started")
                     new_notes.append("")
+                    new_versions.append(version)
 
             plan["steps"] = steps
             plan["step_statuses"] = new_statuses
             plan["step_notes"] = new_notes
+            plan["step_versions"] = new_versions
+            plan["step_dependencies"] = self.validate_dependencies(
+                steps, step_dependencies
+            )
+        elif step_dependencies is not None:
+            plan["step_dependencies"] = self.validate_dependencies(
+                plan["steps"], step_dependencies
+            )
+        if self.store is not None:
+            self.store.save(plan)
 
         return ToolResult(
             output=f"Plan updated successfully: {plan_id}\n\n{self._format_plan(plan)}"
         )
 
     def _list_plans(self) -> ToolResult:
-        """List all available plans."""
-        if not self.plans:
+        """List the most recent plans, up to `max_listed_plans`."""
+        if self.store is not None:
+            # Summarized in the store, so plans are not loaded to be listed
+            summaries, count = self.store.summaries(self.max_listed_plans)
+        else:
+            recent = list(self.plans.items())[::-1][: self.max_listed_plans]
+            summaries = [
+                (
+                    plan_id,
+                    plan["title"],
+                    plan["step_statuses"].count("completed"),
+                    len(plan["steps"]),
+                )
+                for plan_id, plan in recent
+            ]
+            count = len(self.plans)
+        if not summaries:
             return ToolResult(
                 output="No plans available. Create a plan with the 'create' command."
             )
 
         output = "Available plans:\n"
-        for plan_id, plan in self.plans.items():
+        for plan_id, title, completed, total in summaries:
             current_marker = " (active)" if plan_id == self._current_plan_id else ""
-            completed = sum(
-                1 for status in plan["step_statuses"] if status == "completed"
-            )
-            total = len(plan["steps"])
             progress = f"{completed}/{total} steps completed"
-            output += f"• {plan_id}{current_marker}: {plan['title']} - {progress}\n"
+            output += f"• {plan_id}{current_marker}: {title} - {progress}\n"
+        if count > len(summaries):
+            output += f"({count - len(summaries)} older plans not shown)\n"
 
         return ToolResult(output=output)
 
@@ -235,10 +308,10 @@ class PlanningTool(BaseTool):
                 )
             plan_id = self._current_plan_id
 
-        if plan_id not in self.plans:
+        plan = self._plan(plan_id)
+        if plan is None:
             raise ToolError(f"No plan found with ID: {plan_id}")
 
-        plan = self.plans[plan_id]
         return ToolResult(output=self._format_plan(plan))
 
     def _set_active_plan(self, plan_id: Optional[str]) -> ToolResult:
@@ -246,12 +319,13 @@ class PlanningTool(BaseTool):
         if not plan_id:
             raise ToolError("Parameter `plan_id` is required for command: set_active")
 
-        if plan_id not in self.plans:
+        plan = self._plan(plan_id)
+        if plan is None:
             raise ToolError(f"No plan found with ID: {plan_id}")
 
         self._current_plan_id = plan_id
         return ToolResult(
-            output=f"Plan '{plan_id}' is now the active plan.\n\n{self._format_plan(self.plans[plan_id])}"
+            output=f"Plan '{plan_id}' is now the active plan.\n\n{self._format_plan(plan)}"
         )
 
     def _mark_step(
@@ -270,14 +344,13 @@ class PlanningTool(BaseTool):
                 )
             plan_id = self._current_plan_id
 
-        if plan_id not in self.plans:
+        plan = self._plan(plan_id)
+        if plan is None:
             raise ToolError(f"No plan found with ID: {plan_id}")
 
         if step_index is None:
             raise ToolError("Parameter `step_index` is required for command: mark_step")
 
-        plan = self.plans[plan_id]
-
         if step_index < 0 or step_index >= len(plan["steps"]):
             raise ToolError(
                 f"Invalid step_index: {step_index}. Valid indices range from 0 to {len(plan['steps'])-1}."
@@ -299,8 +372,14 @@ class PlanningTool(BaseTool):
         if step_notes:
             plan["step_notes"][step_index] = step_notes
 
+        version = self._bump_version(plan)
+        plan["step_versions"][step_index] = version
+        if self.store is not None:
+            self.store.save_step(plan, step_index)
+
+        # Only the marked step and the progress, to keep the output short
         return ToolResult(
-            output=f"Step {step_index} updated in plan '{plan_id}'.\n\n{self._format_plan(plan)}"
+            output=f"Step {step_index} updated in plan '{plan_id}'.\n\n{self._format_plan_delta(plan, since=version - 1)}"
         )
 
     def _delete_plan(self, plan_id: Optional[str]) -> ToolResult:
@@ -308,10 +387,12 @@ class PlanningTool(BaseTool):
         if not plan_id:
             raise ToolError("Parameter `plan_id` is required for command: delete")
 
-        if plan_id not in self.plans:
+        if self._plan(plan_id) is None:
             raise ToolError(f"No plan found with ID: {plan_id}")
 
         del self.plans[plan_id]
+        if self.store is not None:
+            self.store.delete(plan_id)
 
         # If the deleted plan was the active plan, clear the active plan
         if self._current_plan_id == plan_id:
@@ -319,6 +400,149 @@ class PlanningTool(BaseTool):
 
         return ToolResult(output=f"Plan '{plan_id}' has been deleted.")
 
+    @staticmethod
+    def validate_dependencies(
+        steps: List[str], step_dependencies: Optional[List[List[int]]]
+    ) -> List[List[int]]:
+        """Check step dependencies, defaulting to running the steps in order.
+
+        Raises:
+            ToolError: If there is not one list per step, or a step depends
+                on anything but earlier steps
+        """
+        if step_dependencies is None:
+            return [[i - 1] if i else [] for i in range(len(steps))]
+        if len(step_dependencies) != len(steps):
+            raise ToolError(
+                f"Parameter `step_dependencies` must have one entry per step ({len(steps)}), got {len(step_dependencies)}"
+            )
+        for i, dependencies in enumerate(step_dependencies):
+            # Only earlier steps are allowed, which rules out cycles
+            if not isinstance(dependencies, list) or any(
+                not isinstance(dep, int) or not 0 <= dep < i for dep in dependencies
+            ):
+                raise ToolError(
+                    f"Step {i} can only depend on earlier steps (0 to {i - 1}), got {dependencies}"
+                )
+        return [sorted(set(dependencies)) for dependencies in step_dependencies]
+
+    def get_dependencies(self, plan: Dict) -> List[List[int]]:
+        """Dependencies of each step, for plans created with or without them."""
+        dependencies = plan.get("step_dependencies")
+        if dependencies is None or len(dependencies) != len(plan["steps"]):
+            return self.validate_dependencies(plan["steps"], None)
+        return dependencies
+
+    def ready_steps(self, plan_id: Optional[str] = None) -> List[int]:
+        """Indices of unfinished steps whose dependencies are all completed.
+
+        Steps already in progress are included, so an interrupted run can
+        pick them up again; blocked steps and everything depending on them
+        are not.
+        """
+        plan = self._plan(plan_id or self._current_plan_id)
+        if not plan:
+            return []
+        statuses = plan["step_statuses"]
+        return [
+            i
+            for i, dependencies in enumerate(self.get_dependencies(plan))
+            if statuses[i] in ("not_started", "in_progress")
+            and all(statuses[dep] == "completed" for dep in dependencies)
+        ]
+
+    def state_dict(self) -> Dict:
+        """Plans and the active plan id, for checkpoints."""
+        return {
+            "plans": copy.deepcopy(self.plans),
+            "current_plan_id": self._current_plan_id,
+        }
+
+    def load_state_dict(self, state: Dict) -> None:
+        self.plans = copy.deepcopy(state.get("plans", {}))
+        self._current_plan_id = state.get("current_plan_id")
+        if self.store is not None:
+            for plan in self.plans.values():
+                plan["step_dependencies"] = self.get_dependencies(plan)
+                self.store.save(plan)
+
+    def _plan(self, plan_id: Optional[str]) -> Optional[Dict]:
+        """The plan with the given id, loading it from the store if needed."""
+        plan = self.plans.get(plan_id)
+        if plan is None and plan_id and self.store is not None:
+            plan = self.store.load(plan_id)
+            if plan is not None:
+                self.plans[plan_id] = plan
+        return plan
+
+    @staticmethod
+    def _bump_version(plan: Dict) -> int:
+        """Start a new version of the plan, returning its number."""
+        # Plans restored from older checkpoints have no versions yet
+        plan.setdefault("step_versions", [0] * len(plan["steps"]))
+        plan["version"] = plan.get("version", 0) + 1
+        return plan["version"]
+
+    def format_plan_delta(
+        self, plan_id: str, since: int = 0, include: Iterable[int] = ()
+    ) -> Tuple[str, int]:
+        """Render what changed in a plan since a version, for prompts.
+
+        Args:
+            plan_id: Plan to render
+            since: Version the reader last saw; 0 for a reader that has not
+                seen the plan, who gets every step that changed since the
+                plan was created
+            include: Steps to list whether or not they changed, such as the
+                step being worked on and the steps it depends on
+
+        Returns:
+            The rendering, and the plan version to pass as `since` next time
+        """
+        plan = self._plan(plan_id)
+        if plan is None:
+            raise ToolError(f"No plan found with ID: {plan_id}")
+        return self._format_plan_delta(plan, since, include), plan.get("version", 0)
+
+    def _format_plan_delta(
+        self, plan: Dict, since: int, include: Iterable[int] = ()
+    ) -> str:
+        """Format the progress of a plan and the steps that changed since a version.
+
+        Unlike `_format_plan`, the length does not grow with the plan: at most
+        `max_delta_steps` changed steps are listed, the most recent first.
+        """
+        output = f"Plan: {plan['title']} (ID: {plan['plan_id']})\n"
+        counts = Counter(plan["step_statuses"])
+        total_steps = len(plan["steps"])
+        percentage = counts["completed"] / total_steps * 100 if total_steps else 0
+        output += (
+            f"Progress: {counts['completed']}/{total_steps} steps completed ({percentage:.1f}%); "
+            f"{counts['in_progress']} in progress, {counts['blocked']} blocked, {counts['not_started']} not started\n"
+        )
+
+        include = {i for i in include if 0 <= i < total_steps}
+        versions = plan.get("step_versions") or [0] * total_steps
+        changed = sorted(
+            (i for i, version in enumerate(versions) if version > since),
+            key=lambda i: versions[i],
+            reverse=True,
+        )
+        changed = [i for i in changed if i not in include]
+        shown = sorted(include.union(changed[: self.max_delta_steps]))
+        if shown:
+            output += "Steps:\n"
+        for i in shown:
+            status = plan["step_statuses"][i]
+            output += f"{i}. {_STATUS_MARKS.get(status, '[ ]')} {plan['steps'][i]}\n"
+            if plan["step_notes"][i]:
+                output += f"   Notes: {plan['step_notes'][i]}\n"
+        if len(changed) > self.max_delta_steps:
+            output += (
+                f"({len(changed) - self.max_delta_steps} earlier changes not shown)\n"
+            )
+        return output
+
     def _format_plan(self, plan: Dict) -> str:
         """Format a plan for display."""
         output = f"Plan: {plan['title']} (ID: {plan['plan_id']})\n"
@@ -345,18 +569,20 @@ class PlanningTool(BaseTool):
         output += f"Status: {completed} completed, {in_progress} in progress, {blocked} blocked, {not_started} not started\n\n"
         output += "Steps:\n"
 
+        # Dependencies are only worth listing when the plan is not a sequence
+        dependencies = self.get_dependencies(plan)
+        if dependencies == self.validate_dependencies(plan["steps"], None):
+            dependencies = [[] for _ in plan["steps"]]
+
         # Add each step with its status and notes
         for i, (step, status, notes) in enumerate(
             zip(plan["steps"], plan["step_statuses"], plan["step_notes"])
         ):
-            status_symbol = {
-                "not_started": "[ ]",
-                "in_progress": "[→]",
-                "completed": "[✓]",
-                "blocked": "[!]",
-            }.get(status, "[ ]")
+            status_symbol = _STATUS_MARKS.get(status, "[ ]")
 
             output += f"{i}. {status_symbol} {step}\n"
+            if dependencies[i]:
+                output += f"   Depends on: {', '.join(map(str, dependencies[i]))}\n"
             if notes:
                 output += f"   Notes: {notes}\n"
 
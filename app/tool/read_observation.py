@@ -0,0 +1,71 @@
+import re
+from typing import Optional, Set
+
+from app.exceptions import ToolError
+from app.observation import current_observation_store
+from app.tool.base import BaseTool, ToolConcurrency, ToolResult
+
+
+_READ_OBSERVATION_DESCRIPTION = """Read a large tool output that was stored instead of shown in full.
+Outputs that are too long are replaced by a preview and a handle such as 'obs_3f9a1c2b7d4e'.
+Pass the handle with a line `offset` and `limit` to page through the output, or a regular expression `pattern` to list only the matching lines."""
+
+
+class ReadObservation(BaseTool):
+    name: str = "read_observation"
+    concurrency: ToolConcurrency = ToolConcurrency.READ_ONLY
+    description: str = _READ_OBSERVATION_DESCRIPTION
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "handle": {
+                "type": "string",
+                "description": "(required) Handle of the stored output, e.g. 'obs_3f9a1c2b7d4e'.",
+            },
+            "offset": {
+                "type": "integer",
+                "description": "(optional) First line to return, 0-based. Default is 0.",
+                "default": 0,
+            },
+            "limit": {
+                "type": "integer",
+                "description": "(optional) Number of lines to return. Default is 100.",
+                "default": 100,
+            },
+            "pattern": {
+                "type": "string",
+                "description": "(optional) Regular expression; when given, only matching lines are returned.",
+            },
+            "context": {
+                "type": "integer",
+                "description": "(optional) Lines of context around each pattern match. Default is 0.",
+                "default": 0,
+            },
+        },
+        "required": ["handle"],
+    }
+
+    def memo_tags(self, **kwargs) -> Set[str]:
+        """Stored observations never change."""
+        return set()
+
+    async def execute(
+        self,
+        handle: str,
+        offset: int = 0,
+        limit: int = 100,
+        pattern: Optional[str] = None,
+        context: int = 0,
+    ) -> ToolResult:
+        """Page through or search a stored observation."""
+        store = current_observation_store()
+        if store is None:
+            raise ToolError("No stored observations are available in this run")
+        try:
+            if pattern:
+                return ToolResult(output=store.grep(handle, pattern, max(context, 0)))
+            return ToolResult(output=store.read(handle, max(offset, 0), max(limit, 1)))
+        except KeyError:
+            raise ToolError(f"No stored observation with handle '{handle}'")
+        except re.error as e:
+            raise ToolError(f"Invalid pattern {pattern!r}: {e}")
@@ -2,7 +2,7 @@
 
 from collections import defaultdict
 from pathlib import Path
-from typing import Any, DefaultDict, List, Literal, Optional, get_args
+from typing import Any, DefaultDict, List, Literal, Optional, Set, get_args
 
 from app.config import config
 from app.exceptions import ToolError
@@ -111,6 +111,23 @@ class StrReplaceEditor(BaseTool):
             else self._local_operator
         )
 
+    def memo_tags(
+        self, command: Optional[str] = None, path: Optional[str] = None, **kwargs
+    ) -> Optional[Set[str]]:
+        """Views are reused until the viewed path is edited."""
+        if command != "view" or not path:
+            return None
+        return {f"file:{Path(path)}"}
+
+    def invalidated_tags(
+        self, path: Optional[str] = None, **kwargs
+    ) -> Optional[Set[str]]:
+        """Edits change the file and the listings of the directories above it."""
+        if not path:
+            return None
+        path = Path(path)
+        return {f"file:{p}" for p in (path, *path.parents)}
+
     async def execute(
         self,
         *,
@@ -1,8 +1,57 @@
 """Collection classes for managing multiple tools."""
-from typing import Any, Dict, List
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+from app.cassette import current_cassette
 from app.exceptions import ToolError
+from app.logger import logger
+from app.metrics import TOOL_MEMO_HITS
 from app.tool.base import BaseTool, ToolFailure, ToolResult
+from app.tracing import tracer
+
+
+class ToolMemo:
+    """Results of idempotent tool calls, reused while their resources are unchanged.
+
+    Entries are keyed on the tool name and canonical JSON arguments, and carry
+    the resource tags reported by `BaseTool.memo_tags`. A call that changes a
+    resource drops every entry tagged with it.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Any, Set[str]]] = {}
+        self.hits = 0
+
+    @staticmethod
+    def key(name: str, tool_input: Dict[str, Any]) -> str:
+        args = json.dumps(
+            tool_input, sort_keys=True, separators=(",", ":"), default=str
+        )
+        return f"{name}:{args}"
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, result: Any, tags: Set[str]) -> None:
+        self._entries[key] = (result, tags)
+
+    def invalidate(self, tags: Optional[Set[str]]) -> None:
+        """Drop entries depending on tags, or on any resource when tags is None."""
+        self._entries = {
+            key: (result, entry_tags)
+            for key, (result, entry_tags) in self._entries.items()
+            if not (entry_tags if tags is None else entry_tags & tags)
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class ToolCollection:
@@ -14,6 +63,7 @@ class ToolCollection:
     def __init__(self, *tools: BaseTool):
         self.tools = tools
         self.tool_map = {tool.name: tool for tool in tools}
+        self.memo: Optional[ToolMemo] = None
 
     def __iter__(self):
         return iter(self.tools)
@@ -21,12 +71,57 @@ class ToolCollection:
     def to_params(self) -> List[Dict[str, Any]]:
         return [tool.to_param() for tool in self.tools]
 
+    def enable_memo(self) -> ToolMemo:
+        """Start memoizing idempotent tool calls with an empty memo."""
+        self.memo = ToolMemo()
+        return self.memo
+
     async def execute(
         self, *, name: str, tool_input: Dict[str, Any] = None
     ) -> ToolResult:
         tool = self.tool_map.get(name)
         if not tool:
             return ToolFailure(error=f"Tool {name} is invalid")
+        tool_input = tool_input or {}
+        with tracer.span(f"tool.{name}"):
+            return await self._execute(tool, tool_input)
+
+    async def _execute(self, tool: BaseTool, tool_input: Dict[str, Any]) -> ToolResult:
+        name = tool.name
+        if self.memo is None:
+            return await self._run(tool, tool_input)
+
+        tags = tool.memo_tags(**tool_input)
+        if tags is None:
+            try:
+                return await self._run(tool, tool_input)
+            finally:
+                self.memo.invalidate(tool.invalidated_tags(**tool_input))
+
+        key = ToolMemo.key(name, tool_input)
+        cached = self.memo.get(key)
+        if cached is not None:
+            TOOL_MEMO_HITS.inc(tool=name)
+            logger.info(f"♻️ Reusing memoized result of '{name}'")
+            return cached
+
+        result = await self._run(tool, tool_input)
+        if not getattr(result, "error", None):
+            self.memo.put(key, result, tags)
+        return result
+
+    @classmethod
+    async def _run(cls, tool: BaseTool, tool_input: Dict[str, Any]) -> ToolResult:
+        cassette = current_cassette()
+        if cassette:
+            return await cassette.tool_call(
+                ToolMemo.key(tool.name, tool_input),
+                lambda: cls._invoke(tool, tool_input),
+            )
+        return await cls._invoke(tool, tool_input)
+
+    @staticmethod
+    async def _invoke(tool: BaseTool, tool_input: Dict[str, Any]) -> ToolResult:
         try:
             result = await tool(**tool_input)
             return result
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 import requests
 from bs4 import BeautifulSoup
@@ -8,7 +8,7 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.config import config
 from app.logger import logger
-from app.tool.base import BaseTool, ToolResult
+from app.tool.base import BaseTool, ToolConcurrency, ToolResult
 from app.tool.search import (
     BaiduSearchEngine,
     BingSearchEngine,
@@ -17,6 +17,7 @@ from app.tool.search import (
     WebSearchEngine,
 )
 from app.tool.search.base import SearchItem
+from app.tracing import traced
 
 
 class SearchResult(BaseModel):
@@ -107,6 +108,7 @@ class WebContentFetcher:
     """Utility class for fetching web content."""
 
     @staticmethod
+    @traced("web.fetch_content")
     async def fetch_content(url: str, timeout: int = 10) -> Optional[str]:
         """
         Fetch and extract the main content from a webpage.
@@ -134,29 +136,44 @@ class WebContentFetcher:
                 )
                 return None
 
-            # Parse HTML with BeautifulSoup
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Remove script and style elements
-            for script in soup(["script", "style", "header", "footer", "nav"]):
-                script.extract()
-
-            # Get text content
-            text = soup.get_text(separator="\n", strip=True)
-
-            # Clean up whitespace and limit size (100KB max)
-            text = " ".join(text.split())
-            return text[:10000] if text else None
+            return WebContentFetcher.extract_text(response.text)
 
         except Exception as e:
             logger.warning(f"Error fetching content from {url}: {e}")
             return None
 
+    @staticmethod
+    def extract_text(html: str) -> Optional[str]:
+        """
+        Extract the readable text of an HTML page.
+
+        Args:
+            html: The page's HTML source
+
+        Returns:
+            Whitespace-normalized text, truncated to 10,000 characters, or None
+            if the page has no text
+        """
+        # Parse HTML with BeautifulSoup
+        soup = BeautifulSoup(html, "html.parser")
+
+        # Remove script and style elements
+        for script in soup(["script", "style", "header", "footer", "nav"]):
+            script.extract()
+
+        # Get text content
+        text = soup.get_text(separator="\n", strip=True)
+
+        # Clean up whitespace and limit size (100KB max)
+        text = " ".join(text.split())
+        return text[:10000] if text else None
+
 
 class WebSearch(BaseTool):
     """Search the web for information using various search engines."""
 
     name: str = "web_search"
+    concurrency: ToolConcurrency = ToolConcurrency.READ_ONLY
     description: str = """Search the web for real-time information about any topic.
     This tool returns comprehensive search results with relevant information, URLs, titles, and descriptions.
     If the primary search engine fails, it automatically falls back to alternative engines."""
@@ -198,6 +215,10 @@ class WebSearch(BaseTool):
     }
     content_fetcher: WebContentFetcher = WebContentFetcher()
 
+    def memo_tags(self, **kwargs) -> Set[str]:
+        """Search results depend on no local state, so repeats reuse them."""
+        return set()
+
     async def execute(
         self,
         query: str,
@@ -3,7 +3,7 @@ import re
 from typing import Any, Dict, List, Optional, Union
 
 from app.logger import logger
-from app.tool.base import BaseTool
+from app.tool.base import BaseTool, ToolConcurrency
 from app.tool.browser_use_tool import BrowserUseTool
 
 
@@ -19,6 +19,7 @@ class WebsiteAnalyzer(BaseTool):
     """
 
     name: str = "website_analyzer"
+    concurrency: ToolConcurrency = ToolConcurrency.READ_ONLY
     description: str = (
         "Analyzes a business website for quality, mobile responsiveness, and improvement opportunities"
     )
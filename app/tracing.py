@@ -0,0 +1,305 @@
+"""Spans around agent steps, LLM requests and tool calls.
+
+Tracing is off unless enabled under [tracing]. While off, `tracer.span` hands
+out a shared no-op span and `traced` functions call straight through, so the
+instrumentation costs one attribute check per call.
+
+Finished spans are buffered in memory and written out by `tracer.flush()`,
+which top-level agent runs call when they end:
+
+- as Chrome trace events appended to a JSON file, which chrome://tracing and
+  https://ui.perfetto.dev open directly
+- as OTLP/HTTP JSON posted to a collector such as the OpenTelemetry Collector
+  or Jaeger (http://localhost:4318/v1/traces)
+"""
+
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import httpx
+
+from app.config import PROJECT_ROOT, config
+from app.logger import logger
+from app.metrics import current_labels
+
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    """A timed operation, nested under the span that was current when it began."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "lane",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+        "_token",
+        "_tracer",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.lane = tracer.lane()
+        self.attributes = {**current_labels(), **attributes}
+        self.error: Optional[str] = None
+        self.start_ns = self.end_ns = 0
+
+    def set(self, **attributes) -> None:
+        """Attach attributes to the span."""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self._tracer.finish(self)
+
+    @property
+    def duration(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled."""
+
+    __slots__ = ()
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Creates spans and exports them when flushed."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        chrome_trace_path: Optional[str] = None,
+        otlp_endpoint: Optional[str] = None,
+        service_name: str = "openmanus",
+        max_buffered_spans: int = 100000,
+    ):
+        self.enabled = enabled
+        self.chrome_trace_path = chrome_trace_path
+        self.otlp_endpoint = otlp_endpoint
+        self.service_name = service_name
+        self._finished: Deque[Span] = deque(maxlen=max_buffered_spans)
+        self._lanes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "Tracer":
+        settings = config.tracing
+        if not settings or not settings.enabled:
+            return cls()
+        chrome_trace_path = settings.chrome_trace_path
+        if chrome_trace_path:
+            chrome_trace_path = str(PROJECT_ROOT / chrome_trace_path)
+        return cls(
+            enabled=True,
+            chrome_trace_path=chrome_trace_path,
+            otlp_endpoint=settings.otlp_endpoint,
+            service_name=settings.service_name,
+        )
+
+    def span(self, name: str, **attributes):
+        """Context manager timing the block as a span named `name`."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def lane(self) -> int:
+        """Small id of the task or thread running now, used as a trace row.
+
+        Concurrent tasks get separate rows, since Chrome traces require the
+        spans of one row to nest.
+        """
+        try:
+            key = id(asyncio.current_task())
+        except RuntimeError:
+            key = threading.get_ident()
+        with self._lock:
+            return self._lanes.setdefault(key, len(self._lanes) + 1)
+
+    def finish(self, span: Span) -> None:
+        with self._lock:
+            self._finished.append(span)
+
+    def drain(self) -> List[Span]:
+        """Remove and return every finished span."""
+        with self._lock:
+            spans = list(self._finished)
+            self._finished.clear()
+            self._lanes.clear()
+        return spans
+
+    async def flush(self) -> None:
+        """Export finished spans to every configured destination."""
+        spans = self.drain()
+        if not spans:
+            return
+        if self.chrome_trace_path:
+            self.write_chrome_trace(self.chrome_trace_path, spans)
+        if self.otlp_endpoint:
+            try:
+                async with httpx.AsyncClient(timeout=10) as client:
+                    response = await client.post(
+                        self.otlp_endpoint, json=self.to_otlp(spans)
+                    )
+                    response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to export {len(spans)} spans over OTLP: {e}")
+
+    @staticmethod
+    def to_chrome_events(spans: List[Span]) -> List[dict]:
+        """Render spans as Chrome trace "complete" events."""
+        pid = os.getpid()
+        events = []
+        for span in spans:
+            args = dict(span.attributes)
+            if span.error:
+                args["error"] = span.error
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": span.start_ns / 1000,
+                    "dur": (span.end_ns - span.start_ns) / 1000,
+                    "pid": pid,
+                    "tid": span.lane,
+                    "args": {k: str(v) for k, v in args.items()},
+                }
+            )
+        return events
+
+    @classmethod
+    def write_chrome_trace(cls, path: str, spans: List[Span]) -> None:
+        """Append spans to a Chrome trace file in the JSON array format.
+
+        The array is left unterminated, which trace viewers accept, so later
+        flushes can keep appending to the same file.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        new_file = not path.exists() or path.stat().st_size == 0
+        with open(path, "a", encoding="utf-8") as f:
+            if new_file:
+                f.write("[\n")
+            for event in cls.to_chrome_events(spans):
+                f.write(json.dumps(event) + ",\n")
+
+    def to_otlp(self, spans: List[Span]) -> dict:
+        """Render spans as an OTLP/HTTP JSON ExportTraceServiceRequest."""
+
+        def attribute(key: str, value: Any) -> dict:
+            if isinstance(value, bool):
+                typed = {"boolValue": value}
+            elif isinstance(value, int):
+                typed = {"intValue": str(value)}
+            elif isinstance(value, float):
+                typed = {"doubleValue": value}
+            else:
+                typed = {"stringValue": str(value)}
+            return {"key": key, "value": typed}
+
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [attribute(k, v) for k, v in span.attributes.items()],
+                "status": (
+                    {"code": 2, "message": span.error} if span.error else {"code": 1}
+                ),
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [attribute("service.name", self.service_name)]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "app.tracing"}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorate a function so each call is recorded as a span.
+
+    Args:
+        name: Span name; the function's qualified name when omitted
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__qualname__
+
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await fn(*args, **kwargs)
+                with Span(tracer, span_name, {}):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with Span(tracer, span_name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+tracer = Tracer.from_config()
@@ -1,3 +1,5 @@
 """
-OpenManus benchmark system for standardized agent evaluation.
+OpenManus benchmark suite for the framework's hot paths.
+
+Run it with `python -m examples.benchmarks`; see README.md.
 """
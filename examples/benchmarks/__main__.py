@@ -0,0 +1,84 @@
+"""Run the benchmark suite.
+
+Usage:
+    python -m examples.benchmarks --output baseline.json
+    python -m examples.benchmarks --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.logger import define_log_level, logger
+from examples.benchmarks import cases  # noqa: F401  (registers the benchmarks)
+from examples.benchmarks.harness import (
+    BENCHMARKS,
+    BenchmarkReport,
+    compare,
+    format_table,
+    measure,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark OpenManus hot paths")
+    parser.add_argument(
+        "--filter",
+        "-k",
+        default="",
+        help="Only run benchmarks whose name contains this text",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply every benchmark's iteration count, e.g. 0.1 for a smoke run",
+    )
+    parser.add_argument("--output", "-o", help="Write the results as JSON here")
+    parser.add_argument(
+        "--baseline", help="Compare against results saved earlier with --output"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Slowdown of a median, as a fraction, reported as a regression",
+    )
+    parser.add_argument(
+        "--log-level",
+        default="ERROR",
+        help="Log level while benchmarking; logging calls are still timed",
+    )
+    return parser.parse_args()
+
+
+async def main() -> int:
+    args = parse_args()
+    define_log_level(args.log_level, args.log_level, name="benchmark")
+
+    report = BenchmarkReport()
+    for name, bench in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        try:
+            report.results.append(await measure(bench, args.scale))
+        except Exception as e:
+            # e.g. tokenizer files that cannot be downloaded on an offline machine
+            logger.error(f"Skipping benchmark {name}: {e}")
+    print(format_table(report.results))
+
+    if args.output:
+        report.save(args.output)
+    if args.baseline:
+        regressions = compare(
+            report, BenchmarkReport.load(args.baseline), args.tolerance
+        )
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(regressions))
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
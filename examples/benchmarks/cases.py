@@ -0,0 +1,171 @@
+"""The benchmarked hot paths.
+
+Each function registered with `@benchmark` builds its inputs and returns the
+operation to time. Sizes are part of the benchmark names so that results
+stay comparable across runs and against saved baselines.
+"""
+
+import atexit
+import itertools
+import shutil
+import tempfile
+from pathlib import Path
+
+from app.agent.toolcall import ToolCallAgent
+from app.flow.plan_cache import PlanCache
+from app.llm import LLM, TokenCounter
+from app.schema import Memory, Message
+from app.tool import PlanningTool, StrReplaceEditor, ToolCollection
+from app.tool.plan_store import PlanStore
+from app.tool.web_search import WebContentFetcher
+from examples.benchmarks.fixtures import (
+    NoopTool,
+    ScriptedLLM,
+    html_corpus,
+    large_file,
+    transcript,
+)
+from examples.benchmarks.harness import benchmark
+
+
+def _memory_add_message(history: int):
+    memory = Memory(max_messages=history)
+    memory.add_messages(transcript(history // 2))
+    message = Message.user_message("Continue with the next step of the plan.")
+    return lambda: memory.add_message(message)
+
+
+@benchmark("memory.add_message[history=1000]", group="memory")
+def memory_add_message_1k():
+    return _memory_add_message(1000)
+
+
+@benchmark("memory.add_message[history=10000]", group="memory")
+def memory_add_message_10k():
+    return _memory_add_message(10000)
+
+
+@benchmark("llm.format_messages[turns=200]", group="llm", iterations=200)
+def llm_format_messages():
+    messages = transcript(200)
+    return lambda: LLM.format_messages(messages)
+
+
+def _token_counter() -> TokenCounter:
+    import tiktoken
+
+    return TokenCounter(tiktoken.get_encoding("cl100k_base"))
+
+
+@benchmark("llm.count_message_tokens[turns=200,cached]", group="llm", iterations=200)
+def llm_count_tokens_cached():
+    counter = _token_counter()
+    messages = LLM.format_messages(transcript(200))
+    return lambda: counter.count_message_tokens(messages)
+
+
+@benchmark(
+    "llm.count_message_tokens[turns=200,cold]", group="llm", iterations=50, warmup=5
+)
+def llm_count_tokens_cold():
+    tokenizer = _token_counter().tokenizer
+    messages = LLM.format_messages(transcript(200))
+    # A fresh counter per call starts with empty memoization caches
+    return lambda: TokenCounter(tokenizer).count_message_tokens(messages)
+
+
+@benchmark("agent.step[fake_llm]", group="agent", iterations=500)
+def agent_step():
+    agent = ToolCallAgent(
+        llm=ScriptedLLM(),
+        available_tools=ToolCollection(NoopTool()),
+        next_step_prompt="",
+    )
+    agent.memory.add_messages(transcript(20))
+    return agent.step
+
+
+@benchmark("web.extract_text[corpus]", group="web", iterations=30, warmup=3)
+def web_extract_text():
+    pages = itertools.cycle(html_corpus())
+    return lambda: WebContentFetcher.extract_text(next(pages))
+
+
+def _editor_file(lines: int) -> Path:
+    directory = Path(tempfile.mkdtemp(prefix="openmanus-bench-"))
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    return large_file(directory / "module.py", lines)
+
+
+@benchmark("editor.view[lines=20000]", group="editor", iterations=100, warmup=5)
+def editor_view():
+    editor = StrReplaceEditor()
+    path = str(_editor_file(20000))
+    return lambda: editor.execute(command="view", path=path, view_range=[9000, 9100])
+
+
+@benchmark(
+    "editor.str_replace+undo[lines=20000]", group="editor", iterations=100, warmup=5
+)
+def editor_str_replace():
+    editor = StrReplaceEditor()
+    path = str(_editor_file(20000))
+
+    async def replace_and_undo():
+        # Undoing keeps the file, and the editor's history, the same size
+        await editor.execute(
+            command="str_replace",
+            path=path,
+            old_str="def function_5000(value):",
+            new_str="def renamed_5000(value):",
+        )
+        await editor.execute(command="undo_edit", path=path)
+
+    return replace_and_undo
+
+
+@benchmark("planning.format_plan[steps=50]", group="planning")
+def planning_format_plan():
+    tool = PlanningTool()
+    steps = [f"Step {i}: research and summarize topic {i}" for i in range(50)]
+    tool._create_plan("bench", "Benchmark plan", steps)
+    plan = tool.plans["bench"]
+    for i in range(0, 50, 3):
+        plan["step_statuses"][i] = "completed"
+        plan["step_notes"][i] = "Done, results saved to the workspace."
+    return lambda: tool._format_plan(plan)
+
+
+@benchmark("planning.format_plan_delta[steps=500]", group="planning")
+def planning_format_plan_delta():
+    tool = PlanningTool(plans={}, store=None)
+    steps = [f"Step {i}: research and summarize topic {i}" for i in range(500)]
+    tool._create_plan("bench", "Benchmark plan", steps)
+    for i in range(0, 500, 3):
+        tool._mark_step("bench", i, "completed", "Done, results saved.")
+    version = tool.plans["bench"]["version"]
+    return lambda: tool.format_plan_delta("bench", since=version - 2, include=[499])
+
+
+@benchmark("planning.mark_step[steps=500,sqlite]", group="planning")
+def planning_mark_step_stored():
+    directory = Path(tempfile.mkdtemp(prefix="openmanus-bench-"))
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    tool = PlanningTool(plans={}, store=PlanStore(directory / "plans.sqlite"))
+    steps = [f"Step {i}: research and summarize topic {i}" for i in range(500)]
+    tool._create_plan("bench", "Benchmark plan", steps)
+    indices = itertools.cycle(range(500))
+    return lambda: tool._mark_step("bench", next(indices), "in_progress", None)
+
+
+@benchmark("plan_cache.lookup[entries=1000]", group="planning", iterations=200)
+def plan_cache_lookup():
+    cache = PlanCache(max_entries=1000)
+    steps = ["Open the website", "Summarize the product line", "Write the report"]
+    for i in range(1000):
+        cache.store(
+            f"Research Company{i}'s website and summarize section{i}",
+            {"title": f"Research Company{i}", "steps": steps},
+        )
+    # A near match, so the similarity index is searched
+    return lambda: cache.lookup("Please research Initech's website and summarize it")
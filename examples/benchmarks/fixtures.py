@@ -0,0 +1,124 @@
+"""Deterministic inputs for the benchmark suite.
+
+Everything here is generated from fixed seeds or read from files in the
+repository, so two runs of the suite time exactly the same work.
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import List
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from app.config import PROJECT_ROOT
+from app.llm import LLM
+from app.schema import Message
+from app.tool.base import BaseTool, ToolResult
+
+
+HTML_CORPUS_DIR = PROJECT_ROOT / "examples" / "use_case" / "japan-travel-plan"
+
+_WORDS = (
+    "agent plan step browser search result page content file tool call "
+    "observation token model request response error retry memory context "
+    "summary python data report analysis the a of to and in is for with"
+).split()
+
+
+def text(rng: random.Random, words: int) -> str:
+    """Pseudo-English text of the given length in words."""
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def transcript(turns: int, seed: int = 0) -> List[Message]:
+    """An agent transcript: a task followed by `turns` tool-calling rounds.
+
+    Each round is an assistant message with one tool call followed by its
+    tool result, with lengths resembling browsing and editing sessions.
+    """
+    rng = random.Random(seed)
+    messages = [
+        Message.system_message(text(rng, 300)),
+        Message.user_message(text(rng, 60)),
+    ]
+    for turn in range(turns):
+        call_id = f"call_{turn}"
+        call = ChatCompletionMessageToolCall(
+            id=call_id,
+            type="function",
+            function=Function(
+                name="web_search",
+                arguments=json.dumps({"query": text(rng, 8)}),
+            ),
+        )
+        messages.append(
+            Message.from_tool_calls(content=text(rng, 40), tool_calls=[call])
+        )
+        messages.append(
+            Message.tool_message(
+                text(rng, rng.randint(50, 600)), name="web_search", tool_call_id=call_id
+            )
+        )
+    return messages
+
+
+def html_corpus() -> List[str]:
+    """The saved HTML pages shipped under examples/use_case."""
+    return [
+        path.read_text(encoding="utf-8")
+        for path in sorted(HTML_CORPUS_DIR.glob("*.html"))
+    ]
+
+
+def large_file(path: Path, lines: int, seed: int = 0) -> Path:
+    """Write a Python-looking source file of the given length."""
+    rng = random.Random(seed)
+    body = [
+        f"def function_{i}(value):\n    return value + {rng.randint(0, 999)}  # {text(rng, 6)}"
+        for i in range(lines // 2)
+    ]
+    path.write_text("\n".join(body) + "\n", encoding="utf-8")
+    return path
+
+
+class NoopTool(BaseTool):
+    name: str = "noop"
+    description: str = "Return its input unchanged."
+    parameters: dict = {
+        "type": "object",
+        "properties": {"text": {"type": "string"}},
+        "required": ["text"],
+    }
+
+    async def execute(self, text: str) -> ToolResult:
+        return ToolResult(output=text)
+
+
+class ScriptedLLM(LLM):
+    """An LLM that answers every tool request with the same tool call.
+
+    Bypasses `LLM.__init__`, so no configuration, client or tokenizer is
+    needed and the agent's own overhead is all that gets timed.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        return object.__new__(cls)
+
+    def __init__(self, tool_name: str = "noop", arguments: str = '{"text": "ok"}'):
+        self.model = "scripted"
+        self.response = ChatCompletionMessage(
+            role="assistant",
+            content="Calling the tool again.",
+            tool_calls=[
+                ChatCompletionMessageToolCall(
+                    id="call_0",
+                    type="function",
+                    function=Function(name=tool_name, arguments=arguments),
+                )
+            ],
+        )
+
+    async def ask_tool(self, *args, **kwargs) -> ChatCompletionMessage:
+        return self.response
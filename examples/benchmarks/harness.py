@@ -0,0 +1,163 @@
+"""Registry, timing loop and result comparison for the benchmark suite."""
+
+import gc
+import inspect
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class Benchmark(BaseModel):
+    """A named hot path to time.
+
+    `setup` is called once per run and returns the operation to time, a
+    function taking no arguments that may return an awaitable.
+    """
+
+    name: str
+    group: str
+    setup: Callable[[], Callable[[], Any]]
+    iterations: int = 1000
+    warmup: int = 50
+
+
+class BenchmarkResult(BaseModel):
+    name: str
+    group: str
+    iterations: int
+    ops_per_sec: float
+    mean_us: float
+    p50_us: float
+    p95_us: float
+    p99_us: float
+    max_us: float
+
+
+class BenchmarkReport(BaseModel):
+    python: str = Field(default_factory=platform.python_version)
+    machine: str = Field(default_factory=platform.platform)
+    results: List[BenchmarkResult] = Field(default_factory=list)
+
+    def save(self, path: Path | str) -> None:
+        Path(path).write_text(self.model_dump_json(indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path | str) -> "BenchmarkReport":
+        return cls.model_validate(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(
+    name: str, group: str, iterations: int = 1000, warmup: int = 50
+) -> Callable:
+    """Register a setup function as a benchmark.
+
+    Args:
+        name: Unique name, reported in results and used to match baselines
+        group: Area of the framework the benchmark exercises
+        iterations: Timed calls per run
+        warmup: Untimed calls made before timing starts
+    """
+
+    def decorator(setup: Callable[[], Callable[[], Any]]) -> Callable:
+        BENCHMARKS[name] = Benchmark(
+            name=name, group=group, setup=setup, iterations=iterations, warmup=warmup
+        )
+        return setup
+
+    return decorator
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index = max(
+        0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+async def measure(bench: Benchmark, iteration_scale: float = 1.0) -> BenchmarkResult:
+    """Time a benchmark, one sample per call.
+
+    The garbage collector is paused while timing so collections triggered by
+    earlier benchmarks do not land in this one's samples.
+    """
+    operation = bench.setup()
+    iterations = max(1, int(bench.iterations * iteration_scale))
+
+    async def call() -> None:
+        result = operation()
+        if inspect.isawaitable(result):
+            await result
+
+    for _ in range(bench.warmup):
+        await call()
+
+    samples: List[float] = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter_ns()
+            await call()
+            samples.append((time.perf_counter_ns() - start) / 1000)
+    finally:
+        gc.enable()
+
+    total_us = sum(samples)
+    samples.sort()
+    return BenchmarkResult(
+        name=bench.name,
+        group=bench.group,
+        iterations=iterations,
+        ops_per_sec=iterations / (total_us / 1e6) if total_us else 0.0,
+        mean_us=total_us / iterations,
+        p50_us=percentile(samples, 0.50),
+        p95_us=percentile(samples, 0.95),
+        p99_us=percentile(samples, 0.99),
+        max_us=samples[-1],
+    )
+
+
+def compare(
+    report: BenchmarkReport, baseline: BenchmarkReport, tolerance: float
+) -> List[str]:
+    """Describe every benchmark whose median slowed by more than `tolerance`.
+
+    Medians are compared rather than means, since they shrug off the
+    occasional sample stretched by the OS scheduler.
+    """
+    previous = {result.name: result for result in baseline.results}
+    regressions = []
+    for result in report.results:
+        before: Optional[BenchmarkResult] = previous.get(result.name)
+        if before is None or before.p50_us == 0:
+            continue
+        change = result.p50_us / before.p50_us - 1
+        if change > tolerance:
+            regressions.append(
+                f"{result.name}: p50 {before.p50_us:.1f}us -> "
+                f"{result.p50_us:.1f}us (+{change:.0%})"
+            )
+    return regressions
+
+
+def format_table(results: List[BenchmarkResult]) -> str:
+    """Render results as an aligned text table."""
+    header = (
+        f"{'benchmark':<44} {'ops/sec':>12} {'p50 us':>10} "
+        f"{'p95 us':>10} {'p99 us':>10}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.name:<44} {r.ops_per_sec:>12,.0f} {r.p50_us:>10.1f} "
+            f"{r.p95_us:>10.1f} {r.p99_us:>10.1f}"
+        )
+    return "\n".join(lines)
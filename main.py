@@ -1,7 +1,11 @@
+import argparse
 import asyncio
+from contextlib import nullcontext
 
 from app.agent.manus import Manus
+from app.cassette import Cassette, use_cassette
 from app.logger import logger
+from app.runner import SessionRunner, run_batch
 
 
 async def main():
@@ -22,5 +26,78 @@ async def main():
         await agent.cleanup()
 
 
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Run the Manus agent")
+    parser.add_argument(
+        "--batch",
+        metavar="INPUT",
+        help="JSONL file of prompts to run non-interactively",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        default="batch_results.jsonl",
+        help="JSONL file that batch results are appended to",
+    )
+    parser.add_argument(
+        "--concurrency",
+        "-j",
+        type=int,
+        default=4,
+        help="Number of batch prompts run at once",
+    )
+    parser.add_argument(
+        "--prompt-field",
+        default="prompt",
+        help="Field of each input object holding the prompt",
+    )
+    parser.add_argument(
+        "--id-field",
+        default="id",
+        help="Field of each input object holding its id",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Rerun prompts already completed in the output file",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record",
+        metavar="CASSETTE",
+        help="Record LLM responses and tool results to a cassette file",
+    )
+    cassette.add_argument(
+        "--replay",
+        metavar="CASSETTE",
+        help="Answer LLM and tool calls from a recorded cassette, offline",
+    )
+    return parser.parse_args()
+
+
+def cassette_scope(args: argparse.Namespace):
+    """Context in which the run records to or replays from a cassette."""
+    if args.record:
+        return use_cassette(Cassette(args.record, Cassette.RECORD))
+    if args.replay:
+        return use_cassette(Cassette(args.replay, Cassette.REPLAY))
+    return nullcontext()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    with cassette_scope(args):
+        if args.batch:
+            asyncio.run(
+                run_batch(
+                    args.batch,
+                    args.output,
+                    runner=SessionRunner(max_concurrency=args.concurrency),
+                    prompt_field=args.prompt_field,
+                    id_field=args.id_field,
+                    resume=not args.no_resume,
+                )
+            )
+        else:
+            asyncio.run(main())
@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import time
 
@@ -6,28 +7,43 @@ from app.flow.flow_factory import FlowFactory, FlowType
 from app.logger import logger
 
 
-async def run_flow():
+async def run_flow(
+    resume_run_id: str | None = None,
+    executors: int = 1,
+    stream_plan: bool = False,
+    plan_cache: bool = True,
+):
     agents = {
         "manus": Manus(),
     }
 
+    flow = None
     try:
-        prompt = input("Enter your prompt: ")
-
-        if prompt.strip().isspace() or not prompt:
-            logger.warning("Empty prompt provided.")
-            return
-
         flow = FlowFactory.create_flow(
             flow_type=FlowType.PLANNING,
             agents=agents,
+            # Independent plan steps run in parallel on pooled Manus agents
+            executor_factories={"manus": Manus} if executors > 1 else None,
+            pool_size=executors,
+            stream_planning=stream_plan,
         )
-        logger.warning("Processing your request...")
+        if not plan_cache:
+            flow.plan_cache = None
+        if resume_run_id:
+            run = flow.resume(resume_run_id)
+        else:
+            prompt = input("Enter your prompt: ")
+
+            if prompt.strip().isspace() or not prompt:
+                logger.warning("Empty prompt provided.")
+                return
+            run = flow.execute(prompt)
+        logger.warning(f"Processing your request (run {flow.run_id})...")
 
         try:
             start_time = time.time()
             result = await asyncio.wait_for(
-                flow.execute(prompt),
+                run,
                 timeout=3600,  # 60 minute timeout for the entire execution
             )
             elapsed_time = time.time() - start_time
@@ -38,12 +54,49 @@ async def run_flow():
             logger.info(
                 "Operation terminated due to timeout. Please try a simpler request."
             )
+            if flow.checkpoint_store:
+                logger.info(
+                    f"Continue it with: python run_flow.py --resume {flow.run_id}"
+                )
 
     except KeyboardInterrupt:
         logger.info("Operation cancelled by user.")
     except Exception as e:
         logger.error(f"Error: {str(e)}")
+    finally:
+        if flow:
+            await flow.cleanup()
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Run the planning flow")
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Continue an interrupted run from its last checkpoint",
+    )
+    parser.add_argument(
+        "--executors",
+        type=int,
+        default=1,
+        help="Number of agents executing independent plan steps in parallel",
+    )
+    parser.add_argument(
+        "--stream-plan",
+        action="store_true",
+        help="Start the first plan step while the rest of the plan is generated",
+    )
+    parser.add_argument(
+        "--no-plan-cache",
+        action="store_true",
+        help="Always ask the LLM for a plan instead of reusing one of a similar request",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    asyncio.run(run_flow())
+    args = parse_args()
+    asyncio.run(
+        run_flow(args.resume, args.executors, args.stream_plan, not args.no_plan_cache)
+    )
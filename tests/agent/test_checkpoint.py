@@ -0,0 +1,77 @@
+import pytest
+
+from app.agent.toolcall import ToolCallAgent
+from app.checkpoint import CheckpointStore
+from app.llm import LLM
+from app.schema import AgentState, Message
+from app.tool import PlanningTool, ToolCollection
+
+
+class ScriptedAgent(ToolCallAgent):
+    """Records each step in memory and the plan, optionally crashing at one."""
+
+    name: str = "scripted"
+    crash_at: int = 0
+    executed: list = []
+
+    async def step(self) -> str:
+        if self.current_step == self.crash_at:
+            raise RuntimeError("crash")
+        self.executed.append(self.current_step)
+        planning = self.available_tools.get_tool("planning")
+        if self.current_step == 1:
+            await planning.execute(
+                command="create", plan_id="p", title="t", steps=["a", "b", "c", "d"]
+            )
+        await planning.execute(
+            command="mark_step",
+            step_index=self.current_step - 1,
+            step_status="completed",
+        )
+        self.memory.add_message(Message.assistant_message(f"did {self.current_step}"))
+        if self.current_step == 4:
+            self.state = AgentState.FINISHED
+        return f"done {self.current_step}"
+
+
+def make_agent(store: CheckpointStore, crash_at: int = 0) -> ScriptedAgent:
+    # Skip LLM.__init__, which needs tokenizer downloads; step() never calls it
+    return ScriptedAgent(
+        llm=object.__new__(LLM),
+        available_tools=ToolCollection(PlanningTool()),
+        checkpoint_store=store,
+        crash_at=crash_at,
+    )
+
+
+@pytest.mark.asyncio
+async def test_resume_continues_after_last_completed_step(tmp_path):
+    """Tests that a resumed run skips finished steps and restores its state."""
+    store = CheckpointStore(tmp_path)
+    crashed = make_agent(store, crash_at=3)
+    with pytest.raises(RuntimeError):
+        await crashed.run("go", run_id="r1")
+    assert crashed.executed == [1, 2]
+
+    resumed = make_agent(store)
+    result = await resumed.resume("r1")
+
+    assert resumed.executed == [3, 4]
+    assert result.splitlines() == [f"Step {i}: done {i}" for i in range(1, 5)]
+    assert [m.content for m in resumed.memory.messages] == [
+        "go",
+        "did 1",
+        "did 2",
+        "did 3",
+        "did 4",
+    ]
+    plan = resumed.available_tools.get_tool("planning").plans["p"]
+    assert plan["step_statuses"] == ["completed"] * 4
+    assert not resumed.has_checkpoint("r1")
+
+
+@pytest.mark.asyncio
+async def test_resume_without_checkpoint_fails(tmp_path):
+    """Tests that resuming an unknown run raises instead of starting over."""
+    with pytest.raises(ValueError):
+        await make_agent(CheckpointStore(tmp_path)).resume("missing")
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+from openai.types.chat import ChatCompletionMessage
+
+from app.agent.toolcall import ToolCallAgent
+from app.exceptions import TokenLimitExceeded
+from app.llm import LLM
+from app.schema import AgentState, Function, Message, Role, ToolCall
+from app.tool import Terminate, ToolCollection
+
+
+def count_chars(messages):
+    """Cheap stand-in for a token counter: one token per character."""
+    return sum(len(m.content or "") for m in messages)
+
+
+def make_agent(context_window: int, budget_spent: bool = False) -> ToolCallAgent:
+    # Skip LLM.__init__, which needs tokenizer downloads
+    llm = object.__new__(LLM)
+    llm.context_window = context_window
+    llm.count_prompt_tokens = count_chars
+    llm.token_counter = SimpleNamespace(count_tools=lambda tools: 0)
+    llm.prompts = []
+
+    async def ask_tool(messages, **kwargs):
+        llm.prompts.append(count_chars(messages))
+        if budget_spent or count_chars(messages) > context_window:
+            raise TokenLimitExceeded("over the limit")
+        return ChatCompletionMessage(role="assistant", content="done")
+
+    llm.ask_tool = ask_tool
+    agent = ToolCallAgent(
+        llm=llm, available_tools=ToolCollection(Terminate()), next_step_prompt=""
+    )
+    agent.memory.add_message(Message.user_message("task"))
+    for i in range(5):
+        call = ToolCall(id=f"c{i}", function=Function(name="browser", arguments="{}"))
+        agent.memory.add_messages(
+            [
+                Message.from_tool_calls(tool_calls=[call]),
+                Message.tool_message("o" * 1000, "browser", call.id),
+            ]
+        )
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_request_over_the_context_window_is_compacted_and_retried():
+    """Tests that history is compacted to the window, not dropped, on overflow."""
+    agent = make_agent(context_window=4000)
+
+    assert await agent.think()
+
+    assert agent.llm.prompts[0] > 4000 >= agent.llm.prompts[1]
+    tool_messages = [m for m in agent.memory.messages if m.role == Role.TOOL]
+    assert len(tool_messages) == 5
+    assert tool_messages[-1].content == "o" * 1000
+
+
+@pytest.mark.asyncio
+async def test_spent_budget_ends_the_run_without_compacting():
+    """Tests that a prompt within the window is not squeezed into a spent budget."""
+    agent = make_agent(context_window=10000, budget_spent=True)
+    before = [m.content for m in agent.memory.messages]
+
+    assert not await agent.think()
+
+    assert len(agent.llm.prompts) == 1
+    assert agent.state == AgentState.FINISHED
+    assert [m.content for m in agent.memory.messages[:-1]] == before
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from app.agent.toolcall import ToolCallAgent
+from app.events import EventType
+from app.llm import LLM
+from app.tool import Terminate, ToolCollection
+from app.tool.base import BaseTool, ToolResult
+
+
+class Echo(BaseTool):
+    name: str = "echo"
+    description: str = "Echo the given text."
+    parameters: dict = {"type": "object", "properties": {"text": {"type": "string"}}}
+
+    async def execute(self, text: str) -> ToolResult:
+        await asyncio.sleep(0)
+        return ToolResult(output=text)
+
+
+def tool_message(name: str, arguments: dict) -> ChatCompletionMessage:
+    return ChatCompletionMessage(
+        role="assistant",
+        content=f"Calling {name}",
+        tool_calls=[
+            ChatCompletionMessageToolCall(
+                id=f"call_{name}",
+                type="function",
+                function=Function(name=name, arguments=json.dumps(arguments)),
+            )
+        ],
+    )
+
+
+def make_agent(replies) -> ToolCallAgent:
+    # Skip LLM.__init__, which needs tokenizer downloads
+    llm = object.__new__(LLM)
+    replies = iter(replies)
+
+    async def ask_tool(**kwargs):
+        return next(replies)
+
+    llm.ask_tool = ask_tool
+    return ToolCallAgent(
+        llm=llm,
+        available_tools=ToolCollection(Echo(), Terminate()),
+        next_step_prompt="",
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_stream_yields_events_in_order():
+    """Tests that a run is reported step by step and ends with its answer."""
+    agent = make_agent(
+        [
+            tool_message("echo", {"text": "hello"}),
+            tool_message("terminate", {"status": "success"}),
+        ]
+    )
+
+    events = [event async for event in agent.run_stream("greet", run_id="r1")]
+
+    assert [event.type for event in events] == [
+        EventType.STEP_START,
+        EventType.THOUGHT,
+        EventType.TOOL_CALL,
+        EventType.TOOL_RESULT,
+        EventType.STEP_END,
+        EventType.STEP_START,
+        EventType.THOUGHT,
+        EventType.TOOL_CALL,
+        EventType.TOOL_RESULT,
+        EventType.STEP_END,
+        EventType.FINAL_ANSWER,
+    ]
+    assert events[3].name == "echo" and "hello" in events[3].content
+    assert {(event.run_id, event.agent) for event in events} == {("r1", agent.name)}
+    assert [event.step for event in events[:5]] == [1] * 5
+    assert events[-1].content.startswith("Step 1:")
+
+
+@pytest.mark.asyncio
+async def test_leaving_the_stream_cancels_the_run():
+    """Tests that breaking out of the loop stops the agent."""
+    agent = make_agent(tool_message("echo", {"text": "again"}) for _ in range(100))
+
+    stream = agent.run_stream("loop forever")
+    async for event in stream:
+        if event.type == EventType.TOOL_RESULT:
+            break
+    await stream.aclose()
+    steps = agent.current_step
+    await asyncio.sleep(0.05)
+
+    assert agent.current_step == steps < agent.max_steps
+    assert agent.state == "IDLE"
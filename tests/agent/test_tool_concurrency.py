@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import pytest
+
+from app.agent.toolcall import ToolCallAgent
+from app.llm import LLM
+from app.schema import Function, ToolCall
+from app.tool import ToolCollection
+from app.tool.base import BaseTool, ToolConcurrency
+
+
+log = []
+
+
+class RecordingTool(BaseTool):
+    """Sleeps, then records when it started and finished."""
+
+    description: str = "test tool"
+
+    async def execute(self, label: str, delay: float = 0.05) -> str:
+        log.append(("start", label))
+        await asyncio.sleep(delay)
+        log.append(("end", label))
+        return label
+
+
+@pytest.fixture(autouse=True)
+def clear_log():
+    log.clear()
+
+
+def make_agent(*tools: BaseTool) -> ToolCallAgent:
+    # Skip LLM.__init__, which needs tokenizer downloads; act() never calls it
+    return ToolCallAgent(
+        llm=object.__new__(LLM), available_tools=ToolCollection(*tools)
+    )
+
+
+def call(index: int, tool: str, label: str) -> ToolCall:
+    arguments = json.dumps({"label": label})
+    return ToolCall(id=f"c{index}", function=Function(name=tool, arguments=arguments))
+
+
+@pytest.mark.asyncio
+async def test_read_only_calls_overlap_and_keep_message_order():
+    """Tests that independent searches run at once but are recorded in order."""
+    search = RecordingTool(name="search", concurrency=ToolConcurrency.READ_ONLY)
+    agent = make_agent(search)
+    agent.tool_calls = [call(i, "search", f"q{i}") for i in range(3)]
+
+    started = asyncio.get_running_loop().time()
+    await agent.act()
+
+    assert asyncio.get_running_loop().time() - started < 0.12
+    assert [m.tool_call_id for m in agent.messages] == ["c0", "c1", "c2"]
+    assert [event for event, _ in log[:3]] == ["start"] * 3
+
+
+@pytest.mark.asyncio
+async def test_side_effects_and_exclusive_tools_stay_ordered():
+    """Tests that writes act as barriers and exclusive tools run in order."""
+    tools = (
+        RecordingTool(name="search", concurrency=ToolConcurrency.READ_ONLY),
+        RecordingTool(name="browser", concurrency=ToolConcurrency.EXCLUSIVE),
+        RecordingTool(name="write"),
+    )
+    agent = make_agent(*tools)
+    agent.tool_calls = [
+        call(0, "browser", "b1"),
+        call(1, "search", "s1"),
+        call(2, "browser", "b2"),
+        call(3, "write", "w"),
+        call(4, "search", "s2"),
+    ]
+
+    await agent.act()
+
+    position = {entry: i for i, entry in enumerate(log)}
+    # b1 and s1 overlap, b2 waits for b1
+    assert position[("start", "s1")] < position[("end", "b1")]
+    assert position[("end", "b1")] < position[("start", "b2")]
+    # The write starts after everything before it and before anything after it
+    assert position[("start", "w")] > max(
+        position[("end", label)] for label in ("b1", "s1", "b2")
+    )
+    assert position[("end", "w")] < position[("start", "s2")]
+
+
+@pytest.mark.asyncio
+async def test_calls_with_repeated_ids_each_run():
+    """Tests that calls sharing an id, or lacking one, are not merged."""
+    search = RecordingTool(name="search", concurrency=ToolConcurrency.READ_ONLY)
+    agent = make_agent(search)
+    agent.tool_calls = [call(0, "search", "q0"), call(0, "search", "q1")]
+    agent.tool_calls.append(
+        ToolCall(id="", function=Function(name="search", arguments='{"label": "q2"}'))
+    )
+
+    await agent.act()
+
+    assert [m.content.splitlines()[-1] for m in agent.messages] == ["q0", "q1", "q2"]
+    ended = sorted(label for event, label in log if event == "end")
+    assert ended == ["q0", "q1", "q2"]
+
+
+@pytest.mark.asyncio
+async def test_cancelling_act_cancels_running_tools():
+    """Tests that tool tasks do not outlive a cancelled act()."""
+    search = RecordingTool(name="search", concurrency=ToolConcurrency.READ_ONLY)
+    agent = make_agent(search)
+    agent.tool_calls = [
+        ToolCall(
+            id=f"c{i}",
+            function=Function(
+                name="search", arguments=json.dumps({"label": f"q{i}", "delay": 1})
+            ),
+        )
+        for i in range(2)
+    ]
+
+    act = asyncio.create_task(agent.act())
+    await asyncio.sleep(0.05)
+    tasks = list(agent._dispatched_tools.values())
+    act.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await act
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert tasks and all(task.cancelled() for task in tasks)
+    assert not agent._dispatched_tools
+    assert ("end", "q0") not in log
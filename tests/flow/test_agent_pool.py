@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from app.agent.base import BaseAgent
+from app.flow.agent_pool import AgentPool
+from app.llm import LLM
+from app.schema import Memory, Message
+
+
+class IdleAgent(BaseAgent):
+    async def step(self) -> str:
+        return "done"
+
+
+def build() -> IdleAgent:
+    # Skip LLM.__init__, which needs tokenizer downloads
+    return IdleAgent(name="idle", llm=object.__new__(LLM), next_step_prompt="next")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_leases_get_separate_agents():
+    """Tests that the pool grows to its size and reuses returned agents."""
+    pool = AgentPool(build, max_size=2)
+
+    async with pool.lease() as first, pool.lease() as second:
+        assert first is not second
+        assert pool.available == 0
+    async with pool.lease() as third:
+        assert third in (first, second)
+    assert len(pool.agents) == 2
+
+
+@pytest.mark.asyncio
+async def test_lease_waits_when_pool_is_full():
+    """Tests that a lease beyond the pool size waits for a returned agent."""
+    pool = AgentPool(build, max_size=1)
+    order = []
+
+    async def use(tag):
+        async with pool.lease():
+            order.append(f"{tag} start")
+            await asyncio.sleep(0.01)
+            order.append(f"{tag} end")
+
+    await asyncio.gather(use("a"), use("b"))
+
+    assert order == ["a start", "a end", "b start", "b end"]
+
+
+@pytest.mark.asyncio
+async def test_leased_agents_are_reset():
+    """Tests that leases start from fresh or forked memory and reset state."""
+    pool = AgentPool(build, max_size=1)
+    async with pool.lease() as agent:
+        agent.memory.add_message(Message.user_message("old step"))
+        agent.current_step = 3
+        agent.next_step_prompt = "stuck! next"
+
+    async with pool.lease() as agent:
+        assert agent.memory.messages == []
+        assert (agent.current_step, agent.next_step_prompt) == (0, "next")
+
+    base = Memory(messages=[Message.user_message("context")])
+    async with pool.lease(memory=base) as agent:
+        agent.memory.add_message(Message.user_message("more"))
+    assert len(base.messages) == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_of_existing_agent_keeps_memory():
+    """Tests that agents passed in directly keep their memory between leases."""
+    agent = build()
+    pool = AgentPool.of(agent)
+    async with pool.lease() as leased:
+        leased.memory.add_message(Message.user_message("remember me"))
+    async with pool.lease() as leased:
+        assert leased is agent
+        assert len(leased.memory.messages) == 1
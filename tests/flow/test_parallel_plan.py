@@ -0,0 +1,195 @@
+import asyncio
+import time
+
+import pytest
+
+from app.agent.base import BaseAgent
+from app.flow.planning import PlanningFlow
+from app.llm import LLM
+from app.schema import AgentState
+from app.tool import PlanningTool
+
+
+class TimedAgent(BaseAgent):
+    """Finishes each run after one short step, recording when it ran."""
+
+    spans: list = []
+
+    async def step(self) -> str:
+        start = time.monotonic()
+        await asyncio.sleep(0.05)
+        self.spans.append((self.messages[-1].content, start, time.monotonic()))
+        self.state = AgentState.FINISHED
+        return "done"
+
+
+class FailingAgent(TimedAgent):
+    """Fails the step called "fail A"."""
+
+    async def step(self) -> str:
+        if '"fail A"' in self.messages[-1].content:
+            raise RuntimeError("step failed")
+        return await super().step()
+
+
+def make_flow(steps, dependencies, executors=2, agent_class=TimedAgent) -> PlanningFlow:
+    # Skip LLM.__init__, which needs tokenizer downloads
+    llm = object.__new__(LLM)
+
+    async def ask(**kwargs):
+        return "summary"
+
+    llm.ask = ask
+    agents = {
+        f"a{i}": agent_class(name=f"a{i}", llm=llm, spans=[]) for i in range(executors)
+    }
+    flow = PlanningFlow(
+        agents, llm=llm, checkpoint_store=None, planning_tool=PlanningTool()
+    )
+    flow.planning_tool._create_plan(flow.active_plan_id, "t", steps, dependencies)
+    return flow
+
+
+def span_of(flow: PlanningFlow, text: str):
+    spans = [s for agent in flow.agents.values() for s in agent.spans]
+    return next((start, end) for prompt, start, end in spans if f'"{text}"' in prompt)
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently():
+    """Tests that ready steps overlap and dependents wait for them."""
+    flow = make_flow(["research A", "research B", "compare"], [[], [], [0, 1]])
+
+    result = await flow._execute_plan()
+
+    a, b, compare = (span_of(flow, t) for t in ["research A", "research B", "compare"])
+    assert a[0] < b[1] and b[0] < a[1]
+    assert compare[0] >= max(a[1], b[1])
+    plan = flow.planning_tool.plans[flow.active_plan_id]
+    assert plan["step_statuses"] == ["completed"] * 3
+    assert result.endswith("summary")
+
+
+@pytest.mark.asyncio
+async def test_plans_without_dependencies_stay_sequential():
+    """Tests that steps of a plan without dependencies never overlap."""
+    flow = make_flow(["one", "two"], None)
+
+    await flow._execute_plan()
+
+    one, two = span_of(flow, "one"), span_of(flow, "two")
+    assert two[0] >= one[1]
+
+
+@pytest.mark.asyncio
+async def test_parallel_steps_share_the_sandbox_until_flow_cleanup(monkeypatch):
+    """Tests that finishing a step does not tear down its siblings' sandbox."""
+
+    class FakeSandboxClient:
+        cleanups = 0
+
+        async def cleanup(self):
+            self.cleanups += 1
+
+    client = FakeSandboxClient()
+    monkeypatch.setattr("app.agent.base.get_sandbox_client", lambda: client)
+    monkeypatch.setattr("app.flow.planning.get_sandbox_client", lambda: client)
+    flow = make_flow(["research A", "research B", "compare"], [[], [], [0, 1]])
+
+    await flow._execute_plan()
+    assert client.cleanups == 0
+
+    await flow.cleanup()
+    assert client.cleanups == 1
+
+
+@pytest.mark.asyncio
+async def test_executor_sees_the_whole_plan_once_then_deltas():
+    """Tests that a kept memory gets the full plan first and only changes later."""
+    flow = make_flow(["one", "two", "three"], None, executors=1)
+
+    await flow._execute_plan()
+
+    prompts = [prompt for prompt, _, _ in flow.agents["a0"].spans]
+    assert "2. [ ] three" in prompts[0]
+    assert "2. [ ] three" not in prompts[1]
+    assert "1. [→] two" in prompts[1]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_plan_waits_for_its_steps_to_stop():
+    """Tests that no step task outlives a cancelled plan execution."""
+    flow = make_flow(["research A", "research B"], [[], []])
+
+    execution = asyncio.create_task(flow._execute_plan())
+    await asyncio.sleep(0.01)
+    execution.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await execution
+
+    others = asyncio.all_tasks() - {asyncio.current_task()}
+    assert all(task.done() for task in others)
+
+
+@pytest.mark.asyncio
+async def test_failed_step_blocks_only_its_dependents():
+    """Tests that a failure skips the steps after it, but not independent ones."""
+    flow = make_flow(
+        ["fail A", "research B", "compare"], [[], [], [0, 1]], agent_class=FailingAgent
+    )
+
+    result = await flow._execute_plan()
+
+    plan = flow.planning_tool.plans[flow.active_plan_id]
+    assert plan["step_statuses"] == ["blocked", "completed", "not_started"]
+    assert "Error executing step 0" in result
+    assert result.endswith("summary")
+
+
+def test_dependencies_must_point_to_earlier_steps():
+    """Tests that forward or self references are rejected."""
+    tool = PlanningTool()
+    with pytest.raises(Exception, match="earlier steps"):
+        tool._create_plan("p", "t", ["a", "b"], [[1], []])
+
+
+@pytest.mark.asyncio
+async def test_cyclic_dependencies_fall_back_to_running_in_order():
+    """Tests that a plan with a dependency cycle is kept, with sequential steps."""
+    flow = make_flow(["warm up"], None)
+    arguments = {
+        "command": "create",
+        "title": "t",
+        "steps": ["one", "two", "three"],
+        "step_dependencies": [[2], [0], [1]],
+    }
+
+    assert await flow._apply_planning_call(arguments)
+
+    plan = flow.planning_tool.plans[flow.active_plan_id]
+    assert plan["steps"] == ["one", "two", "three"]
+    assert plan["step_dependencies"] == [[], [0], [1]]
+
+
+@pytest.mark.asyncio
+async def test_pooled_executors_run_steps_of_one_kind_in_parallel():
+    """Tests that a factory-backed executor leases one agent per running step."""
+    flow = make_flow(["research A", "research B"], [[], []], executors=1)
+    llm = flow.llm
+    flow = PlanningFlow(
+        flow.agents,
+        executor_factories={"w": lambda: TimedAgent(name="w", llm=llm, spans=[])},
+        pool_size=2,
+        llm=llm,
+        checkpoint_store=None,
+        planning_tool=flow.planning_tool,
+        plan_id=flow.active_plan_id,
+    )
+
+    await flow._execute_plan()
+
+    workers = flow.executor_pools["w"].agents
+    spans = [span for agent in workers for span in agent.spans]
+    assert len(workers) == 2 and len(spans) == 2
+    (_, a_start, a_end), (_, b_start, b_end) = spans
+    assert a_start < b_end and b_start < a_end
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from openai.types.chat import ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from app.flow.plan_cache import PlanCache, parameterize
+from app.flow.planning import PlanningFlow
+from app.llm import LLM
+from app.schema import Message
+from app.tool import PlanningTool
+from tests.flow.test_agent_pool import build
+
+
+PLAN = {
+    "title": "Research Acme",
+    "steps": ["Open acme.com", "Summarize what Acme sells", "Write the report"],
+    "step_dependencies": [[], [0], [1]],
+}
+
+
+def test_parameterize_replaces_parameters_with_placeholders():
+    """Tests that requests differing only in parameters share a template."""
+    template, parameters = parameterize("Research Acme's website acme.com")
+    other, _ = parameterize("Research Globex's website globex.io")
+
+    assert template == other == "research {name}'s website {dotted}"
+    assert parameters == [("name", "Acme"), ("dotted", "acme.com")]
+
+
+def test_lookup_fills_in_the_new_parameters(tmp_path):
+    """Tests exact and near template hits, misses, and persistence."""
+    path = tmp_path / "plans.json"
+    cache = PlanCache(path, threshold=0.7)
+    cache.store("Research Acme's website acme.com", PLAN)
+
+    assert cache.lookup("Research Globex's website globex.io") == {
+        "title": "Research Globex",
+        "steps": ["Open globex.io", "Summarize what Globex sells", "Write the report"],
+        "step_dependencies": [[], [0], [1]],
+    }
+    near = cache.lookup("Please research Initech's website initech.net")
+    assert near["steps"][1] == "Summarize what Initech sells"
+    assert cache.lookup("Write a poem about Acme") is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    reloaded = PlanCache(path, threshold=0.7)
+    assert len(reloaded) == 1
+    assert reloaded.lookup("Research Hooli's website hooli.xyz")["title"] == (
+        "Research Hooli"
+    )
+
+
+@pytest.mark.asyncio
+async def test_flow_reuses_plan_without_asking_the_llm(tmp_path):
+    """Tests that only the first of two similar requests calls the LLM for a plan."""
+    # Skip LLM.__init__, which needs tokenizer downloads
+    llm = object.__new__(LLM)
+    planning_calls = []
+
+    async def ask_tool(**kwargs):
+        planning_calls.append(kwargs)
+        arguments = json.dumps({"command": "create", **PLAN})
+        return Message.from_tool_calls(
+            tool_calls=[
+                ChatCompletionMessageToolCall(
+                    id="call_0",
+                    type="function",
+                    function=Function(name="planning", arguments=arguments),
+                )
+            ]
+        )
+
+    llm.ask_tool = ask_tool
+    cache = PlanCache(tmp_path / "plans.json")
+
+    def make_flow(plan_id: str) -> PlanningFlow:
+        return PlanningFlow(
+            {"idle": build()},
+            llm=llm,
+            checkpoint_store=None,
+            plan_cache=cache,
+            planning_tool=PlanningTool(plans={}),
+            plan_id=plan_id,
+        )
+
+    await make_flow("first")._create_initial_plan("Research Acme's website acme.com")
+    second = make_flow("second")
+    await second._create_initial_plan("Research Globex's website globex.io")
+
+    assert len(planning_calls) == 1
+    plan = second.planning_tool.plans["second"]
+    assert plan["steps"][0] == "Open globex.io"
+    assert cache.hit_rate == 0.5
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+
+import pytest
+from openai.types.chat import ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from app.agent.base import BaseAgent
+from app.flow.plan_stream import PlanStepParser
+from app.flow.planning import PlanningFlow
+from app.llm import LLM, ToolCallStreamEvent
+from app.schema import AgentState, Message
+from app.tool import PlanningTool
+
+
+class RecordingAgent(BaseAgent):
+    starts: list = []
+
+    async def step(self) -> str:
+        self.starts.append((self.messages[-1].content, time.monotonic()))
+        self.state = AgentState.FINISHED
+        return "done"
+
+
+class SlowPlanStream:
+    """Streams planning arguments a few characters at a time."""
+
+    def __init__(self, arguments: str, complete: bool = True):
+        self.arguments = arguments
+        self.complete = complete
+        self.finished_at = None
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def __aiter__(self):
+        for i in range(0, len(self.arguments), 8):
+            await asyncio.sleep(0.005)
+            yield ToolCallStreamEvent(
+                arguments_delta=self.arguments[i : i + 8],
+                tool_call_index=0,
+                tool_name="planning",
+            )
+        self.finished_at = time.monotonic()
+        if not self.complete:
+            return
+        yield ToolCallStreamEvent(
+            tool_call=ChatCompletionMessageToolCall(
+                id="call_0",
+                type="function",
+                function=Function(name="planning", arguments=self.arguments),
+            )
+        )
+
+
+def test_parser_reports_steps_as_they_complete():
+    """Tests that each step is reported once its closing quote arrives."""
+    parser = PlanStepParser()
+
+    assert parser.feed('{"title": "Trip", "steps": ["Book fli') == []
+    assert parser.feed('ghts", "Book \\"the\\" ho') == ["Book flights"]
+    assert parser.feed('tel"], "step_dependencies": [[], []]}') == ['Book "the" hotel']
+    assert parser.fields["title"] == "Trip"
+
+
+@pytest.mark.asyncio
+async def test_first_step_starts_before_the_plan_finishes_streaming():
+    """Tests that streaming planning dispatches step 0 early and keeps its status."""
+    arguments = json.dumps(
+        {
+            "command": "create",
+            "title": "Research",
+            "steps": ["research A", "research B", "compare A and B"],
+            "step_dependencies": [[], [], [0, 1]],
+        }
+    )
+    stream = SlowPlanStream(arguments)
+    # Skip LLM.__init__, which needs tokenizer downloads
+    llm = object.__new__(LLM)
+
+    async def ask_tool_stream(**kwargs):
+        return stream
+
+    async def ask(**kwargs):
+        return "summary"
+
+    llm.ask_tool_stream, llm.ask = ask_tool_stream, ask
+    agent = RecordingAgent(name="worker", llm=llm, starts=[])
+    flow = PlanningFlow(
+        {"worker": agent},
+        llm=llm,
+        checkpoint_store=None,
+        plan_cache=None,
+        planning_tool=PlanningTool(),
+        stream_planning=True,
+    )
+
+    result = await flow.execute("compare A and B")
+
+    first_prompt, first_start = agent.starts[0]
+    assert '"research A"' in first_prompt
+    assert first_start < stream.finished_at
+    assert stream.closed
+    plan = flow.planning_tool.plans[flow.active_plan_id]
+    assert plan["steps"] == ["research A", "research B", "compare A and B"]
+    assert plan["step_statuses"] == ["completed"] * 3
+    assert result.endswith("summary")
+
+
+@pytest.mark.asyncio
+async def test_incomplete_stream_requests_the_plan_again():
+    """Tests that a stream ending without a planning call does not leave a one-step plan."""
+    arguments = json.dumps(
+        {
+            "command": "create",
+            "title": "Research",
+            "steps": ["research A", "research B"],
+        }
+    )
+    llm = object.__new__(LLM)
+
+    async def ask_tool_stream(**kwargs):
+        return SlowPlanStream(arguments, complete=False)
+
+    async def ask_tool(**kwargs):
+        call = ChatCompletionMessageToolCall(
+            id="call_0",
+            type="function",
+            function=Function(name="planning", arguments=arguments),
+        )
+        return Message.from_tool_calls(tool_calls=[call])
+
+    async def ask(**kwargs):
+        return "summary"
+
+    llm.ask_tool_stream, llm.ask_tool, llm.ask = ask_tool_stream, ask_tool, ask
+    agent = RecordingAgent(name="worker", llm=llm, starts=[])
+    flow = PlanningFlow(
+        {"worker": agent},
+        llm=llm,
+        checkpoint_store=None,
+        plan_cache=None,
+        planning_tool=PlanningTool(),
+        stream_planning=True,
+    )
+
+    await flow.execute("research A and B")
+
+    plan = flow.planning_tool.plans[flow.active_plan_id]
+    assert plan["steps"] == ["research A", "research B"]
+    assert plan["step_statuses"] == ["completed"] * 2
+    assert len(agent.starts) == 2
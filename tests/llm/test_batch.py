@@ -0,0 +1,153 @@
+import pytest
+from openai.types.chat import ChatCompletionMessage
+
+from app.batch import (
+    BatchError,
+    LocalBatchBackend,
+    build_request_line,
+    result_error,
+    wait_for_results,
+)
+from app.cache import ResponseCache
+from app.config import LLMSettings
+from app.llm import LLM
+
+
+class WordTokenizer:
+    def encode(self, text: str) -> list:
+        return text.split()
+
+
+async def echo_handler(body: dict) -> dict:
+    """Answers a chat completion body with its last user message."""
+    if body.get("model") == "broken" or body["messages"][-1]["content"] == "fail":
+        raise RuntimeError("model unavailable")
+    return {
+        "id": "chatcmpl-local",
+        "object": "chat.completion",
+        "created": 0,
+        "model": body["model"],
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": body["messages"][-1]["content"],
+                },
+            }
+        ],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+def test_request_line_drops_client_options():
+    """Tests that client-only and empty parameters are left out of the body."""
+    line = build_request_line(
+        "request-0",
+        {
+            "model": "gpt-4o",
+            "messages": [],
+            "tools": None,
+            "tool_choice": "auto",
+            "timeout": 300,
+            "temperature": 0.0,
+        },
+    )
+
+    assert line["url"] == "/v1/chat/completions"
+    assert line["body"] == {"model": "gpt-4o", "messages": [], "temperature": 0.0}
+
+
+@pytest.mark.asyncio
+async def test_local_backend_round_trip(tmp_path):
+    """Tests that results are written as JSONL and matched by custom_id."""
+    backend = LocalBatchBackend(echo_handler, tmp_path)
+    lines = [
+        build_request_line(
+            f"request-{i}",
+            {"model": "m", "messages": [{"role": "user", "content": f"lead {i}"}]},
+        )
+        for i in range(3)
+    ]
+
+    job_id = await backend.submit(lines)
+    results = await wait_for_results(backend, job_id, poll_interval=0)
+
+    assert (tmp_path / f"{job_id}_output.jsonl").exists()
+    by_id = {r["custom_id"]: r for r in results}
+    assert by_id["request-2"]["response"]["body"]["choices"][0]["message"] == {
+        "role": "assistant",
+        "content": "lead 2",
+    }
+    assert all(result_error(r) is None for r in results)
+
+
+@pytest.mark.asyncio
+async def test_local_backend_reports_failures(tmp_path):
+    """Tests that a failing request becomes an error line, not a failed job."""
+    backend = LocalBatchBackend(echo_handler, tmp_path)
+    job_id = await backend.submit(
+        [build_request_line("request-0", {"model": "broken", "messages": []})]
+    )
+
+    (result,) = await backend.poll(job_id)
+
+    assert result_error(result) == "RuntimeError: model unavailable"
+
+
+def test_result_error_rejects_bodies_without_a_completion():
+    """Tests that a 200 line carrying an error or no choices counts as failed."""
+
+    def line(body):
+        return {
+            "custom_id": "request-0",
+            "response": {"status_code": 200, "body": body},
+        }
+
+    assert result_error(line({"error": {"message": "overloaded"}})) == (
+        "API error: overloaded"
+    )
+    assert result_error(line({"choices": []})) == "Response has no choices"
+
+
+@pytest.mark.asyncio
+async def test_submit_and_await_batch_through_llm(tmp_path, monkeypatch):
+    """Tests futures, cache hits and per-request errors of LLM batches."""
+    monkeypatch.setattr(LLM, "_instances", {})
+    # Avoid tokenizer downloads; token counts are not under test
+    monkeypatch.setattr("app.llm.tiktoken.get_encoding", lambda name: WordTokenizer())
+    settings = LLMSettings(
+        model="batch-model",
+        base_url="http://localhost",
+        api_key="key",
+        api_type="openai",
+        api_version="",
+    )
+    llm = LLM("batch", {"default": settings})
+    llm.response_cache = ResponseCache()
+    llm.batch_backend = LocalBatchBackend(echo_handler, tmp_path)
+    requests = [
+        {"messages": [{"role": "user", "content": content}]}
+        for content in ("lead 0", "lead 1", "fail")
+    ]
+    params, _ = llm._build_tool_request(**requests[1])
+    llm.response_cache.set(
+        llm._request_key("ask_tool", params),
+        ChatCompletionMessage(role="assistant", content="cached").model_dump_json(),
+    )
+
+    job = await llm.submit_batch(requests)
+
+    uploaded = (tmp_path / f"{job.id}_input.jsonl").read_text().splitlines()
+    assert len(uploaded) == 2
+    assert job.futures["request-1"].done()
+
+    results = await llm.await_batch(job, poll_interval=0, return_exceptions=True)
+
+    assert [r.content for r in results[:2]] == ["lead 0", "cached"]
+    assert isinstance(results[2], BatchError)
+    assert "model unavailable" in str(results[2])
+    params, _ = llm._build_tool_request(**requests[0])
+    assert llm.response_cache.get(llm._request_key("ask_tool", params))
+    assert llm.total_completion_tokens == 1
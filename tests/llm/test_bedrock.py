@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.bedrock import Chat, ChatCompletions
+from app.config import LLMSettings
+from app.llm import LLM, ToolCallAssembler
+
+
+class FakeRuntime:
+    """Synchronous stand-in for the boto3 bedrock-runtime client."""
+
+    def __init__(self, events=()):
+        self.events = events
+        self.threads = []
+
+    def converse(self, **request):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": "hi"}]}},
+            "usage": {"inputTokens": 3, "outputTokens": 1, "totalTokens": 4},
+        }
+
+    def converse_stream(self, **request):
+        def events():
+            for event in self.events:
+                self.threads.append(threading.current_thread().name)
+                time.sleep(0.01)
+                yield event
+
+        return {"stream": events()}
+
+
+class WordTokenizer:
+    def encode(self, text: str) -> list:
+        return text.split()
+
+
+def test_tool_results_use_their_own_call_ids():
+    """Tests that parallel tool results keep their ids and share one message."""
+    completions = ChatCompletions(FakeRuntime())
+    calls = [
+        {"id": cid, "type": "function", "function": {"name": "t", "arguments": "{}"}}
+        for cid in ("a", "b")
+    ]
+
+    system, messages = completions._convert_openai_messages_to_bedrock_format(
+        [
+            {"role": "system", "content": "sys"},
+            {"role": "user", "content": "task"},
+            {"role": "assistant", "content": "", "tool_calls": calls},
+            {"role": "tool", "content": "ra", "tool_call_id": "a"},
+            {"role": "tool", "content": "rb", "tool_call_id": "b"},
+        ]
+    )
+
+    assert system == [{"text": "sys"}]
+    assert [block["toolUse"]["toolUseId"] for block in messages[1]["content"]] == [
+        "a",
+        "b",
+    ]
+    assert [block["toolResult"]["toolUseId"] for block in messages[2]["content"]] == [
+        "a",
+        "b",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_converse_runs_off_the_event_loop():
+    """Tests that concurrent non-streaming calls overlap in worker threads."""
+    runtime = FakeRuntime()
+    completions = ChatCompletions(runtime)
+    request = dict(
+        model="m", messages=[{"role": "user", "content": "q"}], max_tokens=10
+    )
+
+    started = time.monotonic()
+    responses = await asyncio.gather(
+        *(completions.create(**request, temperature=0, stream=False) for _ in range(4))
+    )
+
+    assert time.monotonic() - started < 0.15
+    assert [r.choices[0].message.content for r in responses] == ["hi"] * 4
+    assert all(name.startswith("bedrock") for name in runtime.threads)
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_openai_style_chunks():
+    """Tests that text and tool-use events become chat completion chunks."""
+    runtime = FakeRuntime(
+        events=[
+            {"messageStart": {"role": "assistant"}},
+            {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": "ok"}}},
+            {
+                "contentBlockStart": {
+                    "contentBlockIndex": 1,
+                    "start": {"toolUse": {"toolUseId": "t1", "name": "bash"}},
+                }
+            },
+            {
+                "contentBlockDelta": {
+                    "contentBlockIndex": 1,
+                    "delta": {"toolUse": {"input": '{"command": "ls"}'}},
+                }
+            },
+            {"messageStop": {"stopReason": "tool_use"}},
+            {"metadata": {"usage": {"inputTokens": 5, "outputTokens": 7}}},
+        ]
+    )
+    completions = ChatCompletions(runtime)
+
+    stream = await completions.create(
+        model="m",
+        messages=[{"role": "user", "content": "q"}],
+        max_tokens=10,
+        temperature=0,
+        stream=True,
+    )
+    assembler = ToolCallAssembler()
+    content = ""
+    usage = None
+    async for chunk in stream:
+        if not chunk.choices:
+            usage = chunk.usage
+            continue
+        delta = chunk.choices[0].delta
+        content += delta.content or ""
+        if delta.tool_calls:
+            assembler.feed(delta.tool_calls)
+
+    assert content == "ok"
+    assert (usage.prompt_tokens, usage.completion_tokens) == (5, 7)
+    assert [(c.id, c.function.arguments) for c in assembler.tool_calls] == [
+        ("t1", '{"command": "ls"}')
+    ]
+    assert threading.current_thread().name not in runtime.threads
+
+
+@pytest.mark.asyncio
+async def test_ask_streams_over_bedrock(monkeypatch):
+    """Tests that LLM.ask streams text and records usage from metadata."""
+    runtime = FakeRuntime(
+        events=[
+            {"messageStart": {"role": "assistant"}},
+            {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": "hel"}}},
+            {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": "lo"}}},
+            {"messageStop": {"stopReason": "end_turn"}},
+            {"metadata": {"usage": {"inputTokens": 5, "outputTokens": 7}}},
+        ]
+    )
+    monkeypatch.setattr(
+        "app.llm.BedrockClient", lambda: SimpleNamespace(chat=Chat(runtime))
+    )
+    monkeypatch.setattr(LLM, "_instances", {})
+    # Avoid tokenizer downloads; token counts are not under test
+    monkeypatch.setattr("app.llm.tiktoken.get_encoding", lambda name: WordTokenizer())
+    settings = LLMSettings(
+        model="bedrock-model",
+        base_url="",
+        api_key="",
+        api_type="aws",
+        api_version="",
+    )
+    llm = LLM("bedrock", {"default": settings})
+
+    response = await llm.ask(
+        [{"role": "user", "content": "q"}], stream=True, use_cache=False
+    )
+
+    assert response == "hello"
+    assert llm.total_completion_tokens == 7
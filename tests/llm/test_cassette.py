@@ -0,0 +1,84 @@
+import pytest
+from openai.types.chat import ChatCompletion
+
+from app.cassette import Cassette, use_cassette
+from app.exceptions import CassetteMiss
+from app.tool.base import BaseTool, ToolResult
+from app.tool.tool_collection import ToolCollection
+
+
+def make_completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+        }
+    )
+
+
+class Echo(BaseTool):
+    name: str = "echo"
+    description: str = "Echo the given text."
+    parameters: dict = {"type": "object", "properties": {"text": {"type": "string"}}}
+    calls: int = 0
+
+    async def execute(self, text: str) -> ToolResult:
+        self.calls += 1
+        return ToolResult(output=text)
+
+
+@pytest.mark.asyncio
+async def test_replay_answers_without_live_calls(tmp_path):
+    """Tests that a replayed cassette returns what was recorded, offline."""
+    path = tmp_path / "run.jsonl"
+    tool = Echo()
+
+    async def create():
+        return make_completion("hello")
+
+    with use_cassette(Cassette(path, Cassette.RECORD)) as cassette:
+        await cassette.completion("k1", False, create)
+        await ToolCollection(tool).execute(name="echo", tool_input={"text": "hi"})
+
+    async def offline():
+        raise AssertionError("replay must not call the model")
+
+    with use_cassette(Cassette(path, Cassette.REPLAY)) as cassette:
+        response = await cassette.completion("k1", False, offline)
+        result = await ToolCollection(tool).execute(
+            name="echo", tool_input={"text": "hi"}
+        )
+
+    assert response.choices[0].message.content == "hello"
+    assert result.output == "hi"
+    assert tool.calls == 1
+    assert cassette.fallbacks == 0
+
+
+@pytest.mark.asyncio
+async def test_unmatched_request_falls_back_then_misses(tmp_path):
+    """Tests that unknown keys take the next recording, then raise."""
+    path = tmp_path / "run.jsonl"
+
+    async def create():
+        return make_completion("first")
+
+    with use_cassette(Cassette(path, Cassette.RECORD)) as cassette:
+        await cassette.completion("k1", False, create)
+
+    cassette = Cassette(path, Cassette.REPLAY)
+    response = await cassette.completion("other", False, create)
+
+    assert response.choices[0].message.content == "first"
+    assert cassette.fallbacks == 1
+    with pytest.raises(CassetteMiss):
+        await cassette.completion("k1", False, create)
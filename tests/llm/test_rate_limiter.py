@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from app.rate_limiter import RateLimiter, TokenBucket
+
+
+def test_token_bucket_delay():
+    """Tests that an empty bucket reports the refill delay."""
+    bucket = TokenBucket(rate_per_minute=60)
+    bucket.consume(60)
+
+    assert 0.9 < bucket.delay_for(1) <= 1.0
+
+
+def test_aimd_window():
+    """Tests multiplicative decrease on 429 and additive increase on success."""
+    limiter = RateLimiter(max_concurrency=8)
+
+    limiter.on_rate_limited(retry_after=0)
+    assert int(limiter.concurrency) == 4
+
+    for _ in range(4):
+        limiter.on_success()
+    assert 4 < limiter.concurrency < 6
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_and_fifo_order():
+    """Tests that admission respects the window and preserves arrival order."""
+    limiter = RateLimiter(max_concurrency=2)
+    admitted = []
+    active = 0
+    peak = 0
+
+    async def call(i: int):
+        nonlocal active, peak
+        async with limiter.acquire():
+            admitted.append(i)
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(call(i) for i in range(6)))
+
+    assert peak == 2
+    assert admitted == list(range(6))
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_admission():
+    """Tests that a rate-limit signal delays the next request."""
+    limiter = RateLimiter()
+    limiter.on_rate_limited(retry_after=0.2)
+
+    started = time.monotonic()
+    async with limiter.acquire():
+        pass
+
+    assert time.monotonic() - started >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_its_slot_until_drained():
+    """Tests that an open stream counts against the concurrency window."""
+    limiter = RateLimiter(max_concurrency=1)
+
+    async def chunks():
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            yield i
+
+    await limiter.admit()
+    stream = limiter.hold(chunks())
+    waiter = asyncio.create_task(limiter.admit())
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    assert [chunk async for chunk in stream] == [0, 1, 2]
+    await asyncio.wait_for(waiter, 1)
+    limiter.release()
+
+
+@pytest.mark.asyncio
+async def test_closing_an_abandoned_stream_frees_its_slot():
+    """Tests that a stream left mid-way frees its slot once, when closed."""
+    limiter = RateLimiter(max_concurrency=1)
+
+    async def chunks():
+        for i in range(3):
+            yield i
+
+    await limiter.admit()
+    async with limiter.hold(chunks()) as stream:
+        async for chunk in stream:
+            break
+    await stream.aclose()
+
+    await asyncio.wait_for(limiter.admit(), 1)
+    assert limiter._in_flight == 1
+    limiter.release()
@@ -0,0 +1,119 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from app.cache import ResponseCache
+from app.config import LLMSettings
+from app.llm import LLM
+
+
+@pytest.fixture(scope="function")
+def cache_path(tmp_path: Path) -> Path:
+    """Returns a temporary location for the on-disk store."""
+    return tmp_path / "responses.sqlite"
+
+
+def test_make_key_is_stable():
+    """Tests that keys ignore dict ordering but not content."""
+    key_a = ResponseCache.make_key(model="m", messages=[{"role": "user", "a": 1}])
+    key_b = ResponseCache.make_key(messages=[{"a": 1, "role": "user"}], model="m")
+    key_c = ResponseCache.make_key(model="m", messages=[{"role": "user", "a": 2}])
+
+    assert key_a == key_b
+    assert key_a != key_c
+
+
+def test_request_key_covers_response_parameters(monkeypatch):
+    """Tests that every parameter but the transport ones splits the key."""
+    monkeypatch.setattr(LLM, "_instances", {})
+    monkeypatch.setattr("app.llm.tiktoken.get_encoding", lambda name: None)
+    settings = LLMSettings(
+        model="m",
+        base_url="http://localhost",
+        api_key="key",
+        api_type="openai",
+        api_version="",
+    )
+    llm = LLM("keys", {"default": settings})
+    params = {"model": "m", "messages": [{"role": "user", "content": "q"}]}
+    key = llm._request_key("ask", params)
+
+    assert llm._request_key("ask", {**params, "timeout": 30}) == key
+    assert llm._request_key("ask", {**params, "stream": False}) == key
+    for extra in (
+        {"max_tokens": 10},
+        {"max_completion_tokens": 10},
+        {"stream": True},
+        {"top_p": 0.5},
+        {"response_format": {"type": "json_object"}},
+    ):
+        assert llm._request_key("ask", {**params, **extra}) != key
+
+
+def test_hit_and_miss_counters(cache_path: Path):
+    """Tests hit/miss accounting for the memory tier."""
+    cache = ResponseCache(path=cache_path)
+
+    assert cache.get("k") is None
+    cache.set("k", "value")
+    assert cache.get("k") == "value"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_async_access_reads_and_writes_both_tiers(cache_path: Path):
+    """Tests that aget and aset behave like get and set across a restart."""
+    cache = ResponseCache(path=cache_path)
+    await cache.aset("k", "value")
+    assert await cache.aget("k") == "value"
+    cache.close()
+
+    reopened = ResponseCache(path=cache_path)
+    assert await reopened.aget("k") == "value"
+    assert await reopened.aget("other") is None
+    assert (reopened.hits, reopened.misses) == (1, 1)
+
+
+def test_disk_tier_survives_restart(cache_path: Path):
+    """Tests that entries persist across cache instances."""
+    cache = ResponseCache(path=cache_path)
+    cache.set("k", "value")
+    cache.close()
+
+    reopened = ResponseCache(path=cache_path)
+    assert reopened.get("k") == "value"
+
+
+def test_memory_lru_eviction():
+    """Tests that the in-process tier is bounded."""
+    cache = ResponseCache(max_memory_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
+
+
+def test_disk_size_eviction(cache_path: Path):
+    """Tests that the least recently used rows are dropped from disk."""
+    cache = ResponseCache(path=cache_path, max_memory_entries=1, max_disk_entries=2)
+    cache.set("a", "a")
+    time.sleep(0.01)
+    cache.set("b", "b")
+    time.sleep(0.01)
+    cache.get("a")  # refresh "a" so "b" becomes the eviction candidate
+    time.sleep(0.01)
+    cache.set("c", "c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+
+
+def test_ttl_expiry(cache_path: Path):
+    """Tests that expired entries are treated as misses."""
+    cache = ResponseCache(path=cache_path, ttl_seconds=0)
+    cache.set("k", "value")
+    time.sleep(0.01)
+
+    assert cache.get("k") is None
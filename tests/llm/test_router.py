@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import Config
+from app.router import Endpoint, EndpointStats, RouterClient
+
+
+class FakeClient:
+    """Answers completions with the endpoint name after a fixed delay."""
+
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **params):
+        self.calls.append(params)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return self.name
+
+
+def endpoint(name: str, **kwargs) -> Endpoint:
+    return Endpoint(name, FakeClient(name, **kwargs), model=f"{name}-model")
+
+
+def test_percentiles():
+    """Tests nearest-rank percentiles over the rolling window."""
+    stats = EndpointStats(window=10)
+    for latency in range(1, 21):
+        stats.record_success(latency / 10)
+
+    assert stats.p50 == pytest.approx(1.5, abs=0.1)
+    assert stats.p95 == pytest.approx(2.0, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_slow_endpoint_is_hedged():
+    """Tests that a hedged duplicate answers when the first endpoint stalls."""
+    slow, fast = endpoint("slow", delay=1.0), endpoint("fast")
+    router = RouterClient([slow, fast], hedge_default_delay=0.05)
+
+    result = await router.chat.completions.create(model="router", messages=[])
+
+    assert result == "fast"
+    assert router.hedged_requests == 1
+    assert fast.client.calls[0]["model"] == "fast-model"
+    # The fast endpoint is now measured and preferred
+    assert router.ranked()[0] is fast
+
+
+@pytest.mark.asyncio
+async def test_failed_endpoint_fails_over():
+    """Tests that errors fail over and push the endpoint to the back."""
+    down, up = endpoint("down", fail=True), endpoint("up")
+    router = RouterClient([down, up], hedge_percentile=None)
+
+    assert await router.create(model="router", messages=[]) == "up"
+    assert await router.create(model="router", messages=[], stream=True) == "up"
+    assert router.ranked()[-1] is down
+    assert router.hedged_requests == 0
+
+
+def test_router_settings_load_from_the_base_llm_section(monkeypatch):
+    """Tests that a router configured in [llm] itself keeps its endpoints."""
+    raw = {
+        "llm": {
+            "model": "router",
+            "base_url": "",
+            "api_key": "",
+            "api_type": "router",
+            "endpoints": ["fast", "backup"],
+            "hedge_percentile": 90.0,
+            "hedge_default_delay": 2.5,
+            "fast": {"model": "a", "api_type": "openai"},
+            "backup": {"model": "b", "api_type": "openai"},
+        }
+    }
+    loader = object.__new__(Config)
+    monkeypatch.setattr(loader, "_load_config", lambda: raw)
+
+    loader._load_initial_config()
+
+    default = loader.llm["default"]
+    assert default.endpoints == ["fast", "backup"]
+    assert (default.hedge_percentile, default.hedge_default_delay) == (90.0, 2.5)
+    assert loader.llm["fast"].model == "a"
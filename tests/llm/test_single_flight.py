@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from openai.types.chat import ChatCompletionMessage
+
+from app.cache import SingleFlight
+from app.config import LLMSettings
+from app.llm import LLM
+
+
+class WordTokenizer:
+    def encode(self, text: str) -> list:
+        return text.split()
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_call():
+    """Tests that concurrent callers with one key trigger a single execution."""
+    flight = SingleFlight()
+    executions = 0
+
+    async def work():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert results == ["result"] * 5
+    assert executions == 1
+    assert (flight.calls, flight.saved) == (1, 4)
+
+
+@pytest.mark.asyncio
+async def test_distinct_keys_run_separately():
+    """Tests that different keys are never coalesced."""
+    flight = SingleFlight()
+
+    async def work(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b"))
+    )
+
+    assert results == ["a", "b"]
+    assert flight.saved == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_waiters():
+    """Tests that a failure of the leading call reaches every waiter."""
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flight.do("k", work), flight.do("k", work), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_hands_over_to_waiter():
+    """Tests that a waiter runs the work itself if the leader is cancelled."""
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == "done"
+    assert flight.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_llm_coalesces_only_identical_parameters(monkeypatch):
+    """Tests that tool requests differing in any parameter are not coalesced."""
+    monkeypatch.setattr(LLM, "_instances", {})
+    monkeypatch.setattr("app.llm.tiktoken.get_encoding", lambda name: WordTokenizer())
+    settings = LLMSettings(
+        model="coalesced-model",
+        base_url="http://localhost",
+        api_key="key",
+        api_type="openai",
+        api_version="",
+    )
+    llm = LLM("coalesce", {"default": settings})
+    sent = []
+
+    async def complete(params, input_tokens, cache_key):
+        sent.append(params)
+        await asyncio.sleep(0.01)
+        return ChatCompletionMessage(role="assistant", content="answer")
+
+    monkeypatch.setattr(llm, "_complete_tool_request", complete)
+    messages = [{"role": "user", "content": "q"}]
+
+    await asyncio.gather(
+        llm.ask_tool(messages, use_cache=False),
+        llm.ask_tool(messages, use_cache=False),
+        llm.ask_tool(
+            messages, use_cache=False, response_format={"type": "json_object"}
+        ),
+        llm.ask_tool(messages, use_cache=False, top_p=0.5),
+    )
+
+    assert len(sent) == 3
+    assert llm.request_coalescer.saved == 1
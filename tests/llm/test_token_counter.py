@@ -0,0 +1,65 @@
+from app.llm import TokenCounter
+
+
+class CountingTokenizer:
+    """Whitespace tokenizer that records how many times it was called."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text: str) -> list:
+        self.calls += 1
+        return text.split()
+
+
+def test_counts_match_uncached_computation():
+    """Tests that memoized counts equal a fresh computation."""
+    messages = [
+        {"role": "system", "content": "be brief"},
+        {"role": "user", "content": "hello there"},
+        {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [{"function": {"name": "bash", "arguments": "{}"}}],
+        },
+        {"role": "tool", "content": "ok", "name": "bash", "tool_call_id": "c1"},
+    ]
+    counter = TokenCounter(CountingTokenizer())
+
+    first = counter.count_message_tokens(messages)
+    second = counter.count_message_tokens(messages)
+
+    assert (
+        first
+        == second
+        == TokenCounter(CountingTokenizer()).count_message_tokens(messages)
+    )
+
+
+def test_only_new_messages_are_encoded():
+    """Tests that a growing history only tokenizes the appended messages."""
+    tokenizer = CountingTokenizer()
+    counter = TokenCounter(tokenizer)
+    history = [{"role": "user", "content": f"message {i}"} for i in range(10)]
+
+    counter.count_message_tokens(history)
+    calls_after_first = tokenizer.calls
+
+    history.append({"role": "tool", "content": "new output", "tool_call_id": "c"})
+    counter.count_message_tokens([dict(m) for m in history])
+
+    assert tokenizer.calls - calls_after_first == 3  # role, content, tool_call_id
+
+
+def test_tool_schema_counts_are_reused():
+    """Tests that tool schemas are tokenized once across requests."""
+    tokenizer = CountingTokenizer()
+    counter = TokenCounter(tokenizer)
+    tools = [{"type": "function", "function": {"name": "bash"}}]
+
+    first = counter.count_tools(tools)
+    calls = tokenizer.calls
+    second = counter.count_tools([dict(tools[0])])
+
+    assert first == second
+    assert tokenizer.calls == calls
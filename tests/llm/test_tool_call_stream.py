@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm import ToolCallAssembler, ToolCallStream
+
+
+def tool_delta(index, id=None, name=None, arguments=None):
+    """Builds a streamed tool-call delta shaped like the OpenAI SDK's."""
+    return SimpleNamespace(
+        index=index,
+        id=id,
+        function=SimpleNamespace(name=name, arguments=arguments),
+    )
+
+
+def chunk(content=None, tool_calls=None):
+    """Builds a streamed chunk with a single choice."""
+    return SimpleNamespace(
+        choices=[
+            SimpleNamespace(
+                delta=SimpleNamespace(content=content, tool_calls=tool_calls)
+            )
+        ]
+    )
+
+
+class FakeLLM:
+    """Stands in for the LLM bookkeeping used by ToolCallStream."""
+
+    response_cache = None
+
+    def __init__(self):
+        self.usage = []
+
+    def count_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def update_token_count(self, input_tokens: int, completion_tokens: int = 0):
+        self.usage.append((input_tokens, completion_tokens))
+
+
+async def aiter_chunks(chunks):
+    for item in chunks:
+        yield item
+
+
+def test_assembler_emits_call_once_arguments_parse():
+    """Tests that a call is released as soon as its JSON arguments close."""
+    assembler = ToolCallAssembler()
+
+    assert (
+        assembler.feed([tool_delta(0, id="a", name="bash", arguments='{"cmd"')]) == []
+    )
+    completed = assembler.feed([tool_delta(0, arguments=': "ls"}')])
+
+    assert [call.id for call in completed] == ["a"]
+    assert completed[0].function.arguments == '{"cmd": "ls"}'
+    assert assembler.finish() == []
+
+
+def test_assembler_finish_flushes_incomplete_calls():
+    """Tests that calls with unparseable arguments are released at the end."""
+    assembler = ToolCallAssembler()
+    assembler.feed([tool_delta(0, id="a", name="bash", arguments='{"cmd": ')])
+
+    remaining = assembler.finish()
+
+    assert [call.id for call in remaining] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_calls_before_completion_ends():
+    """Tests that the first call is yielded before later calls are streamed."""
+    chunks = [
+        chunk(content="thinking"),
+        chunk(tool_calls=[tool_delta(0, id="a", name="t", arguments="{}")]),
+        chunk(tool_calls=[tool_delta(1, id="b", name="t", arguments='{"x": 1')]),
+        chunk(tool_calls=[tool_delta(1, arguments="}")]),
+    ]
+    llm = FakeLLM()
+    stream = ToolCallStream(llm, aiter_chunks(chunks), input_tokens=5)
+
+    events = [event async for event in stream]
+
+    assert events[0].content == "thinking"
+    assert [e.tool_call.id for e in events if e.tool_call] == ["a", "b"]
+    assert stream.message.content == "thinking"
+    assert [call.id for call in stream.message.tool_calls] == ["a", "b"]
+    assert llm.usage[0][0] == 5
+
+
+@pytest.mark.asyncio
+async def test_stream_numbers_calls_by_message_position():
+    """Tests that completed calls carry their position in the message."""
+    # Bedrock numbers blocks from 1 when a text block comes first
+    chunks = [
+        chunk(tool_calls=[tool_delta(1, id="a", name="t", arguments='{"x": ')]),
+        chunk(tool_calls=[tool_delta(2, id="a", name="t", arguments="{}")]),
+    ]
+    stream = ToolCallStream(FakeLLM(), aiter_chunks(chunks))
+
+    events = [event async for event in stream if event.tool_call]
+
+    assert [e.tool_call.function.arguments for e in events] == ["{}", '{"x": ']
+    assert [e.tool_call_index for e in events] == [1, 0]
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app.metrics import MetricsRegistry, metric_context
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+@pytest.mark.asyncio
+async def test_context_labels_attribute_concurrent_runs(registry):
+    """Tests that concurrent runs keep their own attribution."""
+    tokens = registry.counter("tokens_total", "Tokens")
+
+    async def record(amount: int):
+        await asyncio.sleep(0)
+        tokens.inc(amount)
+
+    async def run(run_id: str, amount: int):
+        with metric_context(run=run_id, agent="manus"):
+            await asyncio.sleep(0)
+            with metric_context(step=1):
+                # Tasks inherit the labels of the code that created them
+                await asyncio.create_task(record(amount))
+
+    await asyncio.gather(run("a", 10), run("b", 5))
+
+    assert tokens.value(run="a") == 10
+    assert tokens.value(run="b", step=1) == 5
+    assert tokens.value(agent="manus") == 15
+
+
+def test_prometheus_text_format(registry):
+    """Tests counter and histogram rendering in the exposition format."""
+    calls = registry.counter("tool_calls_total", "Tool executions")
+    latency = registry.histogram("tool_seconds", "Tool latency", buckets=(0.1, 1))
+    calls.inc(tool='say "hi"')
+    latency.observe(0.5, tool="bash")
+    latency.observe(2, tool="bash")
+
+    text = registry.to_prometheus()
+
+    assert "# TYPE tool_calls_total counter" in text
+    assert 'tool_calls_total{tool="say \\"hi\\""} 1' in text
+    assert 'tool_seconds_bucket{tool="bash",le="0.1"} 0' in text
+    assert 'tool_seconds_bucket{tool="bash",le="1"} 1' in text
+    assert 'tool_seconds_bucket{tool="bash",le="+Inf"} 2' in text
+    assert 'tool_seconds_sum{tool="bash"} 2.5' in text
+    assert 'tool_seconds_count{tool="bash"} 2' in text
+
+
+def test_json_export_and_summary(registry):
+    """Tests the JSON exporter and per-label summaries."""
+    latency = registry.histogram("llm_seconds", "LLM latency")
+    with metric_context(run="r1"):
+        latency.observe(1.5, model="gpt-4o")
+
+    exported = registry.to_json()["llm_seconds"]
+
+    assert exported["type"] == "histogram"
+    assert exported["series"][0]["labels"] == {"model": "gpt-4o", "run": "r1"}
+    assert registry.summary(run="r1") == {
+        "llm_seconds_sum": 1.5,
+        "llm_seconds_count": 1,
+    }
+    assert registry.summary(run="other") == {}
+
+
+def test_retired_runs_fold_into_process_totals(registry):
+    """Tests that a finished run's series merge into series without run labels."""
+    tokens = registry.counter("tokens_total", "Tokens")
+    latency = registry.histogram("llm_seconds", "LLM latency", buckets=(1,))
+    for run in ("r1", "r2"):
+        for step in (1, 2):
+            with metric_context(run=run, agent="manus", step=step):
+                tokens.inc(10, model="m")
+                latency.observe(0.5, model="m")
+
+    registry.retire(run="r1")
+    registry.retire(run="r2")
+
+    assert list(tokens.series()) == [(("agent", "manus"), ("model", "m"))]
+    assert tokens.value(agent="manus") == 40
+    assert latency.stats(model="m") == (2.0, 4)
+    assert 'llm_seconds_bucket{agent="manus",model="m",le="1"} 4' in (
+        registry.to_prometheus()
+    )
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+from app.agent.base import BaseAgent
+from app.llm import LLM
+from app.runner import SessionRunner, run_batch
+from app.sandbox.client import get_sandbox_client
+from app.tool import ToolCollection
+from app.tool.base import BaseTool
+
+
+class EchoAgent(BaseAgent):
+    """Spends tokens on its session LLM and reports its sandbox client."""
+
+    name: str = "echo"
+    max_steps: int = 1
+
+    async def step(self) -> str:
+        await asyncio.sleep(0.01)
+        self.llm.total_input_tokens += 10
+        if "fail" in self.messages[0].content:
+            raise RuntimeError("boom")
+        return f"{self.messages[0].content} via {id(get_sandbox_client())}"
+
+
+class SummarizeTool(BaseTool):
+    """Spends tokens on the LLM it holds."""
+
+    name: str = "summarize"
+    description: str = "Summarize"
+    llm: LLM
+
+    async def execute(self) -> str:
+        self.llm.total_input_tokens += 5
+        return "summary"
+
+
+class ToolAgent(EchoAgent):
+    available_tools: ToolCollection
+
+    async def step(self) -> str:
+        for tool in self.available_tools:
+            await tool.execute()
+        return await super().step()
+
+
+@pytest.fixture
+def shared_llm():
+    # Skip LLM.__init__, which needs tokenizer downloads; the agents never call it
+    llm = object.__new__(LLM)
+    llm.total_input_tokens = 100
+    llm.total_completion_tokens = 0
+    return llm
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_isolated(shared_llm):
+    """Tests that sessions get their own token counters and sandbox client."""
+    runner = SessionRunner(lambda llm: EchoAgent(llm=llm), llm=shared_llm)
+
+    results = [r async for r in runner.run_many([("a", "first"), ("b", "second")])]
+
+    assert sorted(r.session_id for r in results) == ["a", "b"]
+    assert all(r.ok and r.input_tokens == 10 for r in results)
+    sandboxes = {re.search(r"via (\d+)", r.output).group(1) for r in results}
+    assert len(sandboxes) == 2
+    assert shared_llm.total_input_tokens == 100
+
+
+@pytest.mark.asyncio
+async def test_tools_spend_the_session_llm(shared_llm):
+    """Tests that a tool holding the shared LLM is counted against the session."""
+    runner = SessionRunner(
+        lambda llm: ToolAgent(
+            llm=llm, available_tools=ToolCollection(SummarizeTool(llm=shared_llm))
+        ),
+        llm=shared_llm,
+    )
+
+    result = await runner.run("first")
+
+    assert result.ok and result.input_tokens == 15
+    assert shared_llm.total_input_tokens == 100
+
+
+@pytest.mark.asyncio
+async def test_failures_are_captured_and_concurrency_is_bounded(shared_llm):
+    """Tests that an error stays in its session and the slot limit holds."""
+    active = peak = 0
+
+    class CountingAgent(EchoAgent):
+        async def step(self) -> str:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            try:
+                return await super().step()
+            finally:
+                active -= 1
+
+    runner = SessionRunner(
+        lambda llm: CountingAgent(llm=llm), max_concurrency=2, llm=shared_llm
+    )
+    requests = [(str(i), "fail" if i == 0 else "ok") for i in range(5)]
+
+    results = {r.session_id: r async for r in runner.run_many(requests)}
+
+    assert peak == 2
+    assert results["0"].error == "RuntimeError: boom"
+    assert all(results[str(i)].ok for i in range(1, 5))
+
+
+@pytest.mark.asyncio
+async def test_run_batch_writes_results_and_resumes(shared_llm, tmp_path):
+    """Tests that batch results are appended and completed ids are skipped."""
+    input_path = tmp_path / "prompts.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    input_path.write_text(
+        '{"id": "a", "prompt": "first"}\n\n"second"\n{"id": "c", "prompt": "fail"}\n'
+    )
+    runner = SessionRunner(lambda llm: EchoAgent(llm=llm), llm=shared_llm)
+
+    assert await run_batch(str(input_path), str(output_path), runner) == (2, 1)
+    assert await run_batch(str(input_path), str(output_path), runner) == (0, 1)
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [r["session_id"] for r in records].count("a") == 1
+    assert {r["session_id"] for r in records} == {"a", "3", "c"}
+    assert all(r["input_tokens"] == 10 for r in records)
@@ -0,0 +1,61 @@
+from app.observation import spilled_handle
+from app.schema import Function, Memory, Message, Role, ToolCall
+
+
+def count_chars(messages):
+    """Cheap stand-in for a token counter: one token per character."""
+    return sum(len(m.content or "") + len(m.base64_image or "") for m in messages)
+
+
+def tool_round(call_id: str, output: str, image: str = None):
+    """An assistant tool call followed by its tool response."""
+    call = ToolCall(id=call_id, function=Function(name="browser", arguments="{}"))
+    return [
+        Message(role=Role.ASSISTANT, content="", tool_calls=[call]),
+        Message.tool_message(output, "browser", call_id, base64_image=image),
+    ]
+
+
+def test_trim_never_starts_with_tool_response():
+    """Tests that the message limit does not orphan tool responses."""
+    memory = Memory(max_messages=3)
+    memory.add_messages([Message.user_message("task")])
+    memory.add_messages(tool_round("a", "x") + tool_round("b", "y"))
+
+    assert memory.messages[0].role != Role.TOOL
+    assert [m.tool_call_id for m in memory.messages if m.tool_call_id] == ["b"]
+
+
+def test_compact_digests_old_observations_and_stale_images():
+    """Tests that old outputs shrink and only the latest screenshot is kept."""
+    memory = Memory()
+    memory.add_message(Message.user_message("task"))
+    for i in range(5):
+        memory.add_messages(tool_round(f"c{i}", "o" * 1000, image="img" * 100))
+
+    assert memory.compact(3500, count_chars, keep_recent=2)
+
+    tool_messages = [m for m in memory.messages if m.role == Role.TOOL]
+    assert [bool(m.base64_image) for m in tool_messages] == [False] * 4 + [True]
+    assert "omitted" in tool_messages[0].content
+    handle = spilled_handle(tool_messages[0].content)
+    assert memory.observation_store().read(handle) == (
+        "[" + handle + ": lines 0-0 of 1]\n" + "o" * 1000
+    )
+    assert tool_messages[-1].content == "o" * 1000
+    assert len(memory.messages) == 11
+
+
+def test_compact_drops_groups_but_keeps_anchors_and_pairs():
+    """Tests that dropping history keeps the task and whole tool rounds."""
+    memory = Memory()
+    memory.add_messages([Message.system_message("sys"), Message.user_message("task")])
+    for i in range(5):
+        memory.add_messages(tool_round(f"c{i}", "o" * 100))
+
+    assert memory.compact(150, count_chars, keep_recent=1)
+
+    assert [m.content for m in memory.messages[:2]] == ["sys", "task"]
+    call_ids = {c.id for m in memory.messages for c in m.tool_calls or []}
+    assert {m.tool_call_id for m in memory.messages if m.tool_call_id} == call_ids
+    assert "c4" in call_ids
@@ -0,0 +1,72 @@
+import pytest
+
+from app.tool import PlanningTool
+from app.tool.plan_store import PlanStore
+
+
+@pytest.mark.asyncio
+async def test_plans_survive_a_restart(tmp_path):
+    """Tests that created, marked and deleted plans are kept in the store."""
+    path = tmp_path / "plans.sqlite"
+    tool = PlanningTool(plans={}, store=PlanStore(path))
+    await tool.execute(command="create", plan_id="p", title="t", steps=["a", "b"])
+    await tool.execute(command="create", plan_id="gone", title="t", steps=["a"])
+    await tool.execute(
+        command="mark_step", plan_id="p", step_index=0, step_status="completed"
+    )
+    await tool.execute(command="delete", plan_id="gone")
+
+    restarted = PlanningTool(plans={}, store=PlanStore(path))
+
+    assert restarted.plans == {}
+    assert restarted.ready_steps("p") == [1]
+    assert restarted.plans["p"]["step_statuses"] == ["completed", "not_started"]
+    assert restarted.plans["p"]["step_versions"] == [1, 0]
+    listing = await restarted.execute(command="list")
+    assert "gone" not in listing.output
+
+
+@pytest.mark.asyncio
+async def test_plan_delta_lists_only_changed_and_included_steps():
+    """Tests that the delta holds the progress and the steps changed since a version."""
+    tool = PlanningTool(plans={}, store=None, max_delta_steps=2)
+    steps = [f"step {i}" for i in range(50)]
+    await tool.execute(command="create", plan_id="p", title="t", steps=steps)
+    for i in range(4):
+        await tool.execute(
+            command="mark_step", plan_id="p", step_index=i, step_status="completed"
+        )
+
+    text, version = tool.format_plan_delta("p", since=0, include=[40])
+
+    assert version == 4
+    assert "Progress: 4/50 steps completed (8.0%)" in text
+    listed = [line.split(".")[0] for line in text.splitlines() if ". [" in line]
+    assert listed == ["2", "3", "40"]
+    assert "(2 earlier changes not shown)" in text
+
+    await tool.execute(
+        command="mark_step", plan_id="p", step_index=4, step_status="in_progress"
+    )
+    text, _ = tool.format_plan_delta("p", since=version)
+    assert [line for line in text.splitlines() if ". [" in line] == ["4. [→] step 4"]
+
+
+@pytest.mark.asyncio
+async def test_list_shows_only_the_most_recent_plans(tmp_path):
+    """Tests that listing is limited and does not load stored plans."""
+    tool = PlanningTool(
+        plans={}, store=PlanStore(tmp_path / "plans.sqlite"), max_listed_plans=2
+    )
+    for plan_id in ("p1", "p2", "p3"):
+        await tool.execute(command="create", plan_id=plan_id, title="t", steps=["a"])
+    restarted = PlanningTool(
+        plans={}, store=PlanStore(tmp_path / "plans.sqlite"), max_listed_plans=2
+    )
+
+    listing = await restarted.execute(command="list")
+
+    assert "p3" in listing.output and "p2" in listing.output
+    assert "p1" not in listing.output
+    assert "(1 older plans not shown)" in listing.output
+    assert restarted.plans == {}
@@ -0,0 +1,106 @@
+import gc
+import re
+
+import pytest
+
+from app.agent.toolcall import ToolCallAgent
+from app.exceptions import ToolError
+from app.llm import LLM
+from app.observation import ObservationStore, observation_scope
+from app.schema import Function, Memory, ToolCall
+from app.tool import ToolCollection
+from app.tool.base import BaseTool
+from app.tool.read_observation import ReadObservation
+
+
+def handle_of(preview: str) -> str:
+    return re.search(r"observation '(obs_[0-9a-f]+)'", preview).group(1)
+
+
+@pytest.mark.asyncio
+async def test_large_output_is_stored_and_paged():
+    """Tests that a large output becomes a preview and reads back by page or pattern."""
+    output = "\n".join(
+        f"line {i}" + (" ERROR" if i == 700 else "") for i in range(1000)
+    )
+    tool = ReadObservation()
+    store = ObservationStore(threshold=1000, preview_chars=200)
+
+    with observation_scope(store):
+        assert store.spill("short") == "short"
+        preview = store.spill(output)
+        assert len(preview) < 500
+        assert preview.startswith("line 0") and "line 999" in preview
+        handle = handle_of(preview)
+
+        page = await tool.execute(handle=handle, offset=10, limit=3)
+        assert page.output.splitlines() == [
+            f"[{handle}: lines 10-12 of 1000] (next offset: 13)",
+            "line 10",
+            "line 11",
+            "line 12",
+        ]
+        found = await tool.execute(handle=handle, pattern="ERROR", context=1)
+        assert found.output.splitlines()[1:] == [
+            "699: line 699",
+            "700: line 700 ERROR",
+            "701: line 701",
+        ]
+        with pytest.raises(ToolError):
+            await tool.execute(handle="obs_0")
+
+    with pytest.raises(ToolError):
+        await tool.execute(handle=handle)
+
+    directory = store.directory
+    store.cleanup()
+    assert not directory.exists()
+
+
+class LongOutputTool(BaseTool):
+    name: str = "long_output"
+    description: str = "Returns a long output"
+
+    async def execute(self) -> str:
+        return "\n".join(f"line {i}" for i in range(1000))
+
+
+@pytest.mark.asyncio
+async def test_spilled_preview_is_not_truncated_by_max_observe():
+    """Tests that max_observe never cuts the handle off a spilled output."""
+    # Skip LLM.__init__, which needs tokenizer downloads; act() never calls it
+    agent = ToolCallAgent(
+        llm=object.__new__(LLM),
+        available_tools=ToolCollection(LongOutputTool()),
+        max_observe=100,
+    )
+    agent.tool_calls = [
+        ToolCall(id="c0", function=Function(name="long_output", arguments="{}"))
+    ]
+    store = ObservationStore(threshold=1000, preview_chars=200)
+
+    with observation_scope(store):
+        result = await agent.act()
+
+    assert store.read(handle_of(result), offset=999).splitlines()[-1] == "line 999"
+
+
+def test_handles_outlive_runs_of_a_memory():
+    """Tests that spilled outputs follow a memory through copies and checkpoints."""
+    memory = Memory()
+    handle = handle_of(memory.observation_store().spill("x" * 20000))
+
+    forked = memory.model_copy(deep=True)
+    assert forked.observation_store() is memory.observation_store()
+    assert "[" + handle in forked.observation_store().read(handle)
+
+    restored = Memory()
+    restored.observation_store().load(memory.observation_store().dump())
+    assert "[" + handle in restored.observation_store().read(handle)
+    other = handle_of(restored.observation_store().spill("y" * 20000))
+    assert other != handle
+
+    directory = memory.observation_store().directory
+    del memory, forked
+    gc.collect()
+    assert not directory.exists()
@@ -0,0 +1,81 @@
+from typing import Optional, Set
+
+import pytest
+
+from app.tool import ToolCollection
+from app.tool.base import BaseTool, ToolResult
+from app.tool.str_replace_editor import StrReplaceEditor
+
+
+class CountingTool(BaseTool):
+    """Counts executions; `read` calls are memoizable, `write` calls are not."""
+
+    name: str = "files"
+    description: str = "test tool"
+    executions: int = 0
+
+    def memo_tags(self, op: str, path: str, **kwargs) -> Optional[Set[str]]:
+        return {path} if op == "read" else None
+
+    def invalidated_tags(self, op: str, path: str, **kwargs) -> Optional[Set[str]]:
+        return {path} if op == "write" else None
+
+    async def execute(self, op: str, path: str) -> ToolResult:
+        self.executions += 1
+        if op == "fail":
+            return ToolResult(error="failed")
+        return ToolResult(output=f"{op} {path} #{self.executions}")
+
+
+class SearchTool(BaseTool):
+    name: str = "search"
+    description: str = "test tool"
+
+    def memo_tags(self, **kwargs) -> Set[str]:
+        return set()
+
+    async def execute(self, query: str) -> str:
+        return f"results for {query}"
+
+
+@pytest.mark.asyncio
+async def test_memo_reuses_results_until_invalidated():
+    """Tests memo hits, tag invalidation and that errors are not memoized."""
+    tool = CountingTool()
+    tools = ToolCollection(tool, SearchTool())
+
+    await tools.execute(name="files", tool_input={"op": "read", "path": "a"})
+    assert tool.executions == 1  # Memoization is opt-in
+
+    memo = tools.enable_memo()
+    first = await tools.execute(name="files", tool_input={"op": "read", "path": "a"})
+    await tools.execute(name="files", tool_input={"path": "a", "op": "read"})
+    await tools.execute(name="files", tool_input={"op": "read", "path": "b"})
+    assert tool.executions == 3 and memo.hits == 1
+
+    await tools.execute(name="files", tool_input={"op": "write", "path": "a"})
+    again = await tools.execute(name="files", tool_input={"op": "read", "path": "a"})
+    await tools.execute(name="files", tool_input={"op": "read", "path": "b"})
+    assert again.output != first.output and memo.hits == 2
+
+    await tools.execute(name="search", tool_input={"query": "q"})
+    # A call with unknown effects drops everything tied to a resource
+    await tools.execute(name="files", tool_input={"op": "fail", "path": "c"})
+    await tools.execute(name="files", tool_input={"op": "fail", "path": "c"})
+    assert len(memo) == 1  # Only the search result is left
+    await tools.execute(name="search", tool_input={"query": "q"})
+    assert memo.hits == 3
+
+
+def test_editor_edits_invalidate_views_of_enclosing_directories():
+    """Tests that the editor tags views by path and edits by path and parents."""
+    editor = StrReplaceEditor()
+
+    assert editor.memo_tags(command="view", path="/w/a.py") == {"file:/w/a.py"}
+    assert editor.memo_tags(command="create", path="/w/a.py") is None
+    assert editor.invalidated_tags(command="create", path="/w/d/a.py") == {
+        "file:/w/d/a.py",
+        "file:/w/d",
+        "file:/w",
+        "file:/",
+    }
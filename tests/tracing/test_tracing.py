@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import pytest
+
+from app.tool import ToolCollection
+from app.tool.base import BaseTool
+from app.tracing import NOOP_SPAN, traced, tracer
+
+
+class SleepTool(BaseTool):
+    name: str = "sleep"
+    description: str = "test tool"
+
+    async def execute(self) -> str:
+        await asyncio.sleep(0.01)
+        return "done"
+
+
+@traced("test.fetch")
+async def fetch() -> None:
+    await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def enabled_tracer(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "chrome_trace_path", str(tmp_path / "trace.json"))
+    monkeypatch.setattr(tracer, "otlp_endpoint", None)
+    tracer.drain()
+    yield tracer
+    tracer.drain()
+
+
+def test_disabled_tracer_hands_out_noop_span():
+    """Tests that spans cost nothing while tracing is off."""
+    assert not tracer.enabled
+    assert tracer.span("anything") is NOOP_SPAN
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_and_export(enabled_tracer, tmp_path):
+    """Tests span parenting across tasks and both export formats."""
+    tools = ToolCollection(SleepTool())
+    with tracer.span("agent.step", step=1):
+        await asyncio.gather(fetch(), tools.execute(name="sleep"))
+        with pytest.raises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("boom")
+
+    spans = {span.name: span for span in tracer._finished}
+    root = spans["agent.step"]
+    assert spans["test.fetch"].parent_id == root.span_id
+    assert spans["tool.sleep"].parent_id == root.span_id
+    assert {span.trace_id for span in spans.values()} == {root.trace_id}
+    # Concurrent tasks are drawn on separate rows
+    assert spans["test.fetch"].lane != spans["tool.sleep"].lane
+    assert spans["failing"].error == "ValueError: boom"
+
+    otlp = tracer.to_otlp(list(spans.values()))
+    exported = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert {s["name"]: s["status"]["code"] for s in exported}["failing"] == 2
+
+    await tracer.flush()
+    await tracer.flush()  # Nothing left to append
+    text = (tmp_path / "trace.json").read_text()
+    events = json.loads(text.rstrip(",\n") + "]")
+    assert sorted(e["name"] for e in events) == sorted(spans)
+    assert next(e for e in events if e["name"] == "agent.step")["args"]["step"] == "1"